@@ -85,19 +85,27 @@ int32_t hx711_read_raw(void) {
   return data;
 }
 
+// Check if a conversion is ready (DOUT low), without blocking
+bool hx711_is_ready(void) {
+  return s_initialized && digitalRead(s_dout_pin) == LOW;
+}
+
 // Read weight in grams with calibration
 int32_t hx711_read_weight(int32_t offset, int32_t multiplier) {
   if (!s_initialized) {
     return 0;
   }
   
+  // Read raw ADC value
+  return hx711_raw_to_weight(hx711_read_raw(), offset, multiplier);
+}
+
+// Convert a raw ADC value to grams with calibration
+int32_t hx711_raw_to_weight(int32_t raw, int32_t offset, int32_t multiplier) {
   if (multiplier == 0) {
     return 0;  // Prevent division by zero
   }
   
-  // Read raw ADC value
-  int32_t raw = hx711_read_raw();
-  
   // Apply session tare and permanent offset
   // Formula: weight = (raw - tare_offset - offset) * multiplier / 1000
   int32_t calibrated = raw - s_tare_offset - offset;
@@ -135,6 +143,11 @@ int32_t hx711_get_tare_offset(void) {
   return s_tare_offset;
 }
 
+// Set tare offset (session-only), e.g. averaged by the sampling task
+void hx711_set_tare_offset(int32_t tare_offset) {
+  s_tare_offset = tare_offset;
+}
+
 // Get raw ADC reading for debugging
 int32_t hx711_get_raw_debug(void) {
   if (s_initialized) {
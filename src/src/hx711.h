@@ -21,12 +21,19 @@ void hx711_init(uint8_t dout_pin, uint8_t sck_pin);
 // Returns raw ADC value (24-bit)
 int32_t hx711_read_raw(void);
 
+// Check if a conversion is ready (DOUT low), without blocking
+bool hx711_is_ready(void);
+
 // Read weight in grams with calibration
 // Returns weight in grams, with offset and multiplier applied
 // offset: calibration offset (typically 0 or tare value)
 // multiplier: calibration factor (linear in FSD)
 int32_t hx711_read_weight(int32_t offset, int32_t multiplier);
 
+// Convert a raw ADC value to grams with calibration and session tare
+// Same formula as hx711_read_weight, without touching the sensor
+int32_t hx711_raw_to_weight(int32_t raw, int32_t offset, int32_t multiplier);
+
 // Set tare (zero offset)
 // Stores the current reading as the new offset
 void hx711_tare(void);
@@ -34,6 +41,9 @@ void hx711_tare(void);
 // Get current tare offset
 int32_t hx711_get_tare_offset(void);
 
+// Set tare offset (raw value at 0g for the current session)
+void hx711_set_tare_offset(int32_t tare_offset);
+
 // Get raw ADC reading for debugging (non-calibrated)
 int32_t hx711_get_raw_debug(void);
 
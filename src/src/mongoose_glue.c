@@ -7,11 +7,14 @@
 #include "mongoose_glue.h"
 #include "hc_sr04.h"
 #include "hx711.h"
+#include "perf.h"
+#include "sensor_sampler.h"
 
 // Sensor Settings: HC-SR04 calibration and thresholds
 // distance_trig: glass detection threshold in mm (default 80mm = 8cm)
 // linear: HX711 multiplier for weight calibration (calibrated for 1kg load cell)
 //   Calibration: 550g reference → multiplier = (550*1000) / 372421 = 1477
+//   Multi-point recalibration: test/calibration.py (raw via /api/sensor_raw)
 // offset: HX711 zero-point offset (raw value at 0g load)
 static struct sensor_settings s_sensor_settings = {
   .distance_trig = 80,     // 80mm (8cm) - glass detected when closer
@@ -33,6 +36,10 @@ void glue_set_sensor_settings(struct sensor_settings *data) {
   }
   // offset can be negative or positive
   s_sensor_settings.offset = data->offset;
+  sensor_sampler_set_calibration(s_sensor_settings.offset,
+                                 s_sensor_settings.linear,
+                                 s_sensor_settings.distance_trig);
+  // handle_object() bumps the heartbeat version if the values changed
   
   // In production: persist settings to NVS/flash
   // nvs_set_sensor_settings(&s_sensor_settings);
@@ -47,51 +54,285 @@ void glue_set_settings(struct settings *data) {
   s_settings = *data; // Sync with your device
 }
 
-// Sensor read values: real-time sensor readings
-// These values are updated live when the API is called
+// Sensor read values: latest snapshot of the sampling task
+// (see sensor_sampler.c), the handlers never touch the sensors directly
 static struct sensor_read s_sensor_read = {
   .cup_true = false,    // Glass detection state (calculated from HC-SR04)
   .tare = false,        // Tare state (from HX711 weight sensor)
   .weight = 0,          // Current weight in grams (from HX711)
-  .distance = 0         // Current distance in mm (from HC-SR04)
+  .distance = 0,        // Current distance in mm (from HC-SR04)
+  .seq = 0,             // Sample sequence number
+  .timestamp = 0,       // Sample time, ms since boot
+  .tare_offset = 0      // Session tare offset (raw HX711 value)
 };
 
 void glue_get_sensor_read(struct sensor_read *data) {
-  // Read HC-SR04 ultrasonic sensor (glass detection)
-  if (hc_sr04_is_initialized()) {
-    int32_t distance = hc_sr04_read_distance();
-    data->distance = (int) distance;
-    
-    // Cup detection: compare distance with threshold (distance_trig in mm)
-    // If distance < threshold, cup is present
-    if (distance < s_sensor_settings.distance_trig) {
-      data->cup_true = true;
-    } else {
-      data->cup_true = false;
-    }
-  } else {
-    data->distance = 0;
-    data->cup_true = false;
-  }
+  struct sensor_sample sample;
+  uint32_t start = perf_begin();
+  sensor_sampler_get(&sample);  // Copy only, returns in microseconds
   
-  // Read HX711 weight sensor
-  if (hx711_is_initialized()) {
-    // Read weight with calibration: offset and multiplier from sensor_settings
-    data->weight = hx711_read_weight(s_sensor_settings.offset, s_sensor_settings.linear);
-  } else {
-    data->weight = 0;
-  }
+  data->cup_true = sample.cup_true;
+  data->weight = (int) sample.weight;
+  data->distance = (int) sample.distance;
+  data->seq = sample.seq;
+  data->timestamp = sample.timestamp_ms;
+  data->tare_offset = (int) hx711_get_tare_offset();
   
   // Tare flag is read-only (status flag)
   data->tare = s_sensor_read.tare;
+  perf_end(PERF_GLUE_GET_SENSOR_READ, start);
 }
 
 void glue_set_sensor_read(struct sensor_read *data) {
-  // Handle tare operation when tare flag is set
+  // Handle tare operation when tare flag is set. The sampling task owns
+  // the HX711, so it averages the next conversions into the tare offset
   if (data->tare && hx711_is_initialized()) {
-    hx711_tare();
+    sensor_sampler_request_tare(TARE_SAMPLES_DEFAULT);
     s_sensor_read.tare = true;
   } else {
     s_sensor_read.tare = false;
   }
 }
+
+// Tare action, polled by the Mongoose loop via CONN_ACTION: the HTTP
+// handler returns immediately and the connection is answered when done
+static bool s_tare_running = false;
+
+bool glue_check_tare(void) {
+  if (s_tare_running && !sensor_sampler_tare_pending()) {
+    s_tare_running = false;
+    glue_update_state();  // New offset, signal /api/heartbeat clients
+  }
+  return s_tare_running;
+}
+
+void glue_start_tare(struct mg_str params) {
+  double d = TARE_SAMPLES_DEFAULT;
+  int samples;
+  if (!hx711_is_initialized()) return;
+  // Accept {"samples":N} or a plain number (Wizard UI action params)
+  if (!mg_json_get_num(params, "$.samples", &d)) mg_json_get_num(params, "$", &d);
+  samples = (int) d;
+  if (samples < 1) samples = TARE_SAMPLES_DEFAULT;
+  if (samples > TARE_SAMPLES_MAX) samples = TARE_SAMPLES_MAX;
+  sensor_sampler_request_tare(samples);
+  s_tare_running = true;
+  s_sensor_read.tare = true;
+}
+// Sample history: every sample of the sampling task, indexed by seq.
+// Single producer (sampling task) / single consumer (Mongoose loop):
+// the producer fills the slot, then publishes it by bumping the head
+static struct sensor_sample s_history[SENSOR_HISTORY_SIZE];
+static volatile uint32_t s_history_head = 0;  // Newest recorded seq
+
+void glue_record_sensor_sample(const struct sensor_sample *sample) {
+  s_history[sample->seq % SENSOR_HISTORY_SIZE] = *sample;
+  __sync_synchronize();
+  s_history_head = sample->seq;
+}
+
+// Copy up to `limit` samples after `since` into `out`, oldest first.
+// Returns the number copied, *head receives the newest recorded seq and
+// *more tells whether samples were left out because of `limit`
+static size_t history_collect(uint32_t since, size_t limit,
+                              struct sensor_sample *out, uint32_t *head,
+                              bool *more) {
+  uint32_t oldest, seq;
+  size_t count = 0;
+
+  *head = s_history_head;
+  // Oldest entry that cannot be overwritten while we copy it
+  oldest = *head > SENSOR_HISTORY_SIZE - 2 ? *head - (SENSOR_HISTORY_SIZE - 2) : 1;
+  if (since + 1 > oldest) oldest = since + 1;
+  for (seq = oldest; seq <= *head && count < limit; seq++) {
+    out[count] = s_history[seq % SENSOR_HISTORY_SIZE];
+    __sync_synchronize();
+    // Producer lapped us while copying: this and older entries are gone
+    if (out[count].seq != seq || s_history_head - seq >= SENSOR_HISTORY_SIZE - 1) {
+      continue;
+    }
+    count++;
+  }
+  *more = seq <= *head;
+  return count;
+}
+
+static size_t print_history(void (*out)(char, void *), void *ptr,
+                            va_list *ap) {
+  const struct sensor_sample *samples = va_arg(*ap, struct sensor_sample *);
+  size_t i, count = va_arg(*ap, size_t), len = 0;
+  for (i = 0; i < count; i++) {
+    const struct sensor_sample *s = &samples[i];
+    len += mg_xprintf(out, ptr, "%s[%lu,%lu,%ld,%ld,%d]", i == 0 ? "" : ",",
+                      (unsigned long) s->seq, (unsigned long) s->timestamp_ms,
+                      (long) s->weight, (long) s->distance, s->cup_true ? 1 : 0);
+  }
+  return len;
+}
+
+static void parse_history_query(struct mg_http_message *hm, uint32_t *since,
+                                uint32_t *limit) {
+  char buf[16];
+  *since = 0, *limit = SENSOR_HISTORY_BATCH_MAX;
+  if (mg_http_get_var(&hm->query, "since", buf, sizeof(buf)) > 0) {
+    mg_str_to_num(mg_str(buf), 10, since, sizeof(*since));
+  }
+  if (mg_http_get_var(&hm->query, "limit", buf, sizeof(buf)) > 0) {
+    mg_str_to_num(mg_str(buf), 10, limit, sizeof(*limit));
+  }
+  if (*limit == 0 || *limit > SENSOR_HISTORY_BATCH_MAX) {
+    *limit = SENSOR_HISTORY_BATCH_MAX;
+  }
+}
+
+// GET /api/sensor_history?since=SEQ&limit=N
+// Returns {"samples":[[seq,timestamp_ms,weight,distance,cup_true],...],
+//          "head":NEWEST_SEQ,"more":BOOL} with all samples after SEQ
+void glue_reply_sensor_history(struct mg_connection *c,
+                               struct mg_http_message *hm) {
+  uint32_t since, limit, head;
+  bool more;
+  size_t count;
+  struct sensor_sample *samples;
+  parse_history_query(hm, &since, &limit);
+  samples = (struct sensor_sample *) mg_calloc(limit, sizeof(*samples));
+  if (samples == NULL) {
+    mg_http_reply(c, 503, "", "Out of memory\n");
+    return;
+  }
+  count = history_collect(since, limit, samples, &head, &more);
+  mg_http_reply(c, 200, "Content-Type: application/json\r\n",
+                "{%m:[%M],%m:%lu,%m:%s}\n", MG_ESC("samples"), print_history,
+                samples, count, MG_ESC("head"), (unsigned long) head,
+                MG_ESC("more"), more ? "true" : "false");
+  mg_free(samples);
+}
+
+static size_t print_raw(void (*out)(char, void *), void *ptr, va_list *ap) {
+  const struct sensor_sample *samples = va_arg(*ap, struct sensor_sample *);
+  size_t i, count = va_arg(*ap, size_t), len = 0;
+  for (i = 0; i < count; i++) {
+    len += mg_xprintf(out, ptr, "%s[%lu,%ld]", i == 0 ? "" : ",",
+                      (unsigned long) samples[i].seq, (long) samples[i].raw);
+  }
+  return len;
+}
+
+// GET /api/sensor_raw?since=SEQ&limit=N: raw HX711 values for calibration
+// Returns {"samples":[[seq,raw],...],"head":NEWEST_SEQ,"more":BOOL}, raw
+// before tare, offset and multiplier
+void glue_reply_sensor_raw(struct mg_connection *c,
+                           struct mg_http_message *hm) {
+  uint32_t since, limit, head;
+  bool more;
+  size_t count;
+  struct sensor_sample *samples;
+  parse_history_query(hm, &since, &limit);
+  samples = (struct sensor_sample *) mg_calloc(limit, sizeof(*samples));
+  if (samples == NULL) {
+    mg_http_reply(c, 503, "", "Out of memory\n");
+    return;
+  }
+  count = history_collect(since, limit, samples, &head, &more);
+  mg_http_reply(c, 200, "Content-Type: application/json\r\n",
+                "{%m:[%M],%m:%lu,%m:%s}\n", MG_ESC("samples"), print_raw,
+                samples, count, MG_ESC("head"), (unsigned long) head,
+                MG_ESC("more"), more ? "true" : "false");
+  mg_free(samples);
+}
+
+// Packed binary format, little-endian, see SENSOR_BIN_* in mongoose_glue.h:
+// 12 byte header followed by `count` records of 5 x 32-bit words
+static uint8_t *put_u32le(uint8_t *p, uint32_t v) {
+  p[0] = (uint8_t) v, p[1] = (uint8_t) (v >> 8);
+  p[2] = (uint8_t) (v >> 16), p[3] = (uint8_t) (v >> 24);
+  return p + 4;
+}
+
+static void reply_bin(struct mg_connection *c, const struct sensor_sample *s,
+                      size_t count, uint32_t head, bool more, bool tare) {
+  size_t i, size = SENSOR_BIN_HEADER_SIZE + count * SENSOR_BIN_RECORD_SIZE;
+  uint8_t *buf = (uint8_t *) mg_calloc(1, size), *p = buf;
+  if (buf == NULL) {
+    mg_http_reply(c, 503, "", "Out of memory\n");
+    return;
+  }
+  *p++ = (uint8_t) SENSOR_BIN_MAGIC, *p++ = (uint8_t) (SENSOR_BIN_MAGIC >> 8);
+  *p++ = SENSOR_BIN_VERSION;
+  *p++ = more ? SENSOR_BIN_FLAG_MORE : 0;
+  p = put_u32le(p, head);
+  p = put_u32le(p, (uint32_t) count);
+  for (i = 0; i < count; i++) {
+    uint32_t flags = (s[i].cup_true ? SENSOR_BIN_FLAG_CUP : 0) |
+                     (tare ? SENSOR_BIN_FLAG_TARE : 0);
+    p = put_u32le(p, s[i].seq);
+    p = put_u32le(p, s[i].timestamp_ms);
+    p = put_u32le(p, (uint32_t) s[i].weight);
+    p = put_u32le(p, (uint32_t) s[i].distance);
+    p = put_u32le(p, flags);
+  }
+  mg_printf(c,
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/octet-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Content-Length: %lu\r\n\r\n",
+            (unsigned long) size);
+  mg_send(c, buf, size);
+  mg_free(buf);
+}
+
+// GET /api/sensor_read_bin: latest sample as a one-record binary batch
+void glue_reply_sensor_read_bin(struct mg_connection *c,
+                                struct mg_http_message *hm) {
+  struct sensor_sample sample;
+  sensor_sampler_get(&sample);
+  reply_bin(c, &sample, 1, sample.seq, false, s_sensor_read.tare);
+  (void) hm;
+}
+
+// GET /api/sensor_history_bin?since=SEQ&limit=N: binary /api/sensor_history
+void glue_reply_sensor_history_bin(struct mg_connection *c,
+                                   struct mg_http_message *hm) {
+  uint32_t since, limit, head;
+  bool more;
+  size_t count;
+  struct sensor_sample *samples;
+  parse_history_query(hm, &since, &limit);
+  samples = (struct sensor_sample *) mg_calloc(limit, sizeof(*samples));
+  if (samples == NULL) {
+    mg_http_reply(c, 503, "", "Out of memory\n");
+    return;
+  }
+  count = history_collect(since, limit, samples, &head, &more);
+  reply_bin(c, samples, count, head, more, false);
+  mg_free(samples);
+}
+
+static size_t print_perf(void (*out)(char, void *), void *ptr, va_list *ap) {
+  const struct perf_stat *stats = va_arg(*ap, struct perf_stat *);
+  size_t i, len = 0;
+  for (i = 0; i < PERF_PROBE_COUNT; i++) {
+    const char *name = perf_probe_name((enum perf_probe) i);
+    len += mg_xprintf(out, ptr, "%s%m:{%m:%lu,%m:%llu,%m:%lu}",
+                      i == 0 ? "" : ",", MG_ESC(name),
+                      MG_ESC("count"), (unsigned long) stats[i].count,
+                      MG_ESC("total_us"), (unsigned long long) stats[i].total_us,
+                      MG_ESC("max_us"), (unsigned long) stats[i].max_us);
+  }
+  return len;
+}
+
+// GET /api/perf: hot-path timing since the last reset (see perf.h)
+// Returns {"since_ms":T,"now_ms":T,"probes":{"NAME":{"count":N,
+//          "total_us":N,"max_us":N},...}}
+// POST /api/perf returns the same and then resets the counters
+void glue_reply_perf(struct mg_connection *c, struct mg_http_message *hm) {
+  struct perf_stat stats[PERF_PROBE_COUNT];
+  uint32_t since_ms;
+  perf_get(stats, &since_ms);
+  if (mg_strcmp(hm->method, mg_str("POST")) == 0) perf_reset();
+  mg_http_reply(c, 200, "Content-Type: application/json\r\n",
+                "{%m:%lu,%m:%lu,%m:{%M}}\n", MG_ESC("since_ms"),
+                (unsigned long) since_ms, MG_ESC("now_ms"),
+                (unsigned long) mg_millis(), MG_ESC("probes"), print_perf, stats);
+}
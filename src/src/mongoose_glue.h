@@ -16,7 +16,8 @@ extern "C" {
 #define WIZARD_ENABLE_HTTP_UI 1
 #define WIZARD_ENABLE_HTTP_UI_LOGIN 0
 
-#define WIZARD_ENABLE_WEBSOCKET 0
+#define WIZARD_ENABLE_WEBSOCKET 1
+#define WIZARD_WS_MIN_INTERVAL_MS 10  // Lower bound for /websocket?interval=
 
 #define WIZARD_ENABLE_MQTT 0
 #define WIZARD_MQTT_URL ""
@@ -118,10 +119,47 @@ struct sensor_read {
   bool tare;
   int weight;
   int distance;
+  uint32_t seq;         // Unsigned like /api/sensor_history, wraps at 2^32
+  uint32_t timestamp;   // ms since boot, wraps after ~49.7 days
+  int tare_offset;
 };
 void glue_get_sensor_read(struct sensor_read *);
 void glue_set_sensor_read(struct sensor_read *);
 
+// Tare action: POST /api/tare {"samples":N} averages N HX711 conversions.
+// The request is answered once the sampling task has set the new offset
+#define TARE_SAMPLES_DEFAULT 5
+#define TARE_SAMPLES_MAX 80
+bool glue_check_tare(void);
+void glue_start_tare(struct mg_str);
+
+// Sample history: ring buffer of every sampling task sample
+#define SENSOR_HISTORY_SIZE 1024      // Ring entries, power of two
+#define SENSOR_HISTORY_BATCH_MAX 256  // Max samples per response
+struct sensor_sample;
+void glue_record_sensor_sample(const struct sensor_sample *);
+void glue_reply_sensor_history(struct mg_connection *, struct mg_http_message *);
+
+// Raw HX711 values of the same ring for calibration (/api/sensor_raw)
+void glue_reply_sensor_raw(struct mg_connection *, struct mg_http_message *);
+
+// Packed binary sensor format (/api/sensor_read_bin, /api/sensor_history_bin)
+// Header, 12 bytes: u16 magic, u8 version, u8 flags, u32 head, u32 count
+// Record, 20 bytes: u32 seq, u32 timestamp_ms, i32 weight, i32 distance,
+//                   u32 flags. All little-endian
+#define SENSOR_BIN_MAGIC 0x4d57  // "WM"
+#define SENSOR_BIN_VERSION 1
+#define SENSOR_BIN_HEADER_SIZE 12
+#define SENSOR_BIN_RECORD_SIZE 20
+#define SENSOR_BIN_FLAG_MORE 1  // Header: batch truncated by limit
+#define SENSOR_BIN_FLAG_CUP 1   // Record: cup_true
+#define SENSOR_BIN_FLAG_TARE 2  // Record: tare
+void glue_reply_sensor_read_bin(struct mg_connection *, struct mg_http_message *);
+void glue_reply_sensor_history_bin(struct mg_connection *, struct mg_http_message *);
+
+// Hot-path timing counters (perf.h): GET /api/perf, POST resets
+void glue_reply_perf(struct mg_connection *, struct mg_http_message *);
+
 
 #ifdef __cplusplus
 }
@@ -60,6 +60,10 @@ typedef void (*custom_reply_func_t)(struct mg_connection *,
 typedef size_t (*file_read_func_t)(char *, size_t, void *, size_t);
 typedef bool (*file_write_func_t)(char *, size_t, void *, size_t);
 
+#if WIZARD_ENABLE_WEBSOCKET
+static void ws_set_interval(struct mg_connection *c, struct mg_http_message *hm);
+#endif
+
 struct mg_mgr g_mgr;  // Mongoose event manager
 
 #if WIZARD_ENABLE_HTTP || WIZARD_ENABLE_HTTPS
@@ -165,17 +169,32 @@ struct attribute s_sensor_read_attributes[] = {
   {"tare", "bool", NULL, offsetof(struct sensor_read, tare), 0, false},
   {"weight", "int", NULL, offsetof(struct sensor_read, weight), 0, false},
   {"distance", "int", NULL, offsetof(struct sensor_read, distance), 0, false},
+  {"seq", "uint", NULL, offsetof(struct sensor_read, seq), 0, true},
+  {"timestamp", "uint", NULL, offsetof(struct sensor_read, timestamp), 0, true},
+  {"tare_offset", "int", NULL, offsetof(struct sensor_read, tare_offset), 0, true},
   {NULL, NULL, NULL, 0, 0, false}
 };
 
 struct apihandler_data s_apihandler_sensor_settings = {{"sensor_settings", "data", false, 0, 0, 0UL}, s_sensor_settings_attributes, sizeof(struct sensor_settings), (void (*)(void *)) glue_get_sensor_settings, (void (*)(void *)) glue_set_sensor_settings};
 struct apihandler_data s_apihandler_settings = {{"settings", "data", false, 0, 0, 0UL}, s_settings_attributes, sizeof(struct settings), (void (*)(void *)) glue_get_settings, (void (*)(void *)) glue_set_settings};
 struct apihandler_data s_apihandler_sensor_read = {{"sensor_read", "data", false, 0, 0, 0UL}, s_sensor_read_attributes, sizeof(struct sensor_read), (void (*)(void *)) glue_get_sensor_read, (void (*)(void *)) glue_set_sensor_read};
+struct apihandler_action s_apihandler_tare = {{"tare", "action", false, 0, 0, 0UL}, glue_check_tare, glue_start_tare};
+struct apihandler_custom s_apihandler_sensor_history = {{"sensor_history", "custom", true, 0, 0, 0UL}, glue_reply_sensor_history};
+struct apihandler_custom s_apihandler_sensor_raw = {{"sensor_raw", "custom", true, 0, 0, 0UL}, glue_reply_sensor_raw};
+struct apihandler_custom s_apihandler_sensor_read_bin = {{"sensor_read_bin", "custom", true, 0, 0, 0UL}, glue_reply_sensor_read_bin};
+struct apihandler_custom s_apihandler_sensor_history_bin = {{"sensor_history_bin", "custom", true, 0, 0, 0UL}, glue_reply_sensor_history_bin};
+struct apihandler_custom s_apihandler_perf = {{"perf", "custom", true, 0, 0, 0UL}, glue_reply_perf};
 
 static struct apihandler *s_apihandlers[] = {
   (struct apihandler *) &s_apihandler_sensor_settings,
   (struct apihandler *) &s_apihandler_settings,
-  (struct apihandler *) &s_apihandler_sensor_read
+  (struct apihandler *) &s_apihandler_sensor_read,
+  (struct apihandler *) &s_apihandler_sensor_history,
+  (struct apihandler *) &s_apihandler_sensor_raw,
+  (struct apihandler *) &s_apihandler_sensor_read_bin,
+  (struct apihandler *) &s_apihandler_sensor_history_bin,
+  (struct apihandler *) &s_apihandler_perf,
+  (struct apihandler *) &s_apihandler_tare
 };
 
 static struct apihandler *get_api_handler(struct mg_str name) {
@@ -433,6 +452,9 @@ size_t print_struct(void (*out)(char, void *), void *ptr, va_list *ap) {
     len += mg_xprintf(out, ptr, "%s%m:", i == 0 ? "" : ",", MG_ESC(a[i].name));
     if (strcmp(a[i].type, "int") == 0) {
       len += mg_xprintf(out, ptr, "%d", *(int *) buf);
+    } else if (strcmp(a[i].type, "uint") == 0) {
+      // u32 counters (seq, timestamp), same values as /api/sensor_history
+      len += mg_xprintf(out, ptr, "%lu", (unsigned long) *(uint32_t *) buf);
     } else if (strcmp(a[i].type, "double") == 0) {
       const char *fmt = a[i].format;
       if (fmt == NULL) fmt = "%g";
@@ -462,6 +484,12 @@ static void populate_struct_from_json(struct mg_str json, char *tmp,
         int v = (int) d;
         memcpy(tmp + a->offset, &v, sizeof(v));
       }
+    } else if (strcmp(a->type, "uint") == 0) {
+      double d;
+      if (mg_json_get_num(json, jpath, &d)) {
+        uint32_t v = (uint32_t) d;
+        memcpy(tmp + a->offset, &v, sizeof(v));
+      }
     } else if (strcmp(a->type, "bool") == 0) {
       mg_json_get_bool(json, jpath, (bool *) (tmp + a->offset));
     } else if (strcmp(a->type, "double") == 0) {
@@ -472,8 +500,17 @@ static void populate_struct_from_json(struct mg_str json, char *tmp,
   }
 }
 
+// Settings-type endpoints: reads carry a CRC of the values as ETag, and a
+// request whose If-None-Match still matches gets 304 without a body. A write
+// that changes the values bumps s_device_change_version (handle_object), so
+// /api/heartbeat tells clients when to revalidate
+static bool has_etag(const struct apihandler_data *h) {
+  return h == &s_apihandler_sensor_settings || h == &s_apihandler_settings;
+}
+
 static void handle_object(struct mg_connection *c, struct mg_http_message *hm,
                           struct apihandler_data *h) {
+  char headers[100];
   void *data = mg_calloc(1, h->data_size);
   h->getter(data);
   if (hm->body.len > 0 && h->data_size > 0) {
@@ -486,7 +523,22 @@ static void handle_object(struct mg_connection *c, struct mg_http_message *hm,
     mg_free(tmp);
     h->getter(data);  // Re-sync again after setting
   }
-  mg_http_reply(c, 200, JSON_HEADERS, "{%M}\n", print_struct, h->attributes,
+  if (has_etag(h)) {
+    struct mg_str *inm = mg_http_get_header(hm, "If-None-Match");
+    char etag[12];
+    mg_snprintf(etag, sizeof(etag), "\"%08lx\"",
+                (unsigned long) mg_crc32(0, (char *) data, h->data_size));
+    if (hm->body.len == 0 && inm != NULL && mg_strcmp(*inm, mg_str(etag)) == 0) {
+      mg_snprintf(headers, sizeof(headers), NO_CACHE_HEADERS "ETag: %s\r\n", etag);
+      mg_http_reply(c, 304, headers, "");
+      mg_free(data);
+      return;
+    }
+    mg_snprintf(headers, sizeof(headers), JSON_HEADERS "ETag: %s\r\n", etag);
+  } else {
+    mg_snprintf(headers, sizeof(headers), "%s", JSON_HEADERS);
+  }
+  mg_http_reply(c, 200, headers, "{%M}\n", print_struct, h->attributes,
                 data, 0);
   mg_free(data);
 }
@@ -702,6 +754,9 @@ static void http_ev_handler(struct mg_connection *c, int ev, void *ev_data) {
       mg_http_reply(c, 200, JSON_HEADERS, "true\n");
     } else if (mg_match(hm->uri, mg_str("/websocket"), NULL)) {
       mg_ws_upgrade(c, hm, NULL);
+#if WIZARD_ENABLE_WEBSOCKET
+      ws_set_interval(c, hm);
+#endif
     } else if (mg_match(hm->uri, mg_str("/api/heartbeat"), NULL)) {
       mg_http_reply(c, 200, JSON_HEADERS, "{%m:%lu}\n", MG_ESC("version"),
                     s_device_change_version);
@@ -755,11 +810,29 @@ struct ws_handler {
   struct apihandler *h;
 };
 // We keep WS timers inside c->data, that's why the list of WS timers
-// should fit there.
+// should fit there. The last slot holds the per-connection push interval.
 #define MG_DATA_BUF_SIZE sizeof(((struct mg_connection *) 0)->data)
-#define WS_MAX (MG_DATA_BUF_SIZE / sizeof(uint64_t))
+#define WS_MAX (MG_DATA_BUF_SIZE / sizeof(uint64_t) - 1)
+
+struct ws_state {
+  uint64_t timers[WS_MAX];  // Reporter timers
+  uint64_t interval_ms;     // Client requested interval, 0: reporter default
+};
 
 static struct ws_handler s_ws_handlers[WS_MAX];
+
+// Clients can request a push interval with /websocket?interval=MS
+static void ws_set_interval(struct mg_connection *c,
+                            struct mg_http_message *hm) {
+  struct ws_state *ws = (struct ws_state *) c->data;
+  char buf[16];
+  unsigned ms = 0;
+  if (mg_http_get_var(&hm->query, "interval", buf, sizeof(buf)) > 0 &&
+      mg_str_to_num(mg_str(buf), 10, &ms, sizeof(ms))) {
+    if (ms < WIZARD_WS_MIN_INTERVAL_MS) ms = WIZARD_WS_MIN_INTERVAL_MS;
+    ws->interval_ms = ms;
+  }
+}
 // static size_t s_ws_handlers_count;
 
 void mongoose_add_ws_reporter(unsigned ms, const char *name) {
@@ -785,7 +858,8 @@ static void send_websocket_data(void) {
   uint64_t now = mg_millis();
 
   for (c = g_mgr.conns; c != NULL; c = c->next) {
-    uint64_t *timers = (uint64_t *) &c->data[0];
+    struct ws_state *ws = (struct ws_state *) c->data;
+    uint64_t *timers = ws->timers;
     size_t i;
 
     if (c->is_websocket == 0) continue;  // Not a websocket connection? Skip
@@ -794,7 +868,9 @@ static void send_websocket_data(void) {
     for (i = 0; i < WS_MAX; i++) {
       if (s_ws_handlers[i].timeout_ms == 0) break;
       if (s_ws_handlers[i].h == NULL) break;
-      if (mg_timer_expired(&timers[i], s_ws_handlers[i].timeout_ms, now)) {
+      unsigned ms = ws->interval_ms > 0 ? (unsigned) ws->interval_ms
+                                        : s_ws_handlers[i].timeout_ms;
+      if (mg_timer_expired(&timers[i], ms, now)) {
         struct apihandler *ah = s_ws_handlers[i].h;
         if (strcmp(ah->type, "data") == 0) {
           struct apihandler_data *h = (struct apihandler_data *) ah;
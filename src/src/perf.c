@@ -0,0 +1,61 @@
+// SPDX-FileCopyrightText: 2025
+// SPDX-License-Identifier: GPL-2.0-only or commercial
+// Hot-path timing counters (see perf.h)
+//
+// Probes run on both cores (sampling task and loop()), so the counters
+// are updated under a spinlock; a probe costs two micros() calls and a
+// few additions.
+
+#include "perf.h"
+#include <Arduino.h>
+#include <string.h>
+
+static const char *s_names[PERF_PROBE_COUNT] = {
+  "hx711_read_raw", "hc_sr04_read_distance", "glue_get_sensor_read",
+  "mongoose_poll"
+};
+
+static struct perf_stat s_stats[PERF_PROBE_COUNT];
+static uint32_t s_since_ms = 0;
+static portMUX_TYPE s_lock = portMUX_INITIALIZER_UNLOCKED;
+
+const char *perf_probe_name(enum perf_probe probe) {
+  return probe < PERF_PROBE_COUNT ? s_names[probe] : "";
+}
+
+uint32_t perf_begin(void) {
+#if PERF_ENABLE
+  return micros();
+#else
+  return 0;
+#endif
+}
+
+void perf_end(enum perf_probe probe, uint32_t start) {
+#if PERF_ENABLE
+  uint32_t us = micros() - start;  // Unsigned math survives the wrap
+  struct perf_stat *s = &s_stats[probe];
+  portENTER_CRITICAL(&s_lock);
+  s->count++;
+  s->total_us += us;
+  if (us > s->max_us) s->max_us = us;
+  portEXIT_CRITICAL(&s_lock);
+#else
+  (void) probe, (void) start;
+#endif
+}
+
+void perf_get(struct perf_stat *stats, uint32_t *since_ms) {
+  portENTER_CRITICAL(&s_lock);
+  memcpy(stats, s_stats, sizeof(s_stats));
+  *since_ms = s_since_ms;
+  portEXIT_CRITICAL(&s_lock);
+}
+
+void perf_reset(void) {
+  uint32_t now = millis();
+  portENTER_CRITICAL(&s_lock);
+  memset(s_stats, 0, sizeof(s_stats));
+  s_since_ms = now;
+  portEXIT_CRITICAL(&s_lock);
+}
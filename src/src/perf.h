@@ -0,0 +1,52 @@
+// SPDX-FileCopyrightText: 2025
+// SPDX-License-Identifier: GPL-2.0-only or commercial
+// Hot-path timing: call count, cumulative and max microseconds per probe
+
+#ifndef PERF_H
+#define PERF_H
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#include <stdint.h>
+
+// Set to 0 to compile the probes out
+#ifndef PERF_ENABLE
+#define PERF_ENABLE 1
+#endif
+
+enum perf_probe {
+  PERF_HX711_READ_RAW,         // Sampling task, one HX711 conversion
+  PERF_HC_SR04_READ_DISTANCE,  // Sampling task, one ultrasonic ping
+  PERF_GLUE_GET_SENSOR_READ,   // HTTP/WebSocket sensor_read snapshot
+  PERF_MONGOOSE_POLL,          // One loop() iteration, includes the poll wait
+  PERF_PROBE_COUNT
+};
+
+struct perf_stat {
+  uint32_t count;     // Timed calls
+  uint64_t total_us;  // Cumulative time
+  uint32_t max_us;    // Longest call
+};
+
+// Name of a probe as reported by /api/perf
+const char *perf_probe_name(enum perf_probe probe);
+
+// Start of a timed section, pass the result to perf_end()
+uint32_t perf_begin(void);
+
+// End of a timed section, callable from any task or core
+void perf_end(enum perf_probe probe, uint32_t start);
+
+// Copy all PERF_PROBE_COUNT counters and the millis() of the last reset
+void perf_get(struct perf_stat *stats, uint32_t *since_ms);
+
+// Zero all counters
+void perf_reset(void);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif  // PERF_H
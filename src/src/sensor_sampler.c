@@ -0,0 +1,140 @@
+// SPDX-FileCopyrightText: 2025
+// SPDX-License-Identifier: GPL-2.0-only or commercial
+// Background sensor acquisition task (HX711 + HC-SR04)
+//
+// The task owns both sensors and publishes every HX711 conversion into a
+// double buffer. Readers (HTTP/WebSocket handlers) only copy the latest
+// slot, so they never wait for DOUT or for an ultrasonic echo.
+
+#include "sensor_sampler.h"
+#include "hc_sr04.h"
+#include "hx711.h"
+#include "perf.h"
+#include <Arduino.h>
+
+#define SAMPLER_STACK_SIZE 4096
+#define SAMPLER_PRIORITY 2
+
+// Double buffer: slot (seq & 1) holds the published sample, the writer
+// fills the other slot and then bumps s_seq
+static struct sensor_sample s_samples[2];
+static volatile uint32_t s_seq = 0;
+
+static portMUX_TYPE s_lock = portMUX_INITIALIZER_UNLOCKED;
+static int32_t s_offset = 0;
+static int32_t s_multiplier = 1000;
+static int32_t s_distance_trig = 0;
+static int s_tare_samples = 0;    // Requested tare sample count
+static int s_tare_remaining = 0;  // Conversions still to collect
+static int64_t s_tare_sum = 0;
+
+static int32_t s_raw = 0;
+static int32_t s_distance = 0;
+static sensor_sampler_fn_t s_callback = NULL;
+
+static void collect_tare(int32_t raw) {
+  portENTER_CRITICAL(&s_lock);
+  if (s_tare_remaining > 0) {
+    s_tare_sum += raw;
+    if (--s_tare_remaining == 0) {
+      hx711_set_tare_offset((int32_t) (s_tare_sum / s_tare_samples));
+    }
+  }
+  portEXIT_CRITICAL(&s_lock);
+}
+
+static void publish(void) {
+  struct sensor_sample *s = &s_samples[(s_seq + 1) & 1];
+  int32_t offset, multiplier, distance_trig;
+
+  portENTER_CRITICAL(&s_lock);
+  offset = s_offset, multiplier = s_multiplier, distance_trig = s_distance_trig;
+  portEXIT_CRITICAL(&s_lock);
+
+  s->seq = s_seq + 1;
+  s->timestamp_ms = millis();
+  s->raw = s_raw;
+  s->weight = hx711_is_initialized()
+                  ? hx711_raw_to_weight(s_raw, offset, multiplier)
+                  : 0;
+  s->distance = hc_sr04_is_initialized() ? s_distance : 0;
+  s->cup_true = hc_sr04_is_initialized() && s_distance < distance_trig;
+  __sync_synchronize();  // Slot must be complete before it is published
+  s_seq = s->seq;
+  if (s_callback != NULL) s_callback(s);
+}
+
+static void sampler_task(void *arg) {
+  uint32_t next_ping = millis();
+  (void) arg;
+
+  for (;;) {
+    bool updated = false;
+
+    if (hc_sr04_is_initialized() && (int32_t) (millis() - next_ping) >= 0) {
+      uint32_t start = perf_begin();
+      s_distance = hc_sr04_read_distance();
+      perf_end(PERF_HC_SR04_READ_DISTANCE, start);
+      next_ping = millis() + SENSOR_SAMPLER_PING_MS;
+      updated = !hx711_is_initialized();  // Else publish with next weight
+    }
+
+    // Poll DOUT instead of busy-waiting inside hx711_read_raw()
+    if (hx711_is_ready()) {
+      uint32_t start = perf_begin();
+      s_raw = hx711_read_raw();
+      perf_end(PERF_HX711_READ_RAW, start);
+      collect_tare(s_raw);
+      updated = true;
+    }
+
+    if (updated) publish();
+    vTaskDelay(1);  // Yield, keeps the idle task watchdog fed
+  }
+}
+
+void sensor_sampler_set_callback(sensor_sampler_fn_t fn) {
+  s_callback = fn;
+}
+
+void sensor_sampler_start(uint8_t core) {
+  xTaskCreatePinnedToCore(sampler_task, "sensor_sampler", SAMPLER_STACK_SIZE,
+                          NULL, SAMPLER_PRIORITY, NULL, core);
+}
+
+void sensor_sampler_set_calibration(int32_t offset, int32_t multiplier,
+                                    int32_t distance_trig) {
+  portENTER_CRITICAL(&s_lock);
+  s_offset = offset;
+  s_multiplier = multiplier;
+  s_distance_trig = distance_trig;
+  portEXIT_CRITICAL(&s_lock);
+}
+
+bool sensor_sampler_get(struct sensor_sample *sample) {
+  uint32_t seq;
+  do {
+    seq = s_seq;
+    __sync_synchronize();
+    *sample = s_samples[seq & 1];
+    __sync_synchronize();
+  } while (seq != s_seq);  // Writer moved on while copying, retry
+  return seq != 0;
+}
+
+void sensor_sampler_request_tare(int samples) {
+  if (samples < 1) samples = 1;
+  portENTER_CRITICAL(&s_lock);
+  s_tare_samples = samples;
+  s_tare_remaining = samples;
+  s_tare_sum = 0;
+  portEXIT_CRITICAL(&s_lock);
+}
+
+bool sensor_sampler_tare_pending(void) {
+  bool pending;
+  portENTER_CRITICAL(&s_lock);
+  pending = s_tare_remaining > 0;
+  portEXIT_CRITICAL(&s_lock);
+  return pending;
+}
@@ -0,0 +1,57 @@
+// SPDX-FileCopyrightText: 2025
+// SPDX-License-Identifier: GPL-2.0-only or commercial
+// Background sensor acquisition task (HX711 + HC-SR04)
+
+#ifndef SENSOR_SAMPLER_H
+#define SENSOR_SAMPLER_H
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#include <stdint.h>
+#include <stdbool.h>
+
+// Minimum time between two HC-SR04 pings (lets old echoes die out)
+#define SENSOR_SAMPLER_PING_MS 60
+
+// One acquired sample
+struct sensor_sample {
+  uint32_t seq;           // Sample sequence number, 0: no sample yet
+  uint32_t timestamp_ms;  // millis() when the sample was taken
+  int32_t raw;            // HX711 raw ADC value
+  int32_t weight;         // Calibrated weight in grams
+  int32_t distance;       // HC-SR04 distance in mm
+  bool cup_true;          // distance < distance_trig
+};
+
+// Called from the sampling task for every published sample
+typedef void (*sensor_sampler_fn_t)(const struct sensor_sample *sample);
+
+// Set a function receiving every sample (NULL to disable)
+// Must be set before sensor_sampler_start(), runs on the sampler core
+void sensor_sampler_set_callback(sensor_sampler_fn_t fn);
+
+// Start the sampling task pinned to the given core
+// Sensors must be initialized before (hx711_init, hc_sr04_init)
+void sensor_sampler_start(uint8_t core);
+
+// Set calibration used for weight and cup detection of new samples
+void sensor_sampler_set_calibration(int32_t offset, int32_t multiplier,
+                                    int32_t distance_trig);
+
+// Copy the latest sample, never blocks on the sensors
+// Returns false if no sample has been taken yet
+bool sensor_sampler_get(struct sensor_sample *sample);
+
+// Request a tare averaged over the next `samples` HX711 conversions
+void sensor_sampler_request_tare(int samples);
+
+// Check if a requested tare is still collecting samples
+bool sensor_sampler_tare_pending(void);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif  // SENSOR_SAMPLER_H
@@ -2,12 +2,17 @@
 #include "src/mongoose_glue.h"
 #include "src/hc_sr04.h"
 #include "src/hx711.h"
+#include "src/sensor_sampler.h"
+#include "src/perf.h"
 #include <Arduino.h>
 
 #define SS_PIN 14            // Slave select pin
 #define RST_PIN 9            // Reset pin for W5500
 #define LED_PIN LED_BUILTIN  // LED pin
 
+#define WS_SENSOR_READ_MS 100  // Default sensor_read push interval on /websocket
+#define SENSOR_CORE 0          // Sampling task core, loop() runs on core 1
+
 void spi_begin(void *spi) {
   digitalWrite(SS_PIN, LOW);
   SPI.beginTransaction(SPISettings());
@@ -39,6 +44,14 @@ void setup() {
   // Pinout from FSD: GPIO35 DT (DOUT), GPIO36 SCK
   hx711_init(35, 36);
 
+  // Sample both sensors in a background task on the other core, so the
+  // HTTP/WebSocket handlers only copy the latest snapshot
+  struct sensor_settings ss;
+  glue_get_sensor_settings(&ss);
+  sensor_sampler_set_calibration(ss.offset, ss.linear, ss.distance_trig);
+  sensor_sampler_set_callback(glue_record_sensor_sample);  // /api/sensor_history
+  sensor_sampler_start(SENSOR_CORE);
+
   // Reset W5500
   digitalWrite(RST_PIN, LOW);
   delay(50);
@@ -52,8 +65,15 @@ void setup() {
   mg_log_set(MG_LL_DEBUG);
 
   mongoose_init();
+
+  // Push sensor_read frames to /websocket clients instead of HTTP polling.
+  // Clients may override the interval with /websocket?interval=MS
+  mongoose_add_ws_reporter(WS_SENSOR_READ_MS, "sensor_read");
 }
 
 void loop() {
+  // Includes up to 10 ms waiting for network events in mg_mgr_poll()
+  uint32_t start = perf_begin();
   mongoose_poll();
+  perf_end(PERF_MONGOOSE_POLL, start);
 }
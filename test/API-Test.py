@@ -1,31 +1,27 @@
 #!/usr/bin/env python3
-import requests
+from sensor_client import SensorClient
 
 BASE = "http://192.168.1.221"  # IP des Moduls anpassen
 
-def get_weight():
-    r = requests.get(f"{BASE}/api/weight", timeout=2)
-    r.raise_for_status()
-    print("weight:", r.json())
+client = SensorClient(BASE, timeout=2)
 
-def get_glass():
-    r = requests.get(f"{BASE}/api/glass", timeout=2)
-    r.raise_for_status()
-    print("glass:", r.json())
+def get_sensor_read():
+    print("sensor_read:", client.get_sensor_read())
 
-def get_status():
-    r = requests.get(f"{BASE}/api/status", timeout=2)
-    r.raise_for_status()
-    print("status:", r.json())
+def get_sensor_settings():
+    print("sensor_settings:", client.get_sensor_settings())
+
+def get_settings():
+    print("settings:", client.get_settings())
 
 def post_tare():
-    r = requests.post(f"{BASE}/api/tare", timeout=2)
-    r.raise_for_status()
-    print("tare:", r.json())
+    print("tare:", client.tare())
 
 if __name__ == "__main__":
-    get_weight()
-    get_glass()
-    get_status()
+    get_sensor_read()
+    get_sensor_settings()
+    get_settings()
     post_tare()
-    get_weight()  # nach Tare
+    get_sensor_read()  # nach Tare
+    print("stats:", client.stats)
+    client.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Fleet Monitor GUI
+Shows weight, distance, cup state, latency and error rate of many ESP32
+Weight Modules in one table. All modules are polled (or streamed) from a
+single asyncio event loop, see fleet.py. Latency is the request round-trip
+of polling; streams make no requests and show "--".
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from fleet import FleetMonitor, parse_addresses
+
+COLUMNS = (
+    ("weight", "Weight (g)", 90),
+    ("distance", "Distance (mm)", 100),
+    ("cup", "Cup", 50),
+    ("latency", "Latency (ms)", 100),
+    ("error_rate", "Errors", 70),
+    ("status", "Status", 260),
+)
+
+
+class FleetMonitorGUI:
+    def __init__(self, root, addresses, update_interval_ms=100, stream=False,
+                 refresh_ms=200):
+        self.root = root
+        self.addresses = addresses
+        self.update_interval_ms = update_interval_ms
+        self.stream = stream
+        self.refresh_ms = refresh_ms
+        self.running = True
+        self.row_versions = {}  # address -> DeviceStatus.version shown
+
+        # Setup UI
+        self.setup_ui()
+
+        # One background thread / event loop for the whole fleet
+        self.monitor = FleetMonitor(addresses, interval_ms=update_interval_ms,
+                                    stream=stream)
+        self.monitor.start()
+
+        # Schedule first update
+        self.scheduled_update()
+
+        # Handle window close
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def setup_ui(self):
+        """Create the GUI layout"""
+        self.root.title("Weight Module Fleet Monitor")
+        self.root.geometry("820x600")
+        self.root.resizable(True, True)
+
+        # Configure style
+        style = ttk.Style()
+        style.theme_use('clam')
+
+        # --- Top Frame: Fleet Info ---
+        top_frame = ttk.LabelFrame(self.root, text="Fleet", padding=10)
+        top_frame.pack(fill="x", padx=10, pady=10)
+
+        ttk.Label(top_frame, text="Modules:").pack(side="left")
+        ttk.Label(top_frame, text=str(len(self.addresses)), foreground="blue").pack(side="left", padx=10)
+
+        ttk.Label(top_frame, text="Online:").pack(side="left", padx=(20, 0))
+        self.online_label = ttk.Label(top_frame, text="0", foreground="green")
+        self.online_label.pack(side="left", padx=10)
+
+        ttk.Label(top_frame, text="Update Interval:").pack(side="left", padx=(20, 0))
+        ttk.Label(top_frame, text=f"{self.update_interval_ms}ms", foreground="blue").pack(side="left", padx=10)
+
+        # --- Table ---
+        table_frame = ttk.Frame(self.root)
+        table_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        self.table = ttk.Treeview(table_frame, columns=[c[0] for c in COLUMNS])
+        self.table.heading("#0", text="Module")
+        self.table.column("#0", width=130, stretch=False)
+        for name, title, width in COLUMNS:
+            if name == "latency" and self.stream:
+                title = "Latency (n/a)"  # Pushed frames have no round-trip
+            self.table.heading(name, text=title)
+            self.table.column(name, width=width, anchor="e" if name != "status" else "w",
+                              stretch=name == "status")
+        self.table.tag_configure("offline", foreground="red")
+        self.table.tag_configure("cup", foreground="#2980b9")
+
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+
+        for address in self.addresses:
+            self.table.insert("", "end", iid=address, text=address,
+                              values=("--",) * len(COLUMNS), tags=("offline",))
+
+        # --- Control Frame ---
+        control_frame = ttk.Frame(self.root)
+        control_frame.pack(fill="x", padx=10, pady=(0, 10))
+        ttk.Button(control_frame, text="Exit", command=self.on_closing).pack(side="left", padx=5)
+
+    def scheduled_update(self):
+        """Update UI elements from main thread"""
+        if self.running:
+            self.update_display()
+            self.root.after(self.refresh_ms, self.scheduled_update)
+
+    def update_display(self):
+        """Refresh the rows that changed since the last refresh"""
+        online = 0
+        for status in self.monitor.snapshot():
+            online += status.online
+            if self.row_versions.get(status.address) == status.version:
+                continue  # Idle row, skip the Tk call
+            self.row_versions[status.address] = status.version
+            self.table.item(status.address, values=self.format_row(status),
+                            tags=self.row_tags(status))
+        self.online_label.config(text=str(online))
+
+    @staticmethod
+    def format_row(status):
+        """Table cells of one DeviceStatus"""
+        def cell(value, fmt="{}"):
+            return "--" if value is None else fmt.format(value)
+
+        if status.last_error:
+            state = status.last_error
+        else:
+            state = f"OK (seq {status.seq})"
+        latency = None if status.latency_s is None else status.latency_s * 1000.0
+        cup = None if status.cup_true is None else ("yes" if status.cup_true else "no")
+        return (
+            cell(status.weight),
+            cell(status.distance),
+            cell(cup),
+            cell(latency, "{:.1f}"),
+            f"{status.error_rate:.1%}",
+            state,
+        )
+
+    @staticmethod
+    def row_tags(status):
+        if not status.online:
+            return ("offline",)
+        return ("cup",) if status.cup_true else ()
+
+    def on_closing(self):
+        """Handle window close event"""
+        self.running = False
+        self.monitor.stop()
+        self.root.destroy()
+
+
+def main():
+    # Configuration
+    DEVICE_IPS = "192.168.1.220-235"  # List and/or ranges of module addresses
+    UPDATE_INTERVAL_MS = 100           # Per-module poll interval
+    USE_WEBSOCKET = False              # Stream /websocket pushes instead of polling
+
+    root = tk.Tk()
+    app = FleetMonitorGUI(root, parse_addresses(DEVICE_IPS),
+                          update_interval_ms=UPDATE_INTERVAL_MS, stream=USE_WEBSOCKET)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
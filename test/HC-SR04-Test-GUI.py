@@ -4,44 +4,68 @@ HC-SR04 Ultrasonic Sensor Test GUI
 Displays live distance readings from the ESP32 Weight Module via REST API
 """
 
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk
-import requests
-import threading
-from collections import deque
 from datetime import datetime
 
+from plot_panel import LodBuffer, PlotPanel, SPAN_CHOICES
+from rolling_stats import RollingStats, WINDOW_SIZES
+from sensor_pipeline import SensorPipeline
+from timing import STAGE_QUEUE, STAGE_RENDER
+
 class SensorTestGUI:
-    def __init__(self, root, base_url="http://192.168.1.221", update_interval_ms=100):
+    def __init__(self, root, base_url="http://192.168.1.221", update_interval_ms=100,
+                 stream=False, acquisition=False, pipeline=None, record=None,
+                 replay=None, replay_speed=1.0):
         self.root = root
         self.base_url = base_url
         self.update_interval_ms = update_interval_ms
+        self.stream = stream
         self.running = True
+        self.is_window = isinstance(root, (tk.Tk, tk.Toplevel))  # Else embedded panel
+        
+        # One fetch pipeline per device: standalone views own theirs, the
+        # dashboard passes one shared by all of its views
+        self.owns_pipeline = pipeline is None
+        if pipeline is None:
+            pipeline = SensorPipeline(base_url, update_interval_ms, stream=stream,
+                                      acquisition=acquisition, timeout=2, record=record,
+                                      replay=replay, replay_speed=replay_speed)
+        self.pipeline = pipeline
+        self.client = pipeline.client
         
         # Data storage
-        self.readings = deque(maxlen=100)  # Keep last 100 readings
+        self.stats = RollingStats(window=100)  # O(1) rolling window, resizable
+        self.history = LodBuffer()  # Full history for the plot
         self.last_error = None
         self.error_count = 0
         self.success_count = 0
+        self.received = None  # perf_counter() of the oldest reading not shown yet
+        self.received_lock = threading.Lock()  # Set by the pipeline, taken by Tk
         
         # Setup UI
         self.setup_ui()
         
-        # Start update thread
-        self.update_thread = threading.Thread(target=self.update_loop, daemon=True)
-        self.update_thread.start()
+        # Subscribe to the fetch pipeline
+        self.subscription = self.pipeline.subscribe(self.on_reading, self.on_error)
+        if self.owns_pipeline:
+            self.pipeline.start()
         
         # Schedule first update
         self.scheduled_update()
         
         # Handle window close
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        if self.is_window:
+            self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
     def setup_ui(self):
         """Create the GUI layout"""
-        self.root.title("HC-SR04 Ultrasonic Sensor Test")
-        self.root.geometry("600x500")
-        self.root.resizable(True, True)
+        if self.is_window:
+            self.root.title("HC-SR04 Ultrasonic Sensor Test")
+            self.root.geometry("600x700")
+            self.root.resizable(True, True)
         
         # Configure style
         style = ttk.Style()
@@ -72,6 +96,22 @@ class SensorTestGUI:
         self.time_label = tk.Label(display_frame, text="Last update: --", font=("Arial", 10))
         self.time_label.pack(pady=10)
         
+        # --- Plot Frame: Time Series ---
+        plot_frame = ttk.LabelFrame(self.root, text="History", padding=10)
+        plot_frame.pack(fill="x", padx=10, pady=10)
+        
+        self.plot = PlotPanel(plot_frame, self.history, color="#2ecc71")
+        self.plot.pack(fill="x")
+        
+        span_row = ttk.Frame(plot_frame)
+        span_row.pack(fill="x", pady=(5, 0))
+        ttk.Label(span_row, text="Span:").pack(side="left")
+        self.span_var = tk.StringVar(value="10k")
+        span_box = ttk.Combobox(span_row, textvariable=self.span_var, width=6,
+                                values=[name for name, _ in SPAN_CHOICES], state="readonly")
+        span_box.bind("<<ComboboxSelected>>", self.change_span)
+        span_box.pack(side="left", padx=5)
+        
         # --- Bottom Frame: Statistics ---
         stats_frame = ttk.LabelFrame(self.root, text="Statistics", padding=10)
         stats_frame.pack(fill="x", padx=10, pady=10)
@@ -107,6 +147,11 @@ class SensorTestGUI:
         self.error_label = ttk.Label(stats_grid, text="None", foreground="darkgreen")
         self.error_label.grid(row=2, column=1, columnspan=5, sticky="w", padx=5)
         
+        # Client hot-path timing (connect, request, parse, queue, render)
+        ttk.Label(stats_grid, text="Timing:").grid(row=3, column=0, sticky="w", padx=5, pady=5)
+        self.timing_label = ttk.Label(stats_grid, text="--", foreground="gray")
+        self.timing_label.grid(row=3, column=1, columnspan=5, sticky="w", padx=5)
+        
         # --- Control Frame ---
         control_frame = ttk.Frame(self.root)
         control_frame.pack(fill="x", padx=10, pady=10)
@@ -115,66 +160,66 @@ class SensorTestGUI:
         self.pause_button.pack(side="left", padx=5)
         
         ttk.Button(control_frame, text="Clear Stats", command=self.clear_stats).pack(side="left", padx=5)
-        ttk.Button(control_frame, text="Exit", command=self.on_closing).pack(side="left", padx=5)
+        
+        ttk.Label(control_frame, text="Window:").pack(side="left", padx=(20, 0))
+        self.window_var = tk.StringVar(value=str(self.stats.window))
+        window_box = ttk.Combobox(control_frame, textvariable=self.window_var, width=9,
+                                  values=[str(n) for n in WINDOW_SIZES], state="readonly")
+        window_box.bind("<<ComboboxSelected>>", self.change_window)
+        window_box.pack(side="left", padx=5)
+        self.profile_button = ttk.Button(control_frame, text="Profile", command=self.toggle_profile)
+        self.profile_button.pack(side="left", padx=5)
+        if self.is_window:
+            ttk.Button(control_frame, text="Exit", command=self.on_closing).pack(side="left", padx=5)
         
         self.paused = False
     
-    def fetch_sensor_data(self):
-        """Fetch sensor data from API"""
-        try:
-            response = requests.get(
-                f"{self.base_url}/api/sensor_read",
-                timeout=2
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            distance = data.get("distance", -1)
-            if distance >= 0:
-                self.readings.append(distance)
-                self.success_count += 1
-                self.last_error = None
-                return distance
-            else:
-                self.error_count += 1
-                self.last_error = "Invalid sensor reading (distance < 0)"
-                return None
-                
-        except requests.exceptions.Timeout:
-            self.error_count += 1
-            self.last_error = "Connection timeout"
-            return None
-        except requests.exceptions.ConnectionError:
-            self.error_count += 1
-            self.last_error = "Connection refused - check device IP"
-            return None
-        except requests.exceptions.HTTPError as e:
-            self.error_count += 1
-            self.last_error = f"HTTP Error: {e.response.status_code}"
-            return None
-        except Exception as e:
+    def handle_reading(self, data):
+        """Store one sensor_read record"""
+        distance = data.distance
+        if distance >= 0:
+            self.stats.push(distance)
+            self.history.push(distance)
+            self.success_count += 1
+            self.last_error = None
+            return distance
+        else:
             self.error_count += 1
-            self.last_error = f"Error: {str(e)}"
+            self.last_error = "Invalid sensor reading (distance < 0)"
             return None
     
-    def update_loop(self):
-        """Background thread for fetching data"""
-        import time
-        while self.running:
-            if not self.paused:
-                self.fetch_sensor_data()
-            time.sleep(self.update_interval_ms / 1000.0)
+    def on_reading(self, data):
+        """Pipeline reading callback (pipeline thread)"""
+        if not self.paused:
+            self.handle_reading(data)
+            with self.received_lock:
+                if self.received is None:
+                    self.received = time.perf_counter()
+    
+    def on_error(self, message):
+        """Pipeline error callback (pipeline thread)"""
+        self.error_count += 1
+        self.last_error = message
     
     def scheduled_update(self):
         """Update UI elements from main thread"""
         if self.running:
+            self.pipeline.profiler.checkpoint()
             self.update_display()
             self.root.after(100, self.scheduled_update)
     
     def update_display(self):
         """Update all UI elements with current data"""
-        if self.readings:
-            latest = self.readings[-1]
+        start = time.perf_counter()
+        with self.received_lock:
+            received, self.received = self.received, None
+        if received is not None:
+            # Mostly the phase of the 100 ms tick, see timing.py
+            self.pipeline.timing.record(STAGE_QUEUE, start - received)
+        self.plot.redraw()
+        stats = self.stats.snapshot()
+        if stats:
+            latest = int(stats.latest)
             self.distance_label.config(text=f"{latest} mm")
             
             # Update colors based on distance
@@ -191,11 +236,10 @@ class SensorTestGUI:
         self.time_label.config(text=f"Last update: {datetime.now().strftime('%H:%M:%S')}")
         
         # Update statistics
-        if self.readings:
-            readings_list = list(self.readings)
-            self.min_label.config(text=f"{min(readings_list)} mm")
-            self.max_label.config(text=f"{max(readings_list)} mm")
-            self.avg_label.config(text=f"{sum(readings_list) / len(readings_list):.1f} mm")
+        if stats:
+            self.min_label.config(text=f"{stats.min:g} mm")
+            self.max_label.config(text=f"{stats.max:g} mm")
+            self.avg_label.config(text=f"{stats.mean:.1f} mm")
         else:
             self.min_label.config(text="--")
             self.max_label.config(text="--")
@@ -207,36 +251,93 @@ class SensorTestGUI:
         
         # Update error message
         if self.last_error:
-            self.error_label.config(text=self.last_error, foreground="red")
+            color = "darkgreen" if "Profile" in self.last_error else "red"
+            self.error_label.config(text=self.last_error, foreground=color)
         else:
             self.error_label.config(text="None", foreground="darkgreen")
+        
+        self.timing_label.config(text=self.pipeline.timing.summary())
+        self.pipeline.timing.record(STAGE_RENDER, time.perf_counter() - start)
     
     def toggle_pause(self):
         """Pause/Resume data fetching"""
         self.paused = not self.paused
+        if self.owns_pipeline:
+            self.pipeline.paused = self.paused  # Stop polling the device too
         self.pause_button.config(text="Resume" if self.paused else "Pause")
     
+    def toggle_profile(self):
+        """Start/stop cProfile of the pipeline thread and the UI"""
+        profiler = self.pipeline.profiler
+        if not profiler.active:
+            profiler.start()
+            self.last_error = "Profile running..."
+            self.profile_button.config(text="Stop Profile")
+        else:
+            profiler.stop()
+            self.profile_button.config(text="Profile")
+            # The pipeline thread detaches on its next publish
+            self.root.after(max(500, 3 * self.update_interval_ms), self.save_profile)
+    
+    def save_profile(self):
+        """Write the collected profile to the working directory, print the top entries"""
+        stats = self.pipeline.profiler.stats()
+        if stats is None:
+            self.last_error = "Profile: nothing collected"
+            return
+        path = datetime.now().strftime("profile-%Y%m%d-%H%M%S.pstats")
+        stats.dump_stats(path)
+        print(self.pipeline.profiler.report())
+        self.last_error = f"Profile saved to {path}"
+    
+    def change_window(self, event=None):
+        """Resize the statistics window, keeping the newest readings"""
+        self.stats.resize(int(self.window_var.get()))
+        self.update_display()
+    
+    def change_span(self, event=None):
+        """Change how many samples the plot shows"""
+        self.plot.set_span(dict(SPAN_CHOICES)[self.span_var.get()])
+        self.plot.redraw()
+    
     def clear_stats(self):
         """Clear all statistics"""
-        self.readings.clear()
+        self.stats.clear()
+        self.history.clear()
+        self.plot.reset()
         self.success_count = 0
         self.error_count = 0
         self.last_error = None
+        self.pipeline.timing.reset()
         self.update_display()
     
+    def close(self):
+        """Stop updating and leave the pipeline"""
+        self.running = False
+        self.pipeline.unsubscribe(self.subscription)
+        if self.owns_pipeline:
+            self.pipeline.stop()
+    
     def on_closing(self):
         """Handle window close event"""
-        self.running = False
+        self.close()
         self.root.destroy()
 
 
 def main():
     # Configuration
     DEVICE_IP = "192.168.1.233"  # Change this to your ESP32's IP
-    UPDATE_INTERVAL_MS = 1      # Update every 100ms
+    UPDATE_INTERVAL_MS = 100    # Update every 100ms
+    USE_WEBSOCKET = False       # Stream /websocket pushes instead of polling
+    USE_ACQUISITION = False     # Read from a shared acquisition process (acquisition.py)
+    RECORD_FILE = None          # Record to a capture file, e.g. "pour.wmc" (capture.py)
+    REPLAY_FILE = None          # Replay a capture file instead of the device
+    REPLAY_SPEED = 1.0          # Replay speed, e.g. 10 for 10x
     
     root = tk.Tk()
-    app = SensorTestGUI(root, base_url=f"http://{DEVICE_IP}", update_interval_ms=UPDATE_INTERVAL_MS)
+    app = SensorTestGUI(root, base_url=f"http://{DEVICE_IP}", update_interval_ms=UPDATE_INTERVAL_MS,
+                        stream=USE_WEBSOCKET, acquisition=USE_ACQUISITION,
+                        record=RECORD_FILE, replay=REPLAY_FILE, replay_speed=REPLAY_SPEED)
     root.mainloop()
 
 
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Weight Module Dashboard
+Weight, distance, cup-state and settings panels for one module in a single
+window. All panels subscribe to one SensorPipeline, so the device is polled
+once no matter how many views are open (sensor_pipeline.py)
+"""
+
+import importlib
+import threading
+import time
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+from sensor_client import SensorClientError, SensorSettings
+from sensor_pipeline import SensorPipeline
+from settings_cache import SettingsCache
+
+# The views are the standalone test GUIs, embedded as panels
+WeightTestGUI = importlib.import_module("HX711-Weight-Test-GUI").WeightTestGUI
+SensorTestGUI = importlib.import_module("HC-SR04-Test-GUI").SensorTestGUI
+
+
+class CupPanel:
+    """Cup state, tare flag and the achieved reading rate"""
+
+    def __init__(self, parent, pipeline):
+        self.latest = None
+        self.arrivals = deque()  # Reading times of the last second
+        frame = ttk.LabelFrame(parent, text="Cup", padding=10)
+        frame.pack(side="left", fill="both", expand=True, padx=(0, 10))
+
+        self.cup_label = tk.Label(frame, text="--", font=("Arial", 36, "bold"),
+                                  foreground="#95a5a6", width=6)
+        self.cup_label.pack()
+        self.info_label = ttk.Label(frame, text="seq --")
+        self.info_label.pack(pady=(5, 0))
+        self.rate_label = ttk.Label(frame, text="-- Hz", foreground="blue")
+        self.rate_label.pack()
+        self.subscription = pipeline.subscribe(self.on_reading)
+
+    def on_reading(self, data):
+        """Pipeline reading callback (pipeline thread)"""
+        self.latest = data
+        self.arrivals.append(time.monotonic())
+
+    def update_display(self):
+        now = time.monotonic()
+        while self.arrivals and now - self.arrivals[0] > 1.0:
+            self.arrivals.popleft()
+        self.rate_label.config(text=f"{len(self.arrivals)} Hz")
+        data = self.latest
+        if data is None:
+            return
+        if data.cup_true:
+            self.cup_label.config(text="CUP", foreground="#2ecc71")
+        else:
+            self.cup_label.config(text="EMPTY", foreground="#95a5a6")
+        tare = "  tare" if data.tare else ""
+        self.info_label.config(text=f"seq {data.seq}  t={data.timestamp / 1000:.1f}s{tare}")
+
+
+class SettingsPanel:
+    """/api/sensor_settings editor; requests run off the UI thread
+
+    Changes made elsewhere show up within REFRESH_S, checked through the
+    heartbeat-driven cache (settings_cache.py) for one tiny request.
+    """
+
+    FIELDS = (("distance_trig", "Distance trigger (mm)"), ("linear", "Multiplier"),
+              ("offset", "Offset (raw)"))
+    REFRESH_S = 1.0
+
+    def __init__(self, parent, client):
+        self.cache = SettingsCache(client)
+        self.result = None  # (settings or None, message) from the worker
+        self.shown = None  # Settings in the entry fields
+        self.busy = False
+        self.last_refresh = time.monotonic()
+        frame = ttk.LabelFrame(parent, text="Sensor Settings", padding=10)
+        frame.pack(side="left", fill="both", expand=True)
+
+        self.vars = {}
+        for row, (name, title) in enumerate(self.FIELDS):
+            ttk.Label(frame, text=title + ":").grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            var = tk.StringVar(value="--")
+            ttk.Entry(frame, textvariable=var, width=12).grid(row=row, column=1, sticky="w", padx=5)
+            self.vars[name] = var
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=len(self.FIELDS), column=0, columnspan=2, sticky="w", pady=(5, 0))
+        ttk.Button(buttons, text="Load", command=self.load).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Apply", command=self.apply).pack(side="left", padx=5)
+        self.status_label = ttk.Label(frame, text="")
+        self.status_label.grid(row=len(self.FIELDS) + 1, column=0, columnspan=2, sticky="w")
+        self.load()
+
+    def run(self, fn, done_message, quiet=False):
+        def worker():
+            try:
+                settings = fn()
+                if not quiet or settings != self.shown:
+                    self.result = (settings, done_message)
+            except SensorClientError as e:
+                if not quiet:
+                    self.result = (None, f"Failed: {e}")
+            finally:
+                self.busy = False
+        self.busy = True
+        if not quiet:
+            self.status_label.config(text="...", foreground="black")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def load(self):
+        self.run(self.cache.sensor_settings, "Loaded")
+
+    def apply(self):
+        try:
+            settings = SensorSettings(**{name: int(var.get()) for name, var in self.vars.items()})
+        except ValueError:
+            self.status_label.config(text="Values must be integers", foreground="red")
+            return
+        self.run(lambda: self.cache.set_sensor_settings(settings), "Applied")
+
+    def update_display(self):
+        now = time.monotonic()
+        if not self.busy and now - self.last_refresh >= self.REFRESH_S:
+            self.last_refresh = now
+            self.run(self.cache.sensor_settings, "Changed on device", quiet=True)
+        if self.result is None:
+            return
+        (settings, message), self.result = self.result, None
+        if settings is not None:
+            self.shown = settings
+            for name, var in self.vars.items():
+                var.set(str(getattr(settings, name)))
+        self.status_label.config(text=message,
+                                 foreground="red" if settings is None else "darkgreen")
+
+
+class DashboardGUI:
+    def __init__(self, root, base_url="http://192.168.1.221", update_interval_ms=100,
+                 stream=False, acquisition=False, record=None, replay=None, replay_speed=1.0):
+        self.root = root
+        self.running = True
+        self.pipeline = SensorPipeline(base_url, update_interval_ms, stream=stream,
+                                       acquisition=acquisition, timeout=2, record=record,
+                                       replay=replay, replay_speed=replay_speed)
+
+        # Setup UI
+        self.setup_ui(base_url, update_interval_ms)
+        self.pipeline.start()
+
+        # Schedule first update
+        self.scheduled_update()
+
+        # Handle window close
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def setup_ui(self, base_url, update_interval_ms):
+        """Create the GUI layout"""
+        self.root.title("Weight Module Dashboard")
+        self.root.geometry("1400x980")
+        self.root.resizable(True, True)
+
+        # --- Top Frame: Connection, cup state and settings ---
+        top_frame = ttk.Frame(self.root)
+        top_frame.pack(fill="x", padx=10, pady=10)
+
+        connection = ttk.LabelFrame(top_frame, text="Connection", padding=10)
+        connection.pack(side="left", fill="both", padx=(0, 10))
+        ttk.Label(connection, text="Target URL:").grid(row=0, column=0, sticky="w")
+        ttk.Label(connection, text=base_url, foreground="blue").grid(row=0, column=1, sticky="w", padx=10)
+        ttk.Label(connection, text="Update Interval:").grid(row=1, column=0, sticky="w")
+        ttk.Label(connection, text=f"{update_interval_ms}ms", foreground="blue").grid(row=1, column=1, sticky="w", padx=10)
+        ttk.Button(connection, text="Exit", command=self.on_closing).grid(row=2, column=0, sticky="w", pady=(10, 0))
+
+        self.cup_panel = CupPanel(top_frame, self.pipeline)
+        self.settings_panel = SettingsPanel(top_frame, self.pipeline.client)
+
+        # --- Views: weight and distance, side by side ---
+        panes = ttk.PanedWindow(self.root, orient="horizontal")
+        panes.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        weight_frame = ttk.Frame(panes)
+        distance_frame = ttk.Frame(panes)
+        panes.add(weight_frame, weight=1)
+        panes.add(distance_frame, weight=1)
+        self.views = [
+            WeightTestGUI(weight_frame, base_url, update_interval_ms, pipeline=self.pipeline),
+            SensorTestGUI(distance_frame, base_url, update_interval_ms, pipeline=self.pipeline),
+        ]
+
+    def scheduled_update(self):
+        """Update UI elements from main thread (views schedule themselves)"""
+        if self.running:
+            self.cup_panel.update_display()
+            self.settings_panel.update_display()
+            self.root.after(100, self.scheduled_update)
+
+    def on_closing(self):
+        """Handle window close event"""
+        self.running = False
+        for view in self.views:
+            view.close()
+        self.pipeline.stop()
+        self.root.destroy()
+
+
+def main():
+    # Configuration
+    DEVICE_IP = "192.168.1.233"  # Change this to your ESP32's IP
+    UPDATE_INTERVAL_MS = 100      # Update every 100ms
+    USE_WEBSOCKET = False         # Stream /websocket pushes instead of polling
+    USE_ACQUISITION = False       # Read from a shared acquisition process (acquisition.py)
+    RECORD_FILE = None            # Record to a capture file, e.g. "pour.wmc" (capture.py)
+    REPLAY_FILE = None            # Replay a capture file instead of the device
+    REPLAY_SPEED = 1.0            # Replay speed, e.g. 10 for 10x
+
+    root = tk.Tk()
+    app = DashboardGUI(root, base_url=f"http://{DEVICE_IP}", update_interval_ms=UPDATE_INTERVAL_MS,
+                       stream=USE_WEBSOCKET, acquisition=USE_ACQUISITION,
+                       record=RECORD_FILE, replay=REPLAY_FILE, replay_speed=REPLAY_SPEED)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
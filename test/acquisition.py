@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Sensor acquisition process
+Samples one module in its own process and publishes every reading into a
+shared-memory ring (shared_ring.py). HTTP I/O and JSON parsing never share
+an interpreter (and GIL) with Tk rendering, and any number of viewers can
+attach to one acquisition stream without polling the device themselves.
+
+Sources:
+  poll     GET /api/sensor_read at a fixed rate, stamped at the request midpoint
+  stream   /websocket push frames
+  history  drain /api/sensor_history: every device sample, spaced by the
+           device clock instead of the host's
+
+Viewers started through open_acquisition() share one detached process
+that belongs to no viewer: it keeps sampling while any viewer reads the
+ring and exits by itself once none has for STALE_S.
+
+    python acquisition.py --url http://192.168.1.233 --source history [--idle-exit]
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from sensor_client import HistoryDrain, SensorClient, SensorClientError, SensorRead, SensorStream
+from shared_ring import DEFAULT_CAPACITY, STALE_S, RingReader, RingWriter, ring_name
+
+SOURCES = ("poll", "stream", "history")
+
+
+class AcquisitionProcess(multiprocessing.Process):
+    """Child process writing one module's readings into a shared ring"""
+
+    def __init__(self, base_url, name=None, interval_ms=100, source="poll",
+                 capacity=DEFAULT_CAPACITY, timeout=2.0, idle_exit=False):
+        super().__init__(daemon=True)
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source: {source}")
+        self.base_url = base_url
+        self.ring = name or ring_name(base_url)
+        self.interval_ms = interval_ms
+        self.source = source
+        self.capacity = capacity
+        self.timeout = timeout
+        self.idle_exit = idle_exit  # Stop once no viewer read for STALE_S
+        self.ready = multiprocessing.Event()
+        self.stopping = multiprocessing.Event()
+        self._started = 0.0
+
+    def run(self):
+        writer = RingWriter(self.ring, self.capacity)
+        self._started = time.time()
+        self.ready.set()
+        try:
+            if self.source == "stream":
+                self._stream(writer)
+            else:
+                with SensorClient(self.base_url, self.timeout) as client:
+                    if self.source == "history":
+                        self._history(client, writer)
+                    else:
+                        self._poll(client, writer)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            writer.close()
+
+    def _running(self, writer):
+        """Refresh the heartbeat; False once stopped or left without viewers"""
+        writer.beat()
+        if self.stopping.is_set():
+            return False
+        unread_s = time.time() - max(writer.reader_beat(), self._started)
+        return not (self.idle_exit and unread_s > STALE_S)
+
+    def _poll(self, client, writer):
+        interval = self.interval_ms / 1000.0
+        deadline = time.perf_counter()
+        while self._running(writer):
+            sent = time.time()
+            try:
+                reading = client.get_sensor_read()
+            except SensorClientError as e:
+                writer.error(e)
+            else:
+                writer.append(reading, (sent + time.time()) / 2)
+            deadline = max(deadline + interval, time.perf_counter())
+            self.stopping.wait(deadline - time.perf_counter())
+
+    def _history(self, client, writer):
+        drain = HistoryDrain()
+        while self._running(writer):
+            try:
+                samples = drain.drain(client)
+            except SensorClientError as e:
+                writer.error(e)
+                samples = []
+            if samples:
+                # Anchor the newest sample at "now", keep device spacing
+                now, newest = time.time(), samples[-1].timestamp
+                for s in samples:
+                    reading = SensorRead(cup_true=s.cup_true, weight=s.weight,
+                                         distance=s.distance, seq=s.seq,
+                                         timestamp=s.timestamp)
+                    writer.append(reading, now - (newest - s.timestamp) / 1000.0)
+            self.stopping.wait(self.interval_ms / 1000.0)
+
+    def _stream(self, writer):
+        # The stream thread is the only writer while the main thread waits
+        stream = SensorStream(self.base_url, writer.append, writer.error,
+                              interval_ms=self.interval_ms, timeout=self.timeout)
+        stream.start()
+        while self._running(writer):
+            self.stopping.wait(1.0)
+        stream.stop()
+        stream.join(self.timeout)
+
+    def stop(self, timeout=5.0):
+        """Stop sampling, remove the ring and wait for the process"""
+        self.stopping.set()
+        self.join(timeout)
+        if self.is_alive():
+            self.terminate()
+
+
+def _attach_live(name):
+    """RingReader of a ring with a live writer, None if there is none"""
+    try:
+        reader = RingReader(name)
+    except (FileNotFoundError, ValueError):
+        return None
+    if time.time() - reader.status()[3] < STALE_S:
+        return reader
+    reader.close()  # Left behind by a dead writer, RingWriter takes it over
+    return None
+
+
+def open_acquisition(base_url, interval_ms=100, source="poll", timeout=10.0):
+    """Attach to the module's running acquisition or start one
+
+    A new acquisition runs detached with --idle-exit, so closing the
+    viewer that started it does not stop it for the others; the caller
+    only closes the returned RingReader.
+    """
+    name = ring_name(base_url)
+    reader = _attach_live(name)
+    if reader is not None:
+        return reader
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--url", base_url, "--source", source,
+         "--interval-ms", str(interval_ms), "--idle-exit"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reader = _attach_live(name)
+        if reader is not None:
+            return reader
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    raise RuntimeError(f"Acquisition of {base_url} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Module acquisition process")
+    parser.add_argument("--url", default="http://192.168.1.233", help="Module address")
+    parser.add_argument("--source", choices=SOURCES, default="poll")
+    parser.add_argument("--interval-ms", type=int, default=100)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY,
+                        help="Ring size in samples")
+    parser.add_argument("--idle-exit", action="store_true",
+                        help=f"Exit once no viewer read the ring for {STALE_S:g} s")
+    args = parser.parse_args()
+
+    process = AcquisitionProcess(args.url, interval_ms=args.interval_ms,
+                                 source=args.source, capacity=args.capacity,
+                                 idle_exit=args.idle_exit)
+    process.start()
+    process.ready.wait(10)
+    print(f"Acquiring {args.url} ({args.source}) into shared memory '{process.ring}', Ctrl-C to stop")
+    try:
+        while process.is_alive():
+            process.join(1.0)
+    except KeyboardInterrupt:
+        process.stop()
+
+
+if __name__ == "__main__":
+    main()
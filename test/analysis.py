@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Load-cell analysis
+Vectorized noise, drift, settling and tare statistics over captured weight
+and distance series (capture.py files), for qualifying load cells and the
+linear/offset calibration across the fleet. Requires numpy.
+
+  allan_deviation     overlapping Allan deviation over octave-spaced taus
+  drift_per_hour      least-squares slope of the empty-scale weight
+  noise_spectrum      Welch power spectral density
+  settling_times      step response after every cup_true rising edge
+  tare_repeatability  spread of the successive session tare offsets
+
+    python analysis.py pour.wmc [more.wmc ...] [--band 2]
+"""
+
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+from capture import COLUMNS, FLAG_CUP, FLAG_TARE, CaptureReader
+
+SETTLE_BAND = 2     # Weight units around the final value that count as settled
+SETTLE_SMOOTH_S = 0.2  # Moving mean applied before the band check
+MIN_STEP = 5        # Smaller steps after a cup edge are not a placed glass
+
+
+@dataclass
+class Series:
+    """Column arrays of one capture"""
+    time: np.ndarray       # Host time, s
+    latency: np.ndarray    # Request latency, s; NaN for streamed captures
+    seq: np.ndarray
+    device_time: np.ndarray  # Device clock, s since boot (wraps unwrapped)
+    weight: np.ndarray
+    distance: np.ndarray
+    tare_offset: np.ndarray
+    cup: np.ndarray        # bool
+    tare: np.ndarray       # bool
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def rate(self):
+        """Sample rate in Hz from the device clock, gaps excluded"""
+        spacing = np.diff(self.device_time)
+        spacing = spacing[spacing > 0]
+        if not len(spacing):
+            return 0.0
+        # Millisecond stamps quantize single spacings: average them
+        spacing = spacing[spacing < 5 * np.median(spacing)]
+        return 1.0 / spacing.mean()
+
+
+def load_capture(path):
+    """Read a capture file into a Series"""
+    with CaptureReader(path) as reader:
+        columns = {name: [] for name, _ in COLUMNS}
+        for chunk in reader.chunks():
+            for name, _ in COLUMNS:
+                columns[name].append(np.asarray(getattr(chunk, name)))
+        arrays = {name: np.concatenate(parts) if parts else np.empty(0, dtype=code)
+                  for (name, code), parts in zip(COLUMNS, columns.values())}
+        columns = None  # Views into the map must go before it closes
+    # Device milliseconds are u32; undo wraparounds before scaling
+    ms = arrays["timestamp"].astype(np.int64)
+    wraps = np.concatenate(([0], np.cumsum(np.diff(ms) < -(1 << 31))))
+    flags = arrays["flags"]
+    return Series(time=arrays["time"], latency=arrays["latency"].astype(np.float64),
+                  seq=arrays["seq"], device_time=(ms + (wraps << 32)) / 1000.0,
+                  weight=arrays["weight"], distance=arrays["distance"],
+                  tare_offset=arrays["tare_offset"],
+                  cup=(flags & FLAG_CUP) != 0, tare=(flags & FLAG_TARE) != 0)
+
+
+def allan_deviation(x, rate, taus=None):
+    """Overlapping Allan deviation of samples x at `rate` Hz
+
+    Returns (taus in s, deviations); taus default to octaves up to a third
+    of the series.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if taus is None:
+        m = 2 ** np.arange(int(np.log2(max(n // 3, 1))) + 1)
+    else:
+        m = np.unique(np.maximum(1, np.round(np.asarray(taus) * rate).astype(int)))
+        m = m[m <= (n - 1) // 2]
+    cumsum = np.concatenate(([0.0], np.cumsum(x)))
+    adev = np.empty(len(m))
+    for i, size in enumerate(m):
+        means = (cumsum[size:] - cumsum[:-size]) / size
+        diffs = means[size:] - means[:-size]
+        adev[i] = np.sqrt(0.5 * np.mean(diffs ** 2)) if len(diffs) else np.nan
+    return m / rate, adev
+
+
+def drift_per_hour(series, mask=None):
+    """Least-squares weight slope in units per hour and residual std
+
+    Fits the empty-scale samples (no cup) unless a mask is given.
+    """
+    if mask is None:
+        mask = ~series.cup
+    t = series.device_time[mask]
+    w = series.weight[mask].astype(np.float64)
+    if len(t) < 2:
+        return np.nan, np.nan
+    t = t - t[0]
+    slope, intercept = np.polyfit(t, w, 1)
+    residual = w - (slope * t + intercept)
+    return slope * 3600.0, residual.std()
+
+
+def noise_spectrum(x, rate, segment=1024):
+    """Welch PSD of x: (frequencies in Hz, density in units^2/Hz)
+
+    Hann-windowed segments with 50% overlap, mean removed per segment.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    segment = min(segment, len(x))
+    if segment < 2:
+        return np.empty(0), np.empty(0)
+    step = segment // 2 or 1
+    windows = np.lib.stride_tricks.sliding_window_view(x, segment)[::step]
+    windows = windows - windows.mean(axis=1, keepdims=True)
+    hann = np.hanning(segment)
+    spectra = np.abs(np.fft.rfft(windows * hann, axis=1)) ** 2
+    psd = spectra.mean(axis=0) / (rate * np.sum(hann ** 2))
+    psd[1:-1 if segment % 2 == 0 else None] *= 2  # One-sided
+    return np.fft.rfftfreq(segment, 1.0 / rate), psd
+
+
+def _edges(mask):
+    """Start and end indices of the True runs of mask"""
+    padded = np.concatenate(([False], mask, [False]))
+    change = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return change[0::2], change[1::2]
+
+
+def moving_mean(x, size):
+    """Centered moving mean over `size` samples, shrinking at the ends"""
+    x = np.asarray(x, dtype=np.float64)
+    size = max(1, min(size, len(x)))
+    cumsum = np.concatenate(([0.0], np.cumsum(x)))
+    index = np.arange(len(x))
+    lo = np.maximum(index - size // 2, 0)
+    hi = np.minimum(lo + size, len(x))
+    return (cumsum[hi] - cumsum[lo]) / (hi - lo)
+
+
+def settling_times(series, band=SETTLE_BAND, smooth_s=SETTLE_SMOOTH_S, min_step=MIN_STEP):
+    """Settling after every placed cup: list of dicts
+
+    For each cup_true run the final weight is the median of its last
+    quarter; the settling time runs from the rising edge to the last
+    sample whose moving mean (smooth_s) lies outside final +/- band. Runs
+    without a step of at least min_step from the weight before the edge,
+    or that never settle, are reported with settle_s None.
+    """
+    starts, ends = _edges(series.cup)
+    t, w = series.device_time, series.weight.astype(np.float64)
+    size = max(1, int(round(smooth_s * series.rate)))
+    results = []
+    for start, end in zip(starts, ends):
+        segment = w[start:end]
+        final = np.median(segment[-max(1, len(segment) // 4):])
+        before = np.median(w[max(0, start - size):start]) if start else final
+        outside = np.flatnonzero(np.abs(moving_mean(segment, size) - final) > band)
+        settled = (abs(final - before) >= min_step
+                   and (len(outside) == 0 or outside[-1] < len(segment) - 1))
+        settle_s = None
+        if settled:
+            last = outside[-1] + 1 if len(outside) else 0
+            settle_s = t[start + last] - t[start]
+        overshoot = segment.max() - final if final >= before else final - segment.min()
+        results.append({"time": series.time[start], "step": final - before,
+                        "settle_s": settle_s, "overshoot": overshoot,
+                        "duration_s": t[end - 1] - t[start]})
+    return results
+
+
+def tare_repeatability(series, linear=None):
+    """Statistics of the successive session tare offsets (raw)
+
+    With the calibration multiplier `linear` the spread is also given in
+    weight units (raw * linear / 1000, as hx711_raw_to_weight).
+    """
+    offsets = series.tare_offset
+    changes = np.flatnonzero(np.diff(offsets)) + 1
+    values = offsets[changes]
+    values = values[values != 0].astype(np.float64)  # 0: not tared yet
+    result = {"tares": len(values), "std_raw": np.nan, "range_raw": np.nan}
+    if len(values) >= 2:
+        result["std_raw"] = values.std(ddof=1)
+        result["range_raw"] = np.ptp(values)
+    if linear is not None:
+        result["std"] = result["std_raw"] * linear / 1000.0
+        result["range"] = result["range_raw"] * linear / 1000.0
+    return result
+
+
+def report(path, band=SETTLE_BAND, linear=None):
+    """Print the analysis of one capture"""
+    series = load_capture(path)
+    print(f"{path}: {len(series)} samples")
+    if len(series) < 2:
+        return
+    rate = series.rate
+    empty = series.weight[~series.cup]
+    measured = series.latency[~np.isnan(series.latency)]
+    latency = f"{np.median(measured) * 1000:.1f} ms" if len(measured) else "n/a (stream)"
+    print(f"  rate {rate:.2f} Hz, {series.device_time[-1] - series.device_time[0]:.0f} s, "
+          f"latency p50 {latency}")
+    if len(empty) > 2:
+        print(f"  empty scale: mean {empty.mean():.2f}, std {empty.std():.2f}")
+        taus, adev = allan_deviation(empty, rate)
+        best = np.nanargmin(adev)
+        print(f"  Allan deviation: {adev[0]:.3f} at {taus[0]:.2g} s, "
+              f"minimum {adev[best]:.3f} at {taus[best]:.3g} s")
+        freqs, psd = noise_spectrum(empty, rate)
+        if len(psd) > 1:
+            peak = np.argmax(psd[1:]) + 1
+            print(f"  noise density {np.sqrt(np.median(psd[1:])):.3f} /sqrt(Hz), "
+                  f"peak at {freqs[peak]:.2f} Hz")
+    slope, residual = drift_per_hour(series)
+    print(f"  drift {slope:+.3f} per hour (residual std {residual:.2f})")
+    steps = settling_times(series, band)
+    times = [s["settle_s"] for s in steps if s["settle_s"] is not None]
+    if steps:
+        print(f"  cups: {len(steps)}, settled {len(times)}"
+              + (f", settling median {np.median(times):.2f} s, max {max(times):.2f} s"
+                 if times else ""))
+    tares = tare_repeatability(series, linear)
+    if tares["tares"]:
+        spread = f", std {tares['std']:.2f}" if linear is not None else ""
+        print(f"  tares: {tares['tares']}, std {tares['std_raw']:.1f} raw{spread}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Noise, drift and settling analysis of captures")
+    parser.add_argument("paths", nargs="+", help="Capture files (capture.py)")
+    parser.add_argument("--band", type=float, default=SETTLE_BAND,
+                        help="Settling band around the final weight")
+    parser.add_argument("--linear", type=float, help="Calibration multiplier for tare spread")
+    args = parser.parse_args()
+    for path in args.paths:
+        report(path, args.band, args.linear)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmark for the module API
+Drives /api/sensor_read, /api/sensor_settings, /api/heartbeat and the
+/websocket stream with N concurrent clients and reports achieved Hz and
+p50/p95/p99/max latency. Results are written as JSON and can be compared
+against a stored baseline; regressions make the run exit with status 1.
+
+Modes:
+  fixed  closed loop, every client paces its own requests (rate 0: flat out)
+  open   open loop, requests are issued at the target rate no matter how
+         slow the device answers; latency counts from the scheduled time
+  (the WebSocket stream is always device paced)
+
+    python benchmark.py --url http://192.168.1.221 --clients 1,4 --rates 0,10
+    python benchmark.py --simulate --output run.json --baseline base.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+
+from sensor_client import AsyncSensorClient, SensorClientError
+
+ENDPOINTS = {
+    "sensor_read": "/api/sensor_read",
+    "sensor_settings": "/api/sensor_settings",
+    "heartbeat": "/api/heartbeat",
+    "ws": None,  # /websocket push stream
+}
+MODES = ("fixed", "open")
+MAX_OUTSTANDING = 10_000  # Open loop: requests in flight before dropping
+
+# FSD.md: polling reaches 5-10 Hz, responses < 200 ms on the LAN
+FSD_MIN_HZ = 5.0
+FSD_MAX_P99_MS = 200.0
+
+
+@dataclass
+class Scenario:
+    endpoint: str
+    mode: str
+    clients: int
+    rate_hz: float  # Total target rate over all clients, 0: as fast as possible
+    duration_s: float
+
+    @property
+    def key(self):
+        return f"{self.endpoint}/{self.mode}/c{self.clients}/r{self.rate_hz:g}"
+
+
+@dataclass
+class Result:
+    key: str
+    endpoint: str
+    mode: str
+    clients: int
+    rate_hz: float
+    duration_s: float
+    requests: int = 0
+    errors: int = 0
+    by_kind: dict = field(default_factory=dict)
+    achieved_hz: float = 0.0
+    error_rate: float = 0.0
+    latency_ms: dict = field(default_factory=dict)  # ws: frame interval
+
+
+def percentile(values, p):
+    """Linear-interpolated percentile of sorted values, p in 0..100"""
+    if not values:
+        return None
+    pos = (len(values) - 1) * p / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def summarize(latencies_s):
+    values = sorted(v * 1000.0 for v in latencies_s)
+    if not values:
+        return {}
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1],
+        "mean": sum(values) / len(values),
+    }
+
+
+class Recorder:
+    """Collects latencies and errors inside the measurement window"""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.latencies = []
+        self.errors = 0
+        self.by_kind = {}
+
+    def measuring(self, t):
+        return self.start <= t < self.end
+
+    def success(self, sent, latency_s):
+        if self.measuring(sent):
+            self.latencies.append(latency_s)
+
+    def error(self, sent, error):
+        if self.measuring(sent):
+            self.errors += 1
+            self.by_kind[error.kind] = self.by_kind.get(error.kind, 0) + 1
+
+
+async def _request(client, path, recorder, scheduled):
+    try:
+        await client.request("GET", path)
+    except SensorClientError as e:
+        recorder.error(scheduled, e)
+    else:
+        recorder.success(scheduled, time.perf_counter() - scheduled)
+
+
+async def _fixed_client(client, path, recorder, interval):
+    # Closed loop: the next request is only sent after the previous answer
+    deadline = time.perf_counter()
+    while True:
+        sent = time.perf_counter()
+        if sent >= recorder.end:
+            return
+        await _request(client, path, recorder, sent)
+        if interval:
+            deadline = max(deadline + interval, time.perf_counter())
+            await asyncio.sleep(deadline - time.perf_counter())
+
+
+async def _open_loop(clients, path, recorder, rate_hz):
+    # Poisson arrivals at rate_hz, spread round-robin over the clients
+    pending = set()
+    scheduled = time.perf_counter()
+    i = 0
+    while scheduled < recorder.end:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(pending) >= MAX_OUTSTANDING:
+            recorder.error(scheduled, SensorClientError("dropped", "Too many requests in flight"))
+        else:
+            task = asyncio.ensure_future(
+                _request(clients[i % len(clients)], path, recorder, scheduled))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        i += 1
+        scheduled += random.expovariate(rate_hz)
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def _ws_client(client, recorder, interval_ms):
+    last = None
+    on_error = lambda error: recorder.error(time.perf_counter(), error)
+    stream = client.stream_sensor_read(interval_ms, on_error)
+    try:
+        async for _ in stream:
+            now = time.perf_counter()
+            if last is not None:
+                recorder.success(now, now - last)
+            last = now
+            if now >= recorder.end:
+                return
+    finally:
+        await stream.aclose()
+
+
+async def run_scenario(base_url, scenario, warmup_s=1.0, timeout=2.0):
+    """Run one scenario and return its Result"""
+    clients = [AsyncSensorClient(base_url, timeout, pool_size=1)
+               for _ in range(scenario.clients)]
+    start = time.perf_counter() + warmup_s
+    recorder = Recorder(start, start + scenario.duration_s)
+    path = ENDPOINTS[scenario.endpoint]
+    try:
+        if path is None:
+            interval_ms = None
+            if scenario.rate_hz:
+                # Per-connection push interval that sums to rate_hz
+                interval_ms = max(1, round(1000.0 * scenario.clients / scenario.rate_hz))
+            await asyncio.wait_for(
+                asyncio.gather(*(_ws_client(c, recorder, interval_ms) for c in clients)),
+                warmup_s + scenario.duration_s + timeout + 1.0)
+        elif scenario.mode == "open":
+            await _open_loop(clients, path, recorder, scenario.rate_hz)
+        else:
+            interval = scenario.clients / scenario.rate_hz if scenario.rate_hz else 0
+            await asyncio.gather(*(_fixed_client(c, path, recorder, interval)
+                                   for c in clients))
+    except asyncio.TimeoutError:
+        pass  # Stalled stream, counted by what was received
+    finally:
+        for client in clients:
+            await client.close()
+
+    count = len(recorder.latencies)
+    total = count + recorder.errors
+    return Result(
+        key=scenario.key, endpoint=scenario.endpoint, mode=scenario.mode,
+        clients=scenario.clients, rate_hz=scenario.rate_hz,
+        duration_s=scenario.duration_s, requests=total, errors=recorder.errors,
+        by_kind=recorder.by_kind, achieved_hz=count / scenario.duration_s,
+        error_rate=recorder.errors / total if total else 0.0,
+        latency_ms=summarize(recorder.latencies),
+    )
+
+
+def build_scenarios(endpoints, modes, clients, rates, duration_s):
+    scenarios = []
+    for endpoint in endpoints:
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint: {endpoint}")
+        for n in clients:
+            for rate in rates:
+                if ENDPOINTS[endpoint] is None:
+                    scenarios.append(Scenario(endpoint, "push", n, rate, duration_s))
+                    continue
+                for mode in modes:
+                    if mode == "open" and not rate:
+                        continue  # Open loop needs a target rate
+                    scenarios.append(Scenario(endpoint, mode, n, rate, duration_s))
+    return scenarios
+
+
+def compare(results, baseline, tolerance=0.2, slack_ms=2.0):
+    """Return (key, metric, baseline, current) for every regression
+
+    Hz may drop and latency percentiles may grow by `tolerance` (relative,
+    latencies also by `slack_ms`) before a scenario counts as regressed.
+    """
+    base = {r["key"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        ref = base.get(result.key)
+        if ref is None:
+            continue
+        if result.achieved_hz < ref["achieved_hz"] * (1.0 - tolerance):
+            regressions.append((result.key, "achieved_hz", ref["achieved_hz"],
+                                result.achieved_hz))
+        for name in ("p50", "p95", "p99"):
+            old = ref["latency_ms"].get(name)
+            new = result.latency_ms.get(name)
+            if old is not None and new is not None and new > old * (1.0 + tolerance) + slack_ms:
+                regressions.append((result.key, f"latency_ms.{name}", old, new))
+        if result.error_rate > ref["error_rate"] + 0.01:
+            regressions.append((result.key, "error_rate", ref["error_rate"],
+                                result.error_rate))
+    return regressions
+
+
+def fsd_violations(results):
+    """Check the FSD.md polling rate and latency figures on sensor_read"""
+    violations = []
+    for result in results:
+        if result.endpoint != "sensor_read" or result.mode != "fixed":
+            continue
+        p99 = result.latency_ms.get("p99")
+        if p99 is not None and p99 > FSD_MAX_P99_MS:
+            violations.append(f"{result.key}: p99 {p99:.1f} ms > {FSD_MAX_P99_MS:g} ms")
+        target = result.rate_hz or FSD_MIN_HZ
+        if result.achieved_hz < min(target, FSD_MIN_HZ) * 0.95:
+            violations.append(f"{result.key}: {result.achieved_hz:.1f} Hz < {FSD_MIN_HZ:g} Hz")
+    return violations
+
+
+def print_results(results):
+    print(f"{'scenario':34} {'Hz':>8} {'err':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  ms")
+    for r in results:
+        lat = r.latency_ms
+        cells = " ".join(f"{lat[k]:8.2f}" if k in lat else f"{'--':>8}"
+                         for k in ("p50", "p95", "p99", "max"))
+        print(f"{r.key:34} {r.achieved_hz:8.1f} {r.error_rate:6.1%} {cells}")
+
+
+def _csv(value, cast):
+    return [cast(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Module API benchmark")
+    parser.add_argument("--url", default="http://192.168.1.221", help="Module address")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Benchmark a local device_simulator instead of --url")
+    parser.add_argument("--sim-latency-ms", type=float, default=0.0)
+    parser.add_argument("--endpoints", default="sensor_read,sensor_settings,heartbeat,ws")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--clients", default="1,4", help="Concurrent clients, comma separated")
+    parser.add_argument("--rates", default="0,10", help="Total target Hz, 0: flat out")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Compare against this JSON result file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(_csv(args.endpoints, str), _csv(args.modes, str),
+                                _csv(args.clients, int), _csv(args.rates, float),
+                                args.duration)
+    simulator = None
+    url = args.url
+    if args.simulate:
+        from device_simulator import SimConfig, SimulatorThread
+        simulator = SimulatorThread(1, base_port=8000,
+                                    config=SimConfig(latency_ms=args.sim_latency_ms))
+        simulator.start()
+        url = simulator.urls[0]
+
+    results = []
+    try:
+        for scenario in scenarios:
+            print(f"Running {scenario.key} ...", file=sys.stderr)
+            results.append(asyncio.run(run_scenario(url, scenario, args.warmup,
+                                                    args.timeout)))
+    finally:
+        if simulator is not None:
+            simulator.stop()
+
+    print_results(results)
+    report = {
+        "url": url,
+        "simulated": args.simulate,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "results": [asdict(r) for r in results],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    for violation in fsd_violations(results):
+        print(f"FSD: {violation}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.3f} -> {new:.3f}")
+        failed = bool(regressions)
+        if not regressions:
+            print("No regressions against baseline")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
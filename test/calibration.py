@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Multi-point load-cell calibration
+Samples raw HX711 values (/api/sensor_raw) for a series of reference
+masses, stops each mass as soon as the 95% confidence interval of its mean
+is narrower than `ci_g`, fits offset and multiplier by weighted least
+squares and writes them to /api/sensor_settings (glue_set_sensor_settings).
+All modules of a fleet are sampled in parallel from one event loop and
+fitted in one vectorized pass; the operator only swaps the masses.
+Requires numpy and aiohttp.
+
+  raw = offset + mass * 1000 / linear      (hx711_raw_to_weight inverted)
+
+    python calibration.py --devices 192.168.1.220-235 --masses 0,100,200,500 --apply
+"""
+
+import argparse
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+try:
+    import aiohttp
+except ImportError:  # Checked by AsyncSensorClient
+    aiohttp = None
+
+from fleet import MAX_CONCURRENCY, parse_addresses
+from sensor_client import (DEFAULT_TIMEOUT, ERROR_OTHER, AsyncSensorClient, SensorClientError,
+                           SensorSettings)
+
+MASSES_G = (0, 100, 200, 500)
+CI_G = 0.1           # Target 95% half-width of each mean, grams
+Z_95 = 1.96
+MIN_SAMPLES = 30     # Before the interval is trusted
+MAX_SAMPLES = 4000
+MAX_S = 60.0         # Per mass; unconverged points are kept and flagged
+SETTLE_S = 1.0       # Discarded after the mass was placed
+POLL_S = 0.1         # /api/sensor_raw drain interval, well inside the ring
+RAW_VARIANCE_MIN = 1.0 / 12  # Quantization floor of an integer reading
+
+
+@dataclass
+class CalibrationPoint:
+    """Raw statistics of one reference mass on one module"""
+    mass_g: float
+    mean_raw: float
+    std_raw: float
+    count: int
+    ci_raw: float      # 95% half-width of the mean
+    converged: bool
+    duration_s: float
+
+
+@dataclass
+class CalibrationResult:
+    """Points, fit and outcome of one module"""
+    address: str
+    points: list = field(default_factory=list)
+    offset: int = None
+    linear: int = None
+    residuals_g: list = None      # Per point, with the integer offset/linear
+    nonlinearity_pct: float = None  # Max deviation from the fitted line, % of span
+    tare_offset: int = 0          # Session tare still applied on the module
+    applied: bool = False
+    error: str = None
+
+
+def fit_calibration(masses, means, weights=None):
+    """Weighted least squares of raw = intercept + slope * mass
+
+    means (and weights, 1/variance of each mean) have the points on the
+    last axis, so a (modules, points) array fits a whole fleet at once.
+    Returns a dict of arrays: intercept, slope, offset and linear (rounded
+    for the firmware), residual_g with the rounded values and
+    nonlinearity_pct (max distance from the fitted line in % of the mass
+    span).
+    """
+    x = np.asarray(masses, dtype=np.float64)
+    y = np.asarray(means, dtype=np.float64)
+    w = np.ones_like(y) if weights is None else np.asarray(weights, dtype=np.float64)
+    total = w.sum(axis=-1, keepdims=True)
+    mx = (w * x).sum(axis=-1, keepdims=True) / total
+    my = (w * y).sum(axis=-1, keepdims=True) / total
+    dx = x - mx
+    slope = (w * dx * (y - my)).sum(axis=-1, keepdims=True) / (w * dx * dx).sum(
+        axis=-1, keepdims=True)
+    intercept = my - slope * mx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        line_g = (y - intercept) / slope - x
+        offset = np.round(intercept)
+        linear = np.round(1000.0 / slope)
+    span = np.ptp(x)
+    return {
+        "intercept": intercept[..., 0],
+        "slope": slope[..., 0],
+        "offset": offset[..., 0],
+        "linear": linear[..., 0],
+        "residual_g": (y - offset) * linear / 1000.0 - x,
+        "nonlinearity_pct": np.abs(line_g).max(axis=-1) / span * 100.0,
+    }
+
+
+async def _drain_raw(client, since):
+    """All raw values after `since`: (values, newest seq)"""
+    values = []
+    while True:
+        batch = await client.get_sensor_raw(since)
+        values.extend(batch.raws)
+        if batch.seqs:
+            since = batch.seqs[-1]
+        if not batch.more or not batch.seqs:
+            return values, since
+
+
+async def collect_point(client, mass_g, grams_per_raw, ci_g=CI_G, settle_s=SETTLE_S,
+                        min_samples=MIN_SAMPLES, max_samples=MAX_SAMPLES, max_s=MAX_S):
+    """Sample one placed mass until the mean is known to within ci_g
+
+    grams_per_raw (linear / 1000 of the current settings) converts the
+    raw interval to grams for the stop check.
+    """
+    start = time.monotonic()
+    since = (await client.get_sensor_raw(0, 1)).head
+    count, shift, s1, s2 = 0, None, 0.0, 0.0  # Sums of raw - shift
+    ci_raw, converged = math.inf, False
+    while True:
+        await asyncio.sleep(POLL_S)
+        values, since = await _drain_raw(client, since)
+        elapsed = time.monotonic() - start
+        if elapsed < settle_s or not values:
+            if elapsed >= max_s:
+                break
+            continue
+        if shift is None:
+            shift = values[0]  # Keeps the sums small, no cancellation
+        batch = np.asarray(values, dtype=np.float64) - shift
+        count += len(batch)
+        s1 += batch.sum()
+        s2 += (batch * batch).sum()
+        if count >= 2:
+            variance = max((s2 - s1 * s1 / count) / (count - 1), 0.0)
+            ci_raw = Z_95 * math.sqrt(max(variance, RAW_VARIANCE_MIN) / count)
+            converged = count >= min_samples and ci_raw * grams_per_raw <= ci_g
+        if converged or count >= max_samples or elapsed >= max_s:
+            break
+    if count == 0:
+        raise SensorClientError(ERROR_OTHER, f"No samples for {mass_g:g} g in {max_s:g} s")
+    variance = max((s2 - s1 * s1 / count) / (count - 1), 0.0) if count > 1 else 0.0
+    return CalibrationPoint(mass_g, shift + s1 / count, math.sqrt(variance), count,
+                            ci_raw, converged, time.monotonic() - start)
+
+
+def _fit_results(results, masses):
+    """Vectorized fit of every result without error, in place"""
+    if not results:
+        return
+    means = np.array([[p.mean_raw for p in r.points] for r in results])
+    variances = np.array([[max(p.std_raw ** 2, RAW_VARIANCE_MIN) / p.count
+                           for p in r.points] for r in results])
+    fit = fit_calibration(masses, means, 1.0 / variances)
+    for i, r in enumerate(results):
+        if not fit["slope"][i] > 0:
+            r.error = "Raw values do not rise with the mass (masses placed? HX711 wiring?)"
+            continue
+        r.offset = int(fit["offset"][i])
+        r.linear = int(fit["linear"][i])
+        r.residuals_g = [float(v) for v in fit["residual_g"][i]]
+        r.nonlinearity_pct = float(fit["nonlinearity_pct"][i])
+
+
+async def _apply(client, result):
+    settings = await client.get_sensor_settings()
+    settings.offset, settings.linear = result.offset, result.linear
+    written = await client.set_sensor_settings(settings)
+    result.applied = (written.offset, written.linear) == (result.offset, result.linear)
+    result.tare_offset = (await client.get_sensor_read()).tare_offset
+
+
+async def calibrate_fleet(addresses, masses=MASSES_G, place=None, ci_g=CI_G, apply=False,
+                          timeout=DEFAULT_TIMEOUT, max_concurrency=MAX_CONCURRENCY,
+                          on_point=None, **options):
+    """Calibrate every module against the same series of masses
+
+    `place(mass_g)` is awaited before each mass (e.g. to prompt the
+    operator to load all modules), on_point(address, CalibrationPoint)
+    reports progress and `options` go to collect_point(). A module that
+    fails drops out, the others continue. Returns a CalibrationResult per
+    address.
+    """
+    if len(set(masses)) < 2:
+        raise ValueError("At least two different reference masses are needed")
+    connector = aiohttp.TCPConnector(limit=max_concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        clients = {a: AsyncSensorClient(a, timeout, session=session) for a in addresses}
+        results = {a: CalibrationResult(a) for a in addresses}
+
+        async def scale(address):
+            linear = (await clients[address].get_sensor_settings()).linear
+            return (linear or SensorSettings().linear) / 1000.0
+
+        grams_per_raw = await _gather(results, addresses, scale)
+        for mass in masses:
+            if place is not None:
+                await place(mass)
+            active = [a for a in addresses if results[a].error is None]
+
+            async def point(address):
+                return await collect_point(clients[address], mass, grams_per_raw[address],
+                                           ci_g, **options)
+
+            for address, p in (await _gather(results, active, point)).items():
+                results[address].points.append(p)
+                if on_point is not None:
+                    on_point(address, p)
+
+        _fit_results([r for r in results.values() if r.error is None], masses)
+        if apply:
+            async def write(address):
+                await _apply(clients[address], results[address])
+            await _gather(results, [a for a in addresses if results[a].error is None], write)
+    return [results[a] for a in addresses]
+
+
+async def _gather(results, addresses, job):
+    """Run job(address) for all addresses, record failures in results"""
+    outcomes = await asyncio.gather(*(job(a) for a in addresses), return_exceptions=True)
+    done = {}
+    for address, outcome in zip(addresses, outcomes):
+        if isinstance(outcome, SensorClientError):
+            results[address].error = str(outcome)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            done[address] = outcome
+    return done
+
+
+def print_results(results):
+    print(f"{'module':20} {'offset':>9} {'linear':>7} {'max res g':>10} "
+          f"{'nonlin %':>9}  status")
+    for r in results:
+        if r.error is not None:
+            print(f"{r.address:20} {'':>9} {'':>7} {'':>10} {'':>9}  {r.error}")
+            continue
+        unconverged = sum(not p.converged for p in r.points)
+        status = "applied" if r.applied else "not applied"
+        if unconverged:
+            status += f", {unconverged} point(s) hit the sample limit"
+        if r.tare_offset:
+            status += f", session tare {r.tare_offset} still active"
+        print(f"{r.address:20} {r.offset:>9} {r.linear:>7} "
+              f"{max(abs(v) for v in r.residuals_g):>10.2f} {r.nonlinearity_pct:>9.3f}  {status}")
+
+
+async def _run(args):
+    addresses = parse_addresses(args.devices)
+    loop = asyncio.get_running_loop()
+
+    async def place(mass):
+        await loop.run_in_executor(
+            None, input, f"Place {mass:g} g on all {len(addresses)} module(s), press Enter ")
+
+    def on_point(address, p):
+        flag = "" if p.converged else " (limit)"
+        print(f"  {address}: {p.mass_g:g} g  raw {p.mean_raw:.1f} +/- {p.ci_raw:.1f} "
+              f"({p.count} samples, {p.duration_s:.1f} s){flag}")
+
+    results = await calibrate_fleet(addresses, args.masses, place, args.ci, args.apply,
+                                    args.timeout, on_point=on_point, max_s=args.max_s)
+    print_results(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-point calibration of Weight Modules")
+    parser.add_argument("--devices", default="192.168.1.233",
+                        help="Module addresses and ranges, e.g. 192.168.1.220-235")
+    parser.add_argument("--masses", default=",".join(str(m) for m in MASSES_G),
+                        type=lambda s: [float(m) for m in s.split(",")],
+                        help="Reference masses in grams, comma separated")
+    parser.add_argument("--ci", type=float, default=CI_G,
+                        help="Target 95%% confidence half-width per mass, grams")
+    parser.add_argument("--max-s", type=float, default=MAX_S, help="Sampling limit per mass")
+    parser.add_argument("--apply", action="store_true", help="Write /api/sensor_settings")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_run(args))
+    except (KeyboardInterrupt, EOFError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Columnar capture files
+Records timestamped sensor_read samples and the request latency into
+an append-only file for post-mortem analysis, and replays them into the
+GUIs at 1x or accelerated speed. Streamed and shared-ring captures have no
+request per sample; their latency column is NaN and the header says so.
+
+Layout (little-endian):
+  file header 16 bytes: magic "WMCP", u16 version, u16 flags (1: no latency),
+           f64 created
+  chunk:   magic "CHNK", u32 count, u64 first sample index, f64 first time,
+           f64 last time, then one column of `count` values per field:
+           f64 host time, f32 latency_s (NaN if none), u32 seq, u32 timestamp_ms,
+           i32 weight, i32 distance, i32 tare_offset, u8 flags,
+           zero padded to 8 bytes
+  index:   magic "INDX", u32 entries, u64 previous index offset (0: none),
+           entries of f64 first time, f64 last time, u64 chunk offset,
+           u64 first sample index, u32 count, u32 reserved
+  footer:  magic "WMFT", u32 reserved, u64 last index offset
+
+Samples are buffered and written a chunk at a time. Every INDEX_EVERY
+chunks an index block lists them, chained to the previous block, and the
+footer points at the last one: a reader finds any point of a multi-day
+capture without touching the sample data. A capture that was not closed
+(crash, power loss) has no footer and is recovered by hopping over the
+chunk headers.
+
+    python capture.py record --url http://192.168.1.233 --out pour.wmc
+    python capture.py info pour.wmc
+"""
+
+import argparse
+import bisect
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from sensor_client import SensorRead
+
+MAGIC = b"WMCP"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHd")
+CHUNK_HEADER = struct.Struct("<4sIQdd")
+INDEX_HEADER = struct.Struct("<4sIQ")
+INDEX_ENTRY = struct.Struct("<ddQQII")
+FOOTER = struct.Struct("<4sIQ")
+CHUNK_MAGIC = b"CHNK"
+INDEX_MAGIC = b"INDX"
+FOOTER_MAGIC = b"WMFT"
+
+# (field, array typecode) in file order
+COLUMNS = (("time", "d"), ("latency", "f"), ("seq", "I"), ("timestamp", "I"),
+           ("weight", "i"), ("distance", "i"), ("tare_offset", "i"), ("flags", "B"))
+SAMPLE_SIZE = sum(array(code).itemsize for _, code in COLUMNS)
+
+CHUNK_SIZE = 4096   # Samples per chunk
+INDEX_EVERY = 64    # Chunks per index block
+FLUSH_S = 5.0       # Write a partial chunk at least this often
+
+FLAG_CUP = 1
+FLAG_TARE = 2
+FILE_NO_LATENCY = 1  # File header flag: latency column is not measured
+
+
+def chunk_bytes(count):
+    """Size of a chunk of `count` samples, header and padding included"""
+    return (CHUNK_HEADER.size + count * SAMPLE_SIZE + 7) & ~7
+
+
+class CaptureWriter:
+    """Append samples to a new capture file, a chunk at a time"""
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, index_every=INDEX_EVERY,
+                 flush_s=FLUSH_S, latency=True):
+        self.file = open(path, "xb")
+        self.path = path
+        self.latency = latency  # False: the source has no request latency
+        self.chunk_size = chunk_size
+        self.index_every = index_every
+        self.flush_s = flush_s
+        self.count = 0  # Samples on disk
+        self._columns = {name: array(code) for name, code in COLUMNS}
+        self._entries = []  # Chunks not yet listed in an index block
+        self._last_index = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, 0 if latency else FILE_NO_LATENCY,
+                                         time.time()))
+
+    def append(self, reading, host_time=None, latency_s=None):
+        """Buffer one SensorRead"""
+        flags = (FLAG_CUP if reading.cup_true else 0) | (FLAG_TARE if reading.tare else 0)
+        with self._lock:
+            c = self._columns
+            c["time"].append(time.time() if host_time is None else host_time)
+            c["latency"].append((latency_s or 0.0) if self.latency else math.nan)
+            c["seq"].append(reading.seq & 0xFFFFFFFF)
+            c["timestamp"].append(reading.timestamp & 0xFFFFFFFF)
+            c["weight"].append(reading.weight)
+            c["distance"].append(reading.distance)
+            c["tare_offset"].append(reading.tare_offset or 0)
+            c["flags"].append(flags)
+            if (len(c["time"]) >= self.chunk_size
+                    or time.monotonic() - self._last_flush >= self.flush_s):
+                self._write_chunk()
+
+    def flush(self):
+        """Write the buffered samples as a (short) chunk"""
+        with self._lock:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        self._last_flush = time.monotonic()
+        times = self._columns["time"]
+        count = len(times)
+        if count == 0:
+            return
+        offset = self.file.tell()
+        entry = (times[0], times[-1], offset, self.count, count)
+        parts = [CHUNK_HEADER.pack(CHUNK_MAGIC, count, self.count, times[0], times[-1])]
+        for name, _ in COLUMNS:
+            column = self._columns[name]
+            if sys.byteorder != "little":
+                column.byteswap()
+            parts.append(column.tobytes())
+            del column[:]
+        data = b"".join(parts)
+        self.file.write(data + bytes(chunk_bytes(count) - len(data)))
+        self.count += count
+        self._entries.append(entry)
+        if len(self._entries) >= self.index_every:
+            self._write_index()
+        self.file.flush()
+
+    def _write_index(self):
+        if not self._entries:
+            return
+        offset = self.file.tell()
+        parts = [INDEX_HEADER.pack(INDEX_MAGIC, len(self._entries), self._last_index)]
+        parts += [INDEX_ENTRY.pack(*entry, 0) for entry in self._entries]
+        self.file.write(b"".join(parts))
+        self._entries = []
+        self._last_index = offset
+
+    def close(self):
+        """Write the remaining samples, the last index block and the footer"""
+        with self._lock:
+            if self.file.closed:
+                return
+            self._write_chunk()
+            self._write_index()
+            self.file.write(FOOTER.pack(FOOTER_MAGIC, 0, self._last_index))
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CaptureChunk:
+    """Columns of one chunk, zero-copy views into the mapped file"""
+
+    def __init__(self, buf, offset):
+        magic, count, first, t_first, t_last = CHUNK_HEADER.unpack_from(buf, offset)
+        if magic != CHUNK_MAGIC:
+            raise ValueError(f"No chunk at offset {offset}")
+        self.count = count
+        self.first = first
+        self.t_first = t_first
+        self.t_last = t_last
+        pos = offset + CHUNK_HEADER.size
+        for name, code in COLUMNS:
+            size = count * array(code).itemsize
+            if sys.byteorder == "little":
+                column = buf[pos:pos + size].cast(code)
+            else:
+                column = array(code, buf[pos:pos + size])
+                column.byteswap()
+            setattr(self, name, column)
+            pos += size
+
+    def __len__(self):
+        return self.count
+
+    def reading(self, i):
+        flags = self.flags[i]
+        return SensorRead(cup_true=bool(flags & FLAG_CUP), tare=bool(flags & FLAG_TARE),
+                          weight=self.weight[i], distance=self.distance[i],
+                          seq=self.seq[i], timestamp=self.timestamp[i],
+                          tare_offset=self.tare_offset[i])
+
+
+class CaptureReader:
+    """Memory-mapped capture file with seeking by host time"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size < FILE_HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} is not a capture file")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.map)
+        self._chunks = {}
+        magic, version, flags, self.created = FILE_HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a capture file (v{VERSION})")
+        self.has_latency = not flags & FILE_NO_LATENCY
+        index = self._read_index()
+        self.complete = index is not None  # Closed cleanly
+        # (first time, last time, offset, first sample, count) per chunk
+        self.entries = index if index is not None else self._scan()
+        self._firsts = [e[3] for e in self.entries]
+        self._t_lasts = [e[1] for e in self.entries]
+        self.count = self.entries[-1][3] + self.entries[-1][4] if self.entries else 0
+
+    def _read_index(self):
+        """Chunk table from the footer and index chain, None without footer"""
+        end = len(self.buf) - FOOTER.size
+        if end < FILE_HEADER.size:
+            return None
+        magic, _, offset = FOOTER.unpack_from(self.buf, end)
+        if magic != FOOTER_MAGIC:
+            return None
+        blocks = []
+        while offset:
+            magic, count, previous = INDEX_HEADER.unpack_from(self.buf, offset)
+            if magic != INDEX_MAGIC:
+                return None
+            pos = offset + INDEX_HEADER.size
+            blocks.append([INDEX_ENTRY.unpack_from(self.buf, pos + i * INDEX_ENTRY.size)[:5]
+                           for i in range(count)])
+            offset = previous
+        return [entry for block in reversed(blocks) for entry in block]
+
+    def _scan(self):
+        """Rebuild the chunk table of an unclosed capture from chunk headers"""
+        entries = []
+        pos, end = FILE_HEADER.size, len(self.buf)
+        while pos + CHUNK_HEADER.size <= end:
+            magic, count, first, t_first, t_last = CHUNK_HEADER.unpack_from(self.buf, pos)
+            if magic == INDEX_MAGIC:
+                pos += INDEX_HEADER.size + count * INDEX_ENTRY.size
+                continue
+            if magic != CHUNK_MAGIC or pos + chunk_bytes(count) > end:
+                break  # Torn last write
+            entries.append((t_first, t_last, pos, first, count))
+            pos += chunk_bytes(count)
+        return entries
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def start_time(self):
+        return self.entries[0][0] if self.entries else None
+
+    @property
+    def end_time(self):
+        return self.entries[-1][1] if self.entries else None
+
+    def chunk(self, n):
+        chunk = self._chunks.get(n)
+        if chunk is None:
+            chunk = self._chunks[n] = CaptureChunk(self.buf, self.entries[n][2])
+        return chunk
+
+    def chunks(self):
+        """Iterate over all chunks, e.g. for column-wise analysis"""
+        for n in range(len(self.entries)):
+            yield self.chunk(n)
+
+    def seek(self, t):
+        """Index of the first sample at or after host time t"""
+        n = bisect.bisect_left(self._t_lasts, t)
+        if n == len(self.entries):
+            return self.count
+        chunk = self.chunk(n)
+        return chunk.first + bisect.bisect_left(chunk.time, t)
+
+    def samples(self, start=0):
+        """Yield (host_time, SensorRead, latency_s) from sample index `start`"""
+        n = bisect.bisect_right(self._firsts, start) - 1
+        if n < 0 or start >= self.count:
+            return
+        i = start - self._firsts[n]
+        for n in range(n, len(self.entries)):
+            chunk = self.chunk(n)
+            for j in range(i, chunk.count):
+                yield chunk.time[j], chunk.reading(j), chunk.latency[j]
+            i = 0
+
+    def close(self):
+        # Column views pin the map, release them first
+        for chunk in self._chunks.values():
+            for name, _ in COLUMNS:
+                column = getattr(chunk, name)
+                if isinstance(column, memoryview):
+                    column.release()
+        self._chunks = {}
+        self.buf.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReplayThread(threading.Thread):
+    """Publish a capture with its recorded spacing, `speed` times faster
+
+    publish(SensorRead) runs on this thread. Set `paused` to hold the
+    playback, seek(t) jumps to host time t of the capture.
+    """
+
+    def __init__(self, path, publish, speed=1.0, start_time=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.publish = publish
+        self.speed = speed
+        self.running = True
+        self.paused = False
+        self.position = None  # Host time of the last published sample
+        self._seek = start_time
+
+    def seek(self, t):
+        self._seek = t
+
+    def run(self):
+        with CaptureReader(self.path) as reader:
+            samples = reader.samples()
+            sample = None  # Next sample to publish
+            anchor = None  # (capture time, perf_counter) to pace against
+            while self.running:
+                if self._seek is not None:
+                    samples = reader.samples(reader.seek(self._seek))
+                    self._seek = None
+                    sample = anchor = None
+                if self.paused:
+                    anchor = None
+                    time.sleep(0.05)
+                    continue
+                if sample is None:
+                    sample = next(samples, None)
+                    if sample is None:
+                        break  # End of capture
+                t, reading, _ = sample
+                if anchor is None:
+                    anchor = (t, time.perf_counter())
+                delay = anchor[1] + (t - anchor[0]) / self.speed - time.perf_counter()
+                if delay > 0.001:
+                    time.sleep(min(delay, 0.05))  # Stay responsive to pause/seek
+                    continue
+                self.position = t
+                self.publish(reading)
+                sample = None
+            samples = None  # Drop the chunk views before the reader closes
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+
+def print_info(path):
+    with CaptureReader(path) as reader:
+        state = "" if reader.complete else " (not closed, recovered)"
+        if not reader.has_latency:
+            state += " (no latency, stream)"
+        print(f"{path}: {len(reader)} samples in {len(reader.entries)} chunks{state}")
+        if reader.count:
+            start, end = reader.start_time, reader.end_time
+            fmt = "%Y-%m-%d %H:%M:%S"
+            print(f"  {time.strftime(fmt, time.localtime(start))} - "
+                  f"{time.strftime(fmt, time.localtime(end))} ({end - start:.1f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and inspect capture files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Record a module into a new capture file")
+    record.add_argument("--url", default="http://192.168.1.233", help="Module address")
+    record.add_argument("--out", required=True, help="Capture file to create")
+    record.add_argument("--interval-ms", type=int, default=100)
+    record.add_argument("--stream", action="store_true", help="Record /websocket pushes")
+    info = commands.add_parser("info", help="Summarize a capture file")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        print_info(args.path)
+        return
+
+    from sensor_pipeline import SensorPipeline
+    pipeline = SensorPipeline(args.url, args.interval_ms, stream=args.stream, record=args.out)
+    pipeline.start()
+    print(f"Recording {args.url} to {args.out}, Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+    print_info(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+ESP32 Weight Module simulator
+Serves the REST and WebSocket surface of src/src/mongoose_impl.c on
+localhost, so clients can be benchmarked and tested without a board.
+Synthetic HX711 raw values go through the same integer calibration math
+as hx711_raw_to_weight(), distances through the HC-SR04 echo conversion.
+Latency, jitter, hanging requests and tare delays are injectable, and any
+number of devices run from one event loop on consecutive ports.
+
+    python device_simulator.py --devices 50 --port 8000 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+
+try:
+    from aiohttp import WSMsgType, web
+except ImportError:  # Checked in SimulatedFleet
+    web = None
+
+from sensor_binary import (FLAG_CUP, FLAG_MORE, FLAG_TARE, HEADER, MAGIC,
+                           RECORD, VERSION)
+
+# Firmware constants (mongoose_glue.h, hc_sr04.c, sensor_sampler.h)
+HISTORY_SIZE = 1024          # SENSOR_HISTORY_SIZE
+HISTORY_BATCH_MAX = 256      # SENSOR_HISTORY_BATCH_MAX
+TARE_SAMPLES_DEFAULT = 5
+TARE_SAMPLES_MAX = 80
+WS_DEFAULT_INTERVAL_MS = 100  # WS_SENSOR_READ_MS in wizard.ino
+WS_MIN_INTERVAL_MS = 10       # WIZARD_WS_MIN_INTERVAL_MS
+ECHO_TIMEOUT_US = 10000       # hc_sr04_read_distance() echo timeout
+PERF_PROBES = ("hx711_read_raw", "hc_sr04_read_distance", "glue_get_sensor_read",
+               "mongoose_poll")  # perf.c
+HX711_READ_US = 60            # 25 SCK pulses plus call overhead
+TRIGGER_US = 12               # HC-SR04 trigger pulse and settle time
+
+# Physical load cell of the simulated board; the API settings only change
+# how raw values are interpreted, exactly like on hardware
+CELL_OFFSET = -467384
+CELL_LINEAR = 1477
+
+NO_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+JSON_HEADERS = {"Content-Type": "application/json", **NO_CACHE_HEADERS}
+
+
+def _int32(value):
+    """Wrap to a C int32_t"""
+    return (value + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+def _c_div(a, b):
+    """C integer division, truncating toward zero"""
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+def raw_to_weight(raw, tare_offset, offset, multiplier):
+    """hx711_raw_to_weight(): (raw - tare - offset) * multiplier / 1000"""
+    if multiplier == 0:
+        return 0
+    calibrated = _int32(raw - tare_offset - offset)
+    weight = _c_div(_int32(calibrated * multiplier), 1000)
+    return min(max(weight, 0), 1000)  # 1 kg load cell
+
+
+def echo_to_distance(echo_us):
+    """hc_sr04_read_distance(): echo time in us to mm, 0.343 mm/us / 2"""
+    if echo_us >= ECHO_TIMEOUT_US:
+        return ECHO_TIMEOUT_US * 343 // 2000  # No echo: ~1715 mm
+    return int(echo_us) * 343 // 2000
+
+
+@dataclass
+class SimConfig:
+    """Sensor timing and fault injection of a simulated device"""
+    sample_rate_hz: float = 10.0  # HX711 conversions per second (RATE pin low)
+    latency_ms: float = 0.0       # Added to every HTTP response
+    jitter_ms: float = 0.0        # Uniform +- spread around latency_ms
+    timeout_rate: float = 0.0     # Probability that a request hangs
+    hang_s: float = 30.0          # How long a hanging request stalls
+    tare_delay_ms: float = 0.0    # Extra time before a tare completes
+    blocking_tare: bool = False   # Old firmware: tare stalls the whole device
+    noise_raw: float = 1.0        # HX711 noise, raw counts (1 sigma, ~1.5 g)
+    cycle_s: float = 20.0         # Cup placed / filled / removed cycle
+
+
+@dataclass
+class _Tare:
+    target_seq: int
+    samples: int
+    total: int = 0
+    count: int = 0
+
+
+@dataclass
+class SimulatedDevice:
+    """State of one simulated module, mirrors the glue functions"""
+    config: SimConfig = field(default_factory=SimConfig)
+    seed: int = None
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+        self.boot = time.monotonic()
+        self.phase = self.rng.uniform(0, self.config.cycle_s)
+        self.sensor_settings = {"distance_trig": 80, "linear": 1477,
+                                "offset": -467384}
+        self.settings = {"log_level": 0, "ip": "192.168.1.134"}
+        self.tare = False
+        self.tare_offset = 0
+        self.version = 0  # s_device_change_version
+        self.busy_until = 0.0
+        self.seq = 0
+        self.history = [None] * HISTORY_SIZE
+        self._tare = None
+        self.reference_g = None  # Mass placed by a test, replaces the cup cycle
+        self.perf_reset()
+
+    # --- Synthetic sensors ---
+
+    def load(self, t):
+        """Grams on the cell and object distance in mm at time t (s)"""
+        if self.reference_g is not None:
+            return float(self.reference_g), 200.0
+        cycle = self.config.cycle_s
+        pos = ((t + self.phase) % cycle) / cycle
+        if 0.25 <= pos < 0.75:  # Cup present, being filled
+            return 150.0 + 250.0 * (pos - 0.25) / 0.5, 45.0
+        return 0.0, 200.0
+
+    def sample(self, seq, t):
+        grams, distance = self.load(t)
+        raw = CELL_OFFSET + grams * 1000.0 / CELL_LINEAR
+        raw = int(round(raw + self.rng.gauss(0.0, self.config.noise_raw)))
+        echo_us = (distance + self.rng.gauss(0.0, 1.5)) * 2000.0 / 343.0
+        distance = echo_to_distance(max(echo_us, 0.0))
+        self.perf_record("hx711_read_raw", HX711_READ_US)
+        self.perf_record("hc_sr04_read_distance",
+                         TRIGGER_US + min(max(echo_us, 0.0), ECHO_TIMEOUT_US))
+        s = self.sensor_settings
+        self._collect_tare(seq, raw)
+        return {
+            "seq": seq,
+            "timestamp": int(t * 1000) & 0xFFFFFFFF,
+            "raw": raw,
+            "weight": raw_to_weight(raw, self.tare_offset, s["offset"], s["linear"]),
+            "distance": distance,
+            "cup_true": distance < s["distance_trig"],
+        }
+
+    def advance(self):
+        """Generate the samples due since the last call (sampling task)"""
+        t = time.monotonic() - self.boot
+        due = int(t * self.config.sample_rate_hz)
+        # Samples older than the history would be dropped anyway
+        self.seq = max(self.seq, due - HISTORY_SIZE)
+        while self.seq < due:
+            self.seq += 1
+            self.history[self.seq % HISTORY_SIZE] = self.sample(
+                self.seq, self.seq / self.config.sample_rate_hz)
+        if self._tare is not None and self.seq >= self._tare.target_seq:
+            self._finish_tare()
+        return self.latest()
+
+    def latest(self):
+        if self.seq == 0:
+            return {"seq": 0, "timestamp": 0, "raw": 0, "weight": 0,
+                    "distance": 0, "cup_true": False}
+        return self.history[self.seq % HISTORY_SIZE]
+
+    # --- Tare (sensor_sampler_request_tare) ---
+
+    def request_tare(self, samples):
+        samples = min(max(samples, 1), TARE_SAMPLES_MAX)
+        self.advance()
+        self._tare = _Tare(target_seq=self.seq + samples, samples=samples)
+        return self.tare_seconds(samples)
+
+    def tare_seconds(self, samples):
+        return (samples / self.config.sample_rate_hz
+                + self.config.tare_delay_ms / 1000.0)
+
+    def tare_pending(self):
+        self.advance()
+        return self._tare is not None
+
+    def _collect_tare(self, seq, raw):
+        if self._tare is not None and seq > self._tare.target_seq - self._tare.samples:
+            self._tare.total += raw
+            self._tare.count += 1
+
+    def _finish_tare(self):
+        tare, self._tare = self._tare, None
+        if tare.count:
+            self.tare_offset = int(tare.total / tare.count)
+        self.version += 1  # glue_update_state()
+
+    # --- Timing probes (perf.c) ---
+
+    def perf_record(self, name, us):
+        stat = self.perf[name]
+        stat["count"] += 1
+        stat["total_us"] += int(us)
+        stat["max_us"] = max(stat["max_us"], int(us))
+
+    def perf_reset(self):
+        self.perf = {name: {"count": 0, "total_us": 0, "max_us": 0}
+                     for name in PERF_PROBES}
+        self.perf_since = time.monotonic()
+
+    # --- Data handlers (handle_object semantics) ---
+
+    def sensor_read(self):
+        start = time.perf_counter()
+        s = self.advance()
+        data = {"cup_true": s["cup_true"], "tare": self.tare,
+                "weight": s["weight"], "distance": s["distance"],
+                "seq": s["seq"], "timestamp": s["timestamp"],
+                "tare_offset": self.tare_offset}
+        self.perf_record("glue_get_sensor_read", (time.perf_counter() - start) * 1e6)
+        return data
+
+    def set_sensor_read(self, data):
+        """glue_set_sensor_read(); returns the tare duration in seconds"""
+        if data.get("tare", self.tare):
+            self.tare = True
+            return self.request_tare(TARE_SAMPLES_DEFAULT)
+        self.tare = False
+        return 0.0
+
+    def set_sensor_settings(self, data):
+        """glue_set_sensor_settings() validation"""
+        s = self.sensor_settings
+        if 0 < data.get("distance_trig", 0) <= 400:
+            s["distance_trig"] = int(data["distance_trig"])
+        if data.get("linear", 0) > 0:
+            s["linear"] = int(data["linear"])
+        s["offset"] = int(data.get("offset", s["offset"]))
+
+    def set_settings(self, data):
+        self.settings["log_level"] = int(data.get("log_level", self.settings["log_level"]))
+        self.settings["ip"] = str(data.get("ip", self.settings["ip"]))[:13]  # char[14]
+
+    def collect_history(self, since, limit):
+        """history_collect(): (samples, head, more)"""
+        self.advance()
+        head = self.seq
+        oldest = max(head - (HISTORY_SIZE - 2), 1, since + 1)
+        last = min(head, oldest + limit - 1)
+        samples = [self.history[seq % HISTORY_SIZE] for seq in range(oldest, last + 1)]
+        return samples, head, last < head
+
+
+def _pack_bin(samples, head, more, tare):
+    """reply_bin(): packed little-endian batch, see sensor_binary.py"""
+    buf = bytearray(HEADER.size + len(samples) * RECORD.size)
+    HEADER.pack_into(buf, 0, MAGIC, VERSION, FLAG_MORE if more else 0,
+                     head, len(samples))
+    for i, s in enumerate(samples):
+        flags = (FLAG_CUP if s["cup_true"] else 0) | (FLAG_TARE if tare else 0)
+        RECORD.pack_into(buf, HEADER.size + i * RECORD.size, s["seq"],
+                         s["timestamp"], s["weight"], s["distance"], flags)
+    return bytes(buf)
+
+
+def _query_int(request, name, default):
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+
+def _fault_middleware(device):
+    """Latency, jitter, hanging requests and blocking-tare stalls"""
+    @web.middleware
+    async def inject_faults(request, handler):
+        config = device.config
+        # A blocking tare stalls the single-threaded Mongoose loop
+        busy = device.busy_until - time.monotonic()
+        if busy > 0:
+            await asyncio.sleep(busy)
+        if config.timeout_rate and device.rng.random() < config.timeout_rate:
+            await asyncio.sleep(config.hang_s)
+        delay = config.latency_ms + device.rng.uniform(-config.jitter_ms,
+                                                       config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+        if request.path == "/websocket":
+            return await handler(request)  # Lives for the whole connection
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            # One request handled per poll: the closest to a mongoose_poll() pass
+            device.perf_record("mongoose_poll", (time.perf_counter() - start) * 1e6)
+    return inject_faults
+
+
+class DeviceServer:
+    """aiohttp application serving one SimulatedDevice"""
+
+    def __init__(self, device):
+        self.device = device
+        self.app = web.Application(middlewares=[_fault_middleware(device)])
+        self.app.add_routes([
+            web.get("/api/ok", self.ok),
+            web.get("/api/heartbeat", self.heartbeat),
+            web.route("*", "/api/sensor_settings", self.sensor_settings),
+            web.route("*", "/api/settings", self.settings),
+            web.route("*", "/api/sensor_read", self.sensor_read),
+            web.route("*", "/api/tare", self.tare),
+            web.get("/api/sensor_history", self.sensor_history),
+            web.get("/api/sensor_raw", self.sensor_raw),
+            web.get("/api/sensor_read_bin", self.sensor_read_bin),
+            web.get("/api/sensor_history_bin", self.sensor_history_bin),
+            web.route("*", "/api/perf", self.perf),
+            web.get("/websocket", self.websocket),
+        ])
+
+    @staticmethod
+    def reply(data):
+        return web.Response(text=json.dumps(data, separators=(",", ":")) + "\n",
+                            headers=JSON_HEADERS)
+
+    async def body(self, request):
+        if not request.body_exists:
+            return None
+        try:
+            return json.loads(await request.read())
+        except ValueError:
+            return None
+
+    async def ok(self, request):
+        return web.Response(text="true\n", headers=JSON_HEADERS)
+
+    async def heartbeat(self, request):
+        return self.reply({"version": self.device.version})
+
+    async def handle_object(self, request, getter, setter):
+        """Merge a POST body into the object, bump version on change
+
+        Settings-type objects: replies carry a CRC of the values as ETag
+        and a matching If-None-Match is answered with 304.
+        """
+        device = self.device
+        data = await self.body(request)
+        if isinstance(data, dict):
+            before = getter()
+            setter({k: v for k, v in data.items() if k in before})
+            if getter() != before:
+                device.version += 1
+        values = getter()
+        etag = '"%08x"' % zlib.crc32(json.dumps(values, sort_keys=True).encode())
+        if data is None and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={**NO_CACHE_HEADERS, "ETag": etag})
+        response = self.reply(values)
+        response.headers["ETag"] = etag
+        return response
+
+    async def blocking_delay(self, seconds):
+        if self.device.config.blocking_tare:
+            self.device.busy_until = time.monotonic() + seconds
+            await asyncio.sleep(seconds)
+
+    async def sensor_settings(self, request):
+        device = self.device
+        return await self.handle_object(request, lambda: dict(device.sensor_settings),
+                                        device.set_sensor_settings)
+
+    async def settings(self, request):
+        device = self.device
+        return await self.handle_object(request, lambda: dict(device.settings),
+                                        device.set_settings)
+
+    async def sensor_read(self, request):
+        device = self.device
+        # seq, timestamp and tare_offset are readonly
+        getter = lambda: {k: v for k, v in device.sensor_read().items()
+                          if k in ("cup_true", "tare", "weight", "distance")}
+        data = await self.body(request)
+        if isinstance(data, dict):
+            before = getter()
+            seconds = device.set_sensor_read(data)
+            if device.tare != before["tare"]:
+                device.version += 1
+            if seconds:
+                await self.blocking_delay(seconds)
+        return self.reply(device.sensor_read())
+
+    async def tare(self, request):
+        """Action handler: POST starts, the reply waits for completion"""
+        device = self.device
+        data = await self.body(request)
+        if data is None:
+            return self.reply(device.tare_pending())
+        samples = data.get("samples", TARE_SAMPLES_DEFAULT) if isinstance(data, dict) else data
+        try:
+            samples = int(samples)
+        except (TypeError, ValueError):
+            samples = TARE_SAMPLES_DEFAULT
+        if samples < 1:
+            samples = TARE_SAMPLES_DEFAULT
+        seconds = device.request_tare(samples)
+        device.tare = True
+        await self.blocking_delay(seconds)
+        # Mongoose polls the checker; emulate with the sample clock
+        deadline = time.monotonic() + seconds
+        while device.tare_pending() or time.monotonic() < deadline:
+            await asyncio.sleep(min(0.01, max(deadline - time.monotonic(), 0.001)))
+        return self.reply(True)
+
+    def history_query(self, request):
+        since = max(_query_int(request, "since", 0), 0)
+        limit = _query_int(request, "limit", HISTORY_BATCH_MAX)
+        if limit <= 0 or limit > HISTORY_BATCH_MAX:
+            limit = HISTORY_BATCH_MAX
+        return self.device.collect_history(since, limit)
+
+    async def sensor_history(self, request):
+        samples, head, more = self.history_query(request)
+        rows = [[s["seq"], s["timestamp"], s["weight"], s["distance"],
+                 int(s["cup_true"])] for s in samples]
+        return self.reply({"samples": rows, "head": head, "more": more})
+
+    async def sensor_raw(self, request):
+        samples, head, more = self.history_query(request)
+        rows = [[s["seq"], s["raw"]] for s in samples]
+        return self.reply({"samples": rows, "head": head, "more": more})
+
+    async def sensor_read_bin(self, request):
+        s = self.device.advance()
+        return web.Response(body=_pack_bin([s], s["seq"], False, self.device.tare),
+                            content_type="application/octet-stream",
+                            headers={"Cache-Control": "no-cache"})
+
+    async def sensor_history_bin(self, request):
+        samples, head, more = self.history_query(request)
+        return web.Response(body=_pack_bin(samples, head, more, False),
+                            content_type="application/octet-stream",
+                            headers={"Cache-Control": "no-cache"})
+
+    async def perf(self, request):
+        """glue_reply_perf(): counters since the last reset, POST resets"""
+        device = self.device
+        now = time.monotonic()
+        data = {"since_ms": int((device.perf_since - device.boot) * 1000),
+                "now_ms": int((now - device.boot) * 1000),
+                "probes": {name: dict(stat) for name, stat in device.perf.items()}}
+        if request.method == "POST":
+            device.perf_reset()
+        return self.reply(data)
+
+    async def websocket(self, request):
+        interval = _query_int(request, "interval", WS_DEFAULT_INTERVAL_MS)
+        interval = max(interval, WS_MIN_INTERVAL_MS) / 1000.0
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        receiver = asyncio.ensure_future(self._drain(ws))
+        try:
+            deadline = time.monotonic()
+            while not ws.closed:
+                deadline = max(deadline + interval, time.monotonic())
+                await asyncio.sleep(deadline - time.monotonic())
+                busy = self.device.busy_until - time.monotonic()
+                if busy > 0:
+                    await asyncio.sleep(busy)
+                frame = json.dumps({"sensor_read": self.device.sensor_read()},
+                                   separators=(",", ":"))
+                await ws.send_str(frame)
+        except (ConnectionResetError, RuntimeError):
+            pass  # Client went away
+        finally:
+            receiver.cancel()
+        return ws
+
+    @staticmethod
+    async def _drain(ws):
+        # Received data is ignored, like MG_EV_WS_MSG in the firmware
+        async for msg in ws:
+            if msg.type == WSMsgType.ERROR:
+                break
+
+
+class SimulatedFleet:
+    """Run `count` simulated devices on consecutive ports of one loop"""
+
+    def __init__(self, count=1, host="127.0.0.1", base_port=8000, config=None,
+                 seed=None):
+        if web is None:
+            raise RuntimeError("The simulator requires aiohttp (pip install aiohttp)")
+        self.host = host
+        self.base_port = base_port
+        self.devices = [SimulatedDevice(config or SimConfig(),
+                                        None if seed is None else seed + i)
+                        for i in range(count)]
+        self._runners = []
+
+    @property
+    def urls(self):
+        return [f"http://{self.host}:{self.base_port + i}"
+                for i in range(len(self.devices))]
+
+    async def start(self):
+        for i, device in enumerate(self.devices):
+            runner = web.AppRunner(DeviceServer(device).app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, self.base_port + i).start()
+            self._runners.append(runner)
+
+    async def stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners.clear()
+
+
+class SimulatorThread(threading.Thread):
+    """SimulatedFleet on a background event loop, for scripts and benchmarks
+
+    start() returns once every device is listening; urls lists them.
+    """
+
+    def __init__(self, count=1, host="127.0.0.1", base_port=8000, config=None,
+                 seed=None):
+        super().__init__(daemon=True)
+        self.fleet = SimulatedFleet(count, host, base_port, config, seed)
+        self._ready = threading.Event()
+        self._loop = None
+        self._shutdown = None
+        self._error = None
+
+    @property
+    def urls(self):
+        return self.fleet.urls
+
+    def start(self):
+        super().start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self._shutdown = asyncio.Event()
+        try:
+            await self.fleet.start()
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            await self.fleet.stop()
+            return
+        self._ready.set()
+        await self._shutdown.wait()
+        await self.fleet.stop()
+
+    def stop(self):
+        """Shut all devices down and wait for the thread"""
+        if self._loop is not None and self._shutdown is not None:
+            self._loop.call_soon_threadsafe(self._shutdown.set)
+            self.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 Weight Module simulator")
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="First device port")
+    parser.add_argument("--rate", type=float, default=10.0, help="HX711 samples/s")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0,
+                        help="Probability that a request hangs")
+    parser.add_argument("--hang-s", type=float, default=30.0)
+    parser.add_argument("--tare-delay-ms", type=float, default=0.0)
+    parser.add_argument("--blocking-tare", action="store_true",
+                        help="Tare stalls the whole device (pre-sampler firmware)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = SimConfig(sample_rate_hz=args.rate, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, timeout_rate=args.timeout_rate,
+                       hang_s=args.hang_s, tare_delay_ms=args.tare_delay_ms,
+                       blocking_tare=args.blocking_tare)
+    fleet = SimulatedFleet(args.devices, args.host, args.port, config, args.seed)
+
+    async def serve():
+        await fleet.start()
+        print(f"Simulating {len(fleet.devices)} device(s):")
+        for url in fleet.urls:
+            print(f"  {url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await fleet.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
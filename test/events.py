@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Glass and pour event detection
+Turns a stream of sensor_read samples into events for an orchestrator:
+
+  glass_placed     distance below distance_trig for `debounce` samples
+  glass_removed    distance above distance_trig + hysteresis for `debounce`
+                   samples
+  weight_stable    weight spread within `stable_band` over the sliding window
+  target_reached   weight reached the target while a glass is present,
+                   re-armed when the glass is removed or the weight drops
+                   below target - target_hysteresis
+
+Events are delivered to callbacks and asyncio queues on the sample that
+triggers them, so with /websocket pushes at the sampling rate an event
+arrives within one sample period. stream_events() runs the whole chain
+on an asyncio loop:
+
+    async for event in stream_events("http://192.168.1.233", target_weight=250):
+        ...
+
+    python events.py --url http://192.168.1.233 --target 250
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+from sensor_client import AsyncSensorClient, SensorClientError
+
+GLASS_PLACED = "glass_placed"
+GLASS_REMOVED = "glass_removed"
+WEIGHT_STABLE = "weight_stable"
+TARGET_REACHED = "target_reached"
+
+DISTANCE_TRIG = 80       # Firmware default distance_trig (mm)
+HYSTERESIS_MM = 10
+DEBOUNCE = 3             # Consecutive samples before the glass state flips
+STABLE_WINDOW = 10       # Samples
+STABLE_BAND = 2          # Max - min weight within the window
+TARGET_HYSTERESIS = 5
+
+
+@dataclass
+class Event:
+    """One detected event, stamped with the sample that triggered it"""
+    kind: str
+    time: float      # Host time, s
+    timestamp: int   # Device time, ms since boot
+    seq: int
+    weight: int
+    distance: int
+
+    def to_json(self):
+        return asdict(self)
+
+
+class EventDetector:
+    """Debounced glass detection, stability and target checks per sample
+
+    feed() is not thread-safe; feed from one thread (e.g. a pipeline
+    subscription) or one asyncio task.
+    """
+
+    def __init__(self, distance_trig=DISTANCE_TRIG, hysteresis_mm=HYSTERESIS_MM,
+                 debounce=DEBOUNCE, stable_window=STABLE_WINDOW, stable_band=STABLE_BAND,
+                 target_weight=None, target_hysteresis=TARGET_HYSTERESIS):
+        self.distance_trig = distance_trig
+        self.hysteresis_mm = hysteresis_mm
+        self.debounce = debounce
+        self.stable_band = stable_band
+        self.target_weight = target_weight
+        self.target_hysteresis = target_hysteresis
+        self.window = deque(maxlen=stable_window)
+        self.glass = False
+        self.stable = False
+        self.target_armed = True
+        self._count = 0  # Consecutive samples voting for a glass change
+        self._callbacks = []
+        self._queues = []  # (loop, asyncio.Queue)
+        self.dropped = 0   # Events not delivered to a full bounded queue
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        """callback(Event) runs on the thread that feeds the detector"""
+        with self._lock:
+            self._callbacks = self._callbacks + [callback]
+
+    def remove_callback(self, callback):
+        with self._lock:
+            self._callbacks = [c for c in self._callbacks if c is not callback]
+
+    def queue(self, maxsize=0):
+        """New asyncio.Queue of events, call from the consuming event loop
+
+        With maxsize > 0 events arriving while the queue is full are
+        dropped and counted in `dropped`; feed() never blocks or raises.
+        """
+        q = asyncio.Queue(maxsize)
+        with self._lock:
+            self._queues = self._queues + [(asyncio.get_running_loop(), q)]
+        return q
+
+    def remove_queue(self, q):
+        with self._lock:
+            self._queues = [(loop, other) for loop, other in self._queues if other is not q]
+
+    def set_target(self, weight):
+        """New target weight (None disables), armed immediately"""
+        self.target_weight = weight
+        self.target_armed = True
+
+    def reset(self):
+        self.window.clear()
+        self.glass = False
+        self.stable = False
+        self.target_armed = True
+        self._count = 0
+
+    def _glass_vote(self, reading):
+        """True/False for glass present, None if the distance is invalid"""
+        if reading.distance < 0:
+            return None  # HC-SR04 timeout: keep the current state
+        if self.glass:
+            return reading.distance <= self.distance_trig + self.hysteresis_mm
+        return reading.distance < self.distance_trig
+
+    def feed(self, reading, host_time=None):
+        """Process one SensorRead, deliver and return the new events"""
+        host_time = time.time() if host_time is None else host_time
+        kinds = []
+
+        vote = self._glass_vote(reading)
+        if vote is None or vote == self.glass:
+            self._count = 0
+        else:
+            self._count += 1
+            if self._count >= self.debounce:
+                self._count = 0
+                self.glass = vote
+                self.target_armed = True
+                kinds.append(GLASS_PLACED if vote else GLASS_REMOVED)
+
+        self.window.append(reading.weight)
+        stable = (len(self.window) == self.window.maxlen
+                  and max(self.window) - min(self.window) <= self.stable_band)
+        if stable and not self.stable:
+            kinds.append(WEIGHT_STABLE)
+        self.stable = stable
+
+        target = self.target_weight
+        if target is not None and self.glass:
+            if self.target_armed and reading.weight >= target:
+                self.target_armed = False
+                kinds.append(TARGET_REACHED)
+            elif reading.weight < target - self.target_hysteresis:
+                self.target_armed = True
+
+        events = [Event(kind, host_time, reading.timestamp, reading.seq,
+                        reading.weight, reading.distance) for kind in kinds]
+        for event in events:
+            self._deliver(event)
+        return events
+
+    def _deliver(self, event):
+        for callback in self._callbacks:
+            callback(event)
+        for loop, q in self._queues:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self._put(q, event)
+            else:
+                loop.call_soon_threadsafe(self._put, q, event)
+
+    def _put(self, q, event):
+        try:
+            q.put_nowait(event)
+        except asyncio.QueueFull:
+            with self._lock:
+                self.dropped += 1
+
+    def attach(self, pipeline):
+        """Feed from a SensorPipeline, returns the subscription handle"""
+        return pipeline.subscribe(self.feed)
+
+
+async def stream_events(base_url, interval_ms=None, detector=None, on_error=None, **options):
+    """Yield events detected on the /websocket stream of one module
+
+    Without a detector one is built from the device's distance_trig and
+    `options` (EventDetector keyword arguments).
+    """
+    async with AsyncSensorClient(base_url) as client:
+        if detector is None:
+            if "distance_trig" not in options:
+                options["distance_trig"] = (await client.get_sensor_settings()).distance_trig
+            detector = EventDetector(**options)
+        async for reading in client.stream_sensor_read(interval_ms, on_error):
+            for event in detector.feed(reading):
+                yield event
+
+
+async def _print_events(args):
+    def on_error(error):
+        print(f"{time.strftime('%H:%M:%S')} error: {error}")
+    try:
+        async for event in stream_events(args.url, args.interval_ms, on_error=on_error,
+                                         target_weight=args.target,
+                                         stable_band=args.stable_band):
+            stamp = time.strftime("%H:%M:%S", time.localtime(event.time))
+            print(f"{stamp} {event.kind:15} weight={event.weight} "
+                  f"distance={event.distance} seq={event.seq}")
+    except SensorClientError as e:
+        print(f"Failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print glass and pour events of a module")
+    parser.add_argument("--url", default="http://192.168.1.233", help="Module address")
+    parser.add_argument("--interval-ms", type=int, help="WebSocket push interval")
+    parser.add_argument("--target", type=int, help="Target weight for target_reached")
+    parser.add_argument("--stable-band", type=int, default=STABLE_BAND)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_print_events(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+OpenMetrics exporter for Weight Modules
+Polls or streams any number of modules through one FleetMonitor (one
+event loop, one connection pool) and serves the latest state on
+/metrics. Scrapes render the in-memory state only, they never reach the
+devices.
+
+Metrics per device (label device="<address>"):
+  wm_up                        1 while the last request succeeded
+  wm_weight, wm_distance_mm    latest reading
+  wm_cup                       1 while cup_true
+  wm_readings_total            readings received
+  wm_sample_rate_hz            readings per second over the last RATE_WINDOW_S
+  wm_latency_seconds           histogram of the request round-trip (polling)
+                               or the gap between /websocket frames (stream)
+  wm_errors_total              failures by kind (timeout, connection, http,
+                               decode, other) and HTTP status; a stream that
+                               never connects counts one per attempt
+
+    python exporter.py --devices 192.168.1.220-235 --port 9476
+"""
+
+import argparse
+import bisect
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fleet import FleetMonitor, parse_addresses
+from sensor_client import DEFAULT_TIMEOUT
+
+DEFAULT_PORT = 9476
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+RATE_WINDOW_S = 10.0
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class DeviceMetrics:
+    """Counters and histogram of one device, updated on the loop thread"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last: +Inf only
+        self.latency_sum = 0.0
+        self.readings = 0
+        self.errors = {}  # (kind, status) -> count
+        self.arrivals = deque()  # monotonic() of readings in the rate window
+        self.started = time.monotonic()
+
+    def observe(self, latency_s, now):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency_s)] += 1
+        self.latency_sum += latency_s
+        self.readings += 1
+        self.arrivals.append(now)
+        self._trim(now)
+
+    def _trim(self, now):
+        while self.arrivals and now - self.arrivals[0] > RATE_WINDOW_S:
+            self.arrivals.popleft()
+
+    def rate(self, now):
+        self._trim(now)
+        window = min(RATE_WINDOW_S, now - self.started)
+        return len(self.arrivals) / window if window > 0 else 0.0
+
+
+def _labels(**labels):
+    text = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                    for k, v in labels.items() if v is not None)
+    return "{" + text + "}"
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsExporter(FleetMonitor):
+    """FleetMonitor that also keeps the metrics state for scrapes"""
+
+    def __init__(self, addresses, interval_ms=100, stream=False, timeout=DEFAULT_TIMEOUT,
+                 **options):
+        super().__init__(addresses, interval_ms, stream, timeout, **options)
+        self.metrics = {address: DeviceMetrics() for address in self.addresses}
+
+    def _update_reading(self, client, status, reading):
+        super()._update_reading(client, status, reading)
+        stats = client.stats
+        with self._lock:
+            self.metrics[status.address].observe(
+                stats.last_frame_interval_s if self.stream else stats.last_latency_s,
+                time.monotonic())
+
+    def _update_error(self, client, status, error):
+        super()._update_error(client, status, error)
+        key = (error.kind, error.status)
+        with self._lock:
+            errors = self.metrics[status.address].errors
+            errors[key] = errors.get(key, 0) + 1
+
+    def render(self, openmetrics=True):
+        """Exposition text of the current state"""
+        now = time.monotonic()
+        families = {}  # name -> (type, help, [lines])
+
+        def add(name, metric_type, help_text, value, sample=None, **labels):
+            family = families.setdefault(name, (metric_type, help_text, []))
+            family[2].append(f"{sample or name}{_labels(**labels)} {_number(value)}")
+
+        with self._lock:
+            for address in self.addresses:
+                status, m = self.status[address], self.metrics[address]
+                add("wm_up", "gauge", "Last request to the module succeeded",
+                    status.online, device=address)
+                if status.weight is not None:
+                    add("wm_weight", "gauge", "Latest weight", status.weight, device=address)
+                    add("wm_distance_mm", "gauge", "Latest HC-SR04 distance",
+                        status.distance, device=address)
+                    add("wm_cup", "gauge", "Glass detected (cup_true)", status.cup_true,
+                        device=address)
+                add("wm_readings", "counter", "Readings received", m.readings,
+                    sample="wm_readings_total", device=address)
+                add("wm_sample_rate_hz", "gauge",
+                    f"Readings per second over the last {RATE_WINDOW_S:g} s",
+                    m.rate(now), device=address)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), m.buckets):
+                    cumulative += count
+                    add("wm_latency_seconds", "histogram",
+                        "Request round-trip (polling) or /websocket frame gap (stream)",
+                        cumulative, sample="wm_latency_seconds_bucket", device=address,
+                        le="+Inf" if bound == float("inf") else repr(bound))
+                add("wm_latency_seconds", "histogram", None, m.readings,
+                    sample="wm_latency_seconds_count", device=address)
+                add("wm_latency_seconds", "histogram", None, m.latency_sum,
+                    sample="wm_latency_seconds_sum", device=address)
+                for (kind, status_code), count in sorted(m.errors.items(), key=str):
+                    add("wm_errors", "counter", "Failed requests by kind and HTTP status",
+                        count, sample="wm_errors_total", device=address, kind=kind,
+                        status=status_code)
+
+        out = []
+        for name, (metric_type, help_text, lines) in families.items():
+            # The 0.0.4 text format names counters with their _total suffix
+            type_name = name if openmetrics or metric_type != "counter" else name + "_total"
+            out.append(f"# HELP {type_name} {help_text}")
+            out.append(f"# TYPE {type_name} {metric_type}")
+            out.extend(lines)
+        if openmetrics:
+            out.append("# EOF")
+        return "\n".join(out) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics renders server.exporter; nothing else is served"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.server.exporter.render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per scrape would flood the journal
+
+
+def serve(exporter, host="", port=DEFAULT_PORT):
+    """Serve /metrics of a started exporter until interrupted"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.exporter = exporter
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenMetrics exporter for Weight Modules")
+    parser.add_argument("--devices", default="192.168.1.233",
+                        help="Module addresses and ranges, e.g. 192.168.1.220-235")
+    parser.add_argument("--interval-ms", type=int, default=1000, help="Per-module poll interval")
+    parser.add_argument("--stream", action="store_true", help="Use /websocket pushes")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--host", default="", help="Listen address (default: all)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    exporter = MetricsExporter(parse_addresses(args.devices), args.interval_ms,
+                               stream=args.stream, timeout=args.timeout)
+    exporter.start()
+    print(f"Exporting {len(exporter.addresses)} module(s) on :{args.port}/metrics")
+    try:
+        serve(exporter, args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+
+
+if __name__ == "__main__":
+    main()
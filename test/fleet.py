@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Fleet monitor for many ESP32 Weight Modules
+Polls (or streams) every module from one asyncio event loop. One shared
+aiohttp session serves all devices, a semaphore bounds the polls in
+flight and each device keeps its own fixed-rate schedule, so a slow or
+offline module never delays the others. Streams hold one connection per
+module for as long as they are open, so the pool is unbounded in stream
+mode.
+
+    python fleet.py --simulate 50 --stream     # Check against simulated modules
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+try:
+    import aiohttp
+except ImportError:  # Checked by AsyncSensorClient
+    aiohttp = None
+
+from scheduler import PollScheduler, probe_async
+from sensor_client import DEFAULT_TIMEOUT, AsyncSensorClient, SensorClientError
+
+MAX_CONCURRENCY = 32     # Polls in flight across the whole fleet
+
+
+def parse_addresses(spec):
+    """Expand "192.168.1.220-235, 192.168.1.240, host" into a host list
+
+    A range is either a last-octet range (a.b.c.d-e) or two full IPv4
+    addresses (a.b.c.d-a.b.c.e). Anything else is passed through as a
+    hostname or URL.
+    """
+    hosts = []
+    for part in spec.replace(",", " ").split():
+        first, sep, last = part.partition("-")
+        try:
+            start = ipaddress.IPv4Address(first)
+        except ValueError:
+            hosts.append(part)
+            continue
+        if not sep:
+            hosts.append(str(start))
+            continue
+        if "." in last:
+            end = ipaddress.IPv4Address(last)
+        else:
+            end = ipaddress.IPv4Address((int(start) & ~0xFF) | int(last))
+        if end < start:
+            raise ValueError(f"Empty address range: {part}")
+        hosts.extend(str(ipaddress.IPv4Address(ip))
+                     for ip in range(int(start), int(end) + 1))
+    return list(dict.fromkeys(hosts))  # Drop duplicates, keep order
+
+
+@dataclass
+class DeviceStatus:
+    """Latest state of one module as shown in the fleet table"""
+    address: str
+    weight: int = None
+    distance: int = None
+    cup_true: bool = None
+    seq: int = None
+    latency_s: float = None  # Request round-trip, None for streams
+    success: int = 0
+    errors: int = 0
+    last_error: str = None
+    online: bool = False
+    version: int = 0  # Bumped on every change, lets views skip idle rows
+
+    @property
+    def error_rate(self):
+        total = self.success + self.errors
+        return self.errors / total if total else 0.0
+
+
+class FleetMonitor(threading.Thread):
+    """Background thread running one event loop for the whole fleet
+
+    status maps address -> DeviceStatus and is updated in place from the
+    loop thread; readers take copies with snapshot(). on_update(status) is
+    called on the loop thread after every change when given.
+    """
+
+    def __init__(self, addresses, interval_ms=100, stream=False,
+                 timeout=DEFAULT_TIMEOUT, max_concurrency=MAX_CONCURRENCY,
+                 on_update=None):
+        super().__init__(daemon=True)
+        self.addresses = list(addresses)
+        self.interval_ms = interval_ms
+        self.stream = stream
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.on_update = on_update
+        self.status = {address: DeviceStatus(address) for address in self.addresses}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._task = None
+
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self.monitor())
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def stop(self):
+        """Cancel all device tasks and close the shared session"""
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+    def snapshot(self):
+        """Return copies of all DeviceStatus records, in address order"""
+        with self._lock:
+            return [DeviceStatus(**vars(self.status[a])) for a in self.addresses]
+
+    async def monitor(self):
+        """Run every device task on one shared session until cancelled"""
+        # Every open /websocket keeps a pool slot, a bounded pool would
+        # starve all modules past the limit; polls are bounded by `limit`
+        connector = aiohttp.TCPConnector(limit=0 if self.stream else self.max_concurrency,
+                                         limit_per_host=2)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            limit = asyncio.Semaphore(self.max_concurrency)
+            worker = self._stream_device if self.stream else self._poll_device
+            await asyncio.gather(*(
+                worker(AsyncSensorClient(address, self.timeout, session=session),
+                       self.status[address], limit)
+                for address in self.addresses))
+
+    async def _poll_device(self, client, status, limit):
+        scheduler = PollScheduler(self.interval_ms / 1000.0)
+        deadline = time.monotonic()
+        while True:
+            if scheduler.probing:  # Offline: cheap probes, no sensor reads
+                async with limit:
+                    scheduler.record_probe(await probe_async(client))
+            else:
+                try:
+                    async with limit:
+                        reading = await client.get_sensor_read()
+                except SensorClientError as e:
+                    scheduler.record_error(e)
+                    self._update_error(client, status, e)
+                else:
+                    scheduler.record_success(client.stats.last_latency_s)
+                    self._update_reading(client, status, reading)
+            # Fixed-rate schedule; skip missed slots instead of bursting
+            deadline = max(deadline + scheduler.interval(), time.monotonic())
+            await asyncio.sleep(deadline - time.monotonic())
+
+    async def _stream_device(self, client, status, limit):
+        # One long-lived connection per device, the firmware paces the frames
+        on_error = lambda error: self._update_error(client, status, error)
+        async for reading in client.stream_sensor_read(self.interval_ms, on_error):
+            self._update_reading(client, status, reading)
+
+    def _update_reading(self, client, status, reading):
+        with self._lock:
+            status.weight = reading.weight
+            status.distance = reading.distance
+            status.cup_true = reading.cup_true
+            status.seq = reading.seq
+            # A pushed frame has no request; its gap is the push interval
+            status.latency_s = None if self.stream else client.stats.last_latency_s
+            status.success = client.stats.success
+            status.errors = client.stats.errors
+            status.last_error = None
+            status.online = True
+            status.version += 1
+        if self.on_update is not None:
+            self.on_update(status)
+
+    def _update_error(self, client, status, error):
+        with self._lock:
+            status.success = client.stats.success
+            status.errors = client.stats.errors
+            status.last_error = str(error)
+            status.online = False
+            status.version += 1
+        if self.on_update is not None:
+            self.on_update(status)
+
+
+def check_fleet(count, stream=False, interval_ms=100, duration_s=5.0, **options):
+    """Run a FleetMonitor against `count` simulated modules
+
+    Returns the DeviceStatus records of modules that got no reading within
+    duration_s, an empty list when the whole fleet delivered.
+    """
+    from device_simulator import SimulatorThread
+
+    simulator = SimulatorThread(count, base_port=8000)
+    simulator.start()
+    monitor = FleetMonitor(simulator.urls, interval_ms, stream, **options)
+    monitor.start()
+    try:
+        time.sleep(duration_s)
+        return [s for s in monitor.snapshot() if not s.success]
+    finally:
+        monitor.stop()
+        monitor.join()
+        simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the fleet monitor with simulated modules")
+    parser.add_argument("--simulate", type=int, default=2 * MAX_CONCURRENCY,
+                        help="Number of simulated modules")
+    parser.add_argument("--stream", action="store_true", help="Use /websocket pushes")
+    parser.add_argument("--interval-ms", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to monitor")
+    args = parser.parse_args()
+
+    silent = check_fleet(args.simulate, args.stream, args.interval_ms, args.duration)
+    for status in silent:
+        print(f"SILENT {status.address}: {status.last_error or 'no reading, no error'}")
+    print(f"{args.simulate - len(silent)}/{args.simulate} module(s) delivered readings")
+    sys.exit(1 if silent else 0)
+
+
+if __name__ == "__main__":
+    main()
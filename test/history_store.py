@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Long-term sensor history with rollups
+SQLite store fed by SensorPipeline subscriptions (or the fleet recorder
+below). Raw samples are kept for a short retention; min/max/mean/count
+rollups at 1 s, 1 min and 1 h are kept much longer, all indexed by
+(device, time). A range query reads only the coarsest tier that still
+gives the requested resolution, so a month of one module at the default
+max_points reads ~43k one-minute rows, grouped to ~1000 in SQL, instead
+of ~200M samples at 80 Hz.
+
+Ingest only touches an in-memory 1 s accumulator per device; a writer
+thread folds the buckets into the coarser tiers and upserts every tier
+once per FLUSH_S, so dozens of modules at full sensor rate fit on one
+core.
+
+    store = HistoryStore("history.db")
+    store.attach(pipeline, "module-7")
+    rows = store.query("module-7", time.time() - 30 * 86400, time.time())
+
+    python history_store.py record --devices 192.168.1.220-235 --db history.db
+    python history_store.py query --device 192.168.1.227 --days 30
+"""
+
+import argparse
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+TIERS = (1, 60, 3600)  # Rollup resolutions in seconds
+RETENTION_S = {0: 86400, 1: 30 * 86400, 60: 365 * 86400, 3600: None}  # 0: raw
+FLUSH_S = 1.0
+PRUNE_S = 300.0
+MAX_POINTS = 1000  # Default rows per query
+
+# count, weight min/max/sum, distance min/max/sum, cup samples, empty-scale
+# samples and their weight sum (zero drift)
+ACC_FIELDS = ("count", "weight_min", "weight_max", "weight_sum", "distance_min",
+              "distance_max", "distance_sum", "cup", "empty_count", "empty_sum")
+_MERGE = {"weight_min": "min", "weight_max": "max", "distance_min": "min",
+          "distance_max": "max"}  # Others add up
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS raw (device INTEGER NOT NULL, time REAL NOT NULL,
+    seq INTEGER, weight INTEGER, distance INTEGER, cup INTEGER);
+CREATE INDEX IF NOT EXISTS raw_device_time ON raw (device, time);
+"""
+
+
+def _tier_table(tier):
+    return f"rollup_{tier}"
+
+
+def _tier_schema(tier):
+    columns = ", ".join(f"{name} {'REAL' if name.endswith('sum') else 'INTEGER'} NOT NULL"
+                        for name in ACC_FIELDS)
+    return (f"CREATE TABLE IF NOT EXISTS {_tier_table(tier)} (device INTEGER NOT NULL, "
+            f"bucket INTEGER NOT NULL, {columns}, PRIMARY KEY (device, bucket)) "
+            f"WITHOUT ROWID")
+
+
+def _upsert_sql(tier):
+    names = ", ".join(ACC_FIELDS)
+    marks = ", ".join("?" * (len(ACC_FIELDS) + 2))
+    updates = ", ".join(f"{name} = {_MERGE[name]}({name}, excluded.{name})" if name in _MERGE
+                        else f"{name} = {name} + excluded.{name}" for name in ACC_FIELDS)
+    return (f"INSERT INTO {_tier_table(tier)} (device, bucket, {names}) VALUES ({marks}) "
+            f"ON CONFLICT (device, bucket) DO UPDATE SET {updates}")
+
+
+def _select_sql(tier):
+    aggregates = ", ".join(f"{_MERGE.get(name, 'sum')}({name})" for name in ACC_FIELDS)
+    return (f"SELECT (bucket / ?) * ? AS b, {aggregates} FROM {_tier_table(tier)} "
+            f"WHERE device = ? AND bucket >= ? AND bucket < ? GROUP BY b ORDER BY b")
+
+
+def _new_acc(weight, distance, cup):
+    empty = not cup
+    return [1, weight, weight, weight, distance, distance, distance, int(cup), int(empty),
+            weight if empty else 0]
+
+
+def _merge_acc(acc, other):
+    acc[0] += other[0]
+    acc[1] = min(acc[1], other[1])
+    acc[2] = max(acc[2], other[2])
+    acc[3] += other[3]
+    acc[4] = min(acc[4], other[4])
+    acc[5] = max(acc[5], other[5])
+    for i in range(6, len(ACC_FIELDS)):
+        acc[i] += other[i]
+
+
+@dataclass
+class Rollup:
+    """One bucket of a query, any tier"""
+    time: float          # Bucket start, host time
+    span_s: int          # Bucket length, 0 for raw samples
+    count: int
+    weight_min: int
+    weight_max: int
+    weight_mean: float
+    distance_min: int
+    distance_max: int
+    distance_mean: float
+    cup_share: float     # Share of samples with cup_true
+    empty_mean: float    # Mean weight without cup (zero drift), None if none
+
+    @classmethod
+    def from_row(cls, bucket, span_s, row):
+        count, wmin, wmax, wsum, dmin, dmax, dsum, cup, empty, empty_sum = row
+        return cls(bucket, span_s, count, wmin, wmax, wsum / count, dmin, dmax,
+                   dsum / count, cup / count, empty_sum / empty if empty else None)
+
+
+class HistoryStore:
+    """Raw and rollup history of many devices in one SQLite file
+
+    add() is thread-safe and cheap; a background thread writes. Call
+    close() to flush the last buckets.
+    """
+
+    def __init__(self, path, flush_s=FLUSH_S, retention_s=None):
+        self.path = path
+        self.flush_s = flush_s
+        self.retention_s = {**RETENTION_S, **(retention_s or {})}
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        for tier in TIERS:
+            self.db.execute(_tier_schema(tier))
+        self.db.commit()
+        self._devices = dict(self.db.execute("SELECT name, id FROM devices"))
+        self._lock = threading.Lock()       # In-memory state
+        self._db_lock = threading.Lock()    # Connection
+        self._flush_lock = threading.Lock()  # One flush() at a time, take to commit
+        self._open = {}      # device id -> [second, acc] of the current 1 s bucket
+        self._closed = []    # (device id, second, acc) of finished 1 s buckets
+        self._raw = []       # (device id, time, seq, weight, distance, cup)
+        self._last_seq = {}  # device id -> seq, drops repeated polls of one sample
+        self._pruned = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def device_id(self, name):
+        device = self._devices.get(name)
+        if device is None:
+            with self._db_lock:
+                self.db.execute("INSERT OR IGNORE INTO devices (name) VALUES (?)", (name,))
+                device = self.db.execute("SELECT id FROM devices WHERE name = ?",
+                                         (name,)).fetchone()[0]
+                self.db.commit()
+            self._devices[name] = device
+        return device
+
+    def devices(self):
+        return sorted(self._devices)
+
+    def add(self, device, reading, host_time=None):
+        """Ingest one SensorRead of `device` (a name)"""
+        host_time = time.time() if host_time is None else host_time
+        device = self.device_id(device)
+        second = int(host_time)
+        weight, distance, cup = reading.weight, reading.distance, reading.cup_true
+        with self._lock:
+            if reading.seq and self._last_seq.get(device) == reading.seq:
+                return  # Polled faster than the sensor rate
+            self._last_seq[device] = reading.seq
+            self._raw.append((device, host_time, reading.seq, weight, distance, int(cup)))
+            current = self._open.get(device)
+            if current is not None and current[0] == second:
+                acc = current[1]
+                acc[0] += 1
+                if weight < acc[1]:
+                    acc[1] = weight
+                if weight > acc[2]:
+                    acc[2] = weight
+                acc[3] += weight
+                if distance < acc[4]:
+                    acc[4] = distance
+                if distance > acc[5]:
+                    acc[5] = distance
+                acc[6] += distance
+                if cup:
+                    acc[7] += 1
+                else:
+                    acc[8] += 1
+                    acc[9] += weight
+                return
+            if current is not None:
+                self._closed.append((device, current[0], current[1]))
+            self._open[device] = [second, _new_acc(weight, distance, cup)]
+
+    def attach(self, pipeline, device=None):
+        """Store every reading of a SensorPipeline, returns the subscription handle"""
+        name = device or pipeline.base_url
+        return pipeline.subscribe(lambda reading: self.add(name, reading))
+
+    def _take(self):
+        """Swap out everything ingested so far, open buckets included"""
+        with self._lock:
+            raw, self._raw = self._raw, []
+            buckets, self._closed = self._closed, []
+            buckets.extend((device, second, acc) for device, (second, acc) in self._open.items())
+            self._open = {}  # Later samples of those seconds merge by upsert
+        return raw, buckets
+
+    def flush(self):
+        """Write pending samples and fold them into every tier
+
+        Returns once everything ingested before the call is committed, even
+        if the writer thread had already taken it.
+        """
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        raw, buckets = self._take()
+        if not raw and not buckets:
+            return
+        tiers = {tier: {} for tier in TIERS}
+        for device, second, acc in buckets:
+            for tier, rows in tiers.items():
+                key = (device, second - second % tier)
+                merged = rows.get(key)
+                if merged is None:
+                    rows[key] = list(acc)
+                else:
+                    _merge_acc(merged, acc)
+        with self._db_lock:
+            self.db.executemany("INSERT INTO raw VALUES (?, ?, ?, ?, ?, ?)", raw)
+            for tier, rows in tiers.items():
+                self.db.executemany(_upsert_sql(tier), [(device, bucket, *acc) for
+                                                        (device, bucket), acc in rows.items()])
+            self.db.commit()
+
+    def prune(self, now=None):
+        """Drop raw samples and rollups older than their retention
+
+        Deletes per device so every statement is a range of the (device,
+        time/bucket) index instead of a table scan, and releases the
+        connection between devices so flush() and query() keep running.
+        """
+        now = time.time() if now is None else now
+        for device in list(self._devices.values()):
+            for tier, retention in self.retention_s.items():
+                if retention is None:
+                    continue
+                if tier == 0:
+                    sql = "DELETE FROM raw WHERE device = ? AND time < ?"
+                else:
+                    sql = f"DELETE FROM {_tier_table(tier)} WHERE device = ? AND bucket < ?"
+                with self._db_lock:
+                    self.db.execute(sql, (device, now - retention))
+                    self.db.commit()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_s):
+            self.flush()
+            if time.monotonic() - self._pruned >= PRUNE_S:
+                self._pruned = time.monotonic()
+                self.prune()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self.db.close()
+
+    def tier_for(self, start, end, resolution=None, max_points=MAX_POINTS):
+        """Tier serving a range: 0 (raw) or a rollup size in seconds
+
+        The coarsest tier not coarser than `resolution`; without it the
+        coarsest one still giving max_points buckets. Tiers whose retention
+        no longer covers `start` are skipped.
+        """
+        if resolution is None:
+            resolution = (end - start) / max_points
+        tiers = (0,) + TIERS
+        index = max(i for i, tier in enumerate(tiers) if tier <= max(resolution, 0))
+        age = time.time() - start
+        while index < len(tiers) - 1:
+            retention = self.retention_s[tiers[index]]
+            if retention is None or age <= retention:
+                break
+            index += 1
+        return tiers[index]
+
+    def query(self, device, start, end, resolution=None, max_points=MAX_POINTS):
+        """Rollups of [start, end) of one device, oldest first
+
+        Reads only the tier chosen by tier_for() and groups its buckets
+        further in SQL so at most about max_points rows come back. Raw
+        samples are returned with span_s 0.
+        """
+        self.flush()
+        device_id = self._devices.get(device)
+        if device_id is None:
+            return []
+        tier = self.tier_for(start, end, resolution, max_points)
+        if tier == 0:
+            rows = self._query_raw(device_id, start, end, max_points + 1)
+            if len(rows) <= max_points or resolution is not None:
+                return rows[:max_points]
+            tier = TIERS[0]  # More samples than wanted: 1 s buckets instead
+        # Buckets of the tier per returned row
+        step = tier * max(1, math.ceil((end - start) / tier / max_points),
+                          math.ceil((resolution or 0) / tier))
+        with self._db_lock:
+            rows = self.db.execute(_select_sql(tier), (step, step, device_id,
+                                                       int(start) - int(start) % tier,
+                                                       end)).fetchall()
+        return [Rollup.from_row(row[0], step, row[1:]) for row in rows]
+
+    def _query_raw(self, device_id, start, end, limit):
+        with self._db_lock:
+            rows = self.db.execute(
+                "SELECT time, weight, distance, cup FROM raw WHERE device = ? "
+                "AND time >= ? AND time < ? ORDER BY time LIMIT ?",
+                (device_id, start, end, limit)).fetchall()
+        return [Rollup(t, 0, 1, w, w, float(w), d, d, float(d), float(cup),
+                       None if cup else float(w)) for t, w, d, cup in rows]
+
+
+def zero_drift(rollups):
+    """Least-squares slope of the empty-scale mean in weight units per day"""
+    points = [(r.time, r.empty_mean) for r in rollups if r.empty_mean is not None]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mt = sum(t for t, _ in points) / n
+    mw = sum(w for _, w in points) / n
+    var = sum((t - mt) ** 2 for t, _ in points)
+    if var == 0:
+        return None
+    return sum((t - mt) * (w - mw) for t, w in points) / var * 86400
+
+
+def _record(args):
+    from fleet import FleetMonitor, parse_addresses
+
+    store = HistoryStore(args.db)
+
+    class Recorder(FleetMonitor):
+        def _update_reading(self, client, status, reading):
+            super()._update_reading(client, status, reading)
+            store.add(status.address, reading)
+
+    recorder = Recorder(parse_addresses(args.devices), args.interval_ms, stream=args.stream)
+    recorder.start()
+    print(f"Recording {len(recorder.addresses)} module(s) to {args.db}, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.stop()
+        recorder.join(2.0)
+        store.close()
+
+
+def _query(args):
+    with HistoryStore(args.db) as store:
+        end = time.time()
+        start = end - args.days * 86400
+        rows = store.query(args.device, start, end, args.resolution, args.points)
+        for r in rows:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r.time))
+            empty = "--" if r.empty_mean is None else f"{r.empty_mean:.2f}"
+            print(f"{stamp}  n={r.count:<7} weight {r.weight_min}..{r.weight_max} "
+                  f"mean {r.weight_mean:.2f}  empty {empty}  cup {r.cup_share:.0%}")
+        drift = zero_drift(rows)
+        print(f"{len(rows)} rows" + (f", zero drift {drift:+.3f} per day"
+                                     if drift is not None else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-term sensor history with rollups")
+    parser.add_argument("--db", default="history.db", help="SQLite file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Record modules until interrupted")
+    record.add_argument("--devices", default="192.168.1.233",
+                        help="Module addresses and ranges, e.g. 192.168.1.220-235")
+    record.add_argument("--interval-ms", type=int, default=100)
+    record.add_argument("--stream", action="store_true", help="Use /websocket pushes")
+    query = commands.add_parser("query", help="Print the history of one module")
+    query.add_argument("--device", required=True, help="Address as recorded")
+    query.add_argument("--days", type=float, default=1.0)
+    query.add_argument("--resolution", type=float, help="Seconds per row (default: fit --points)")
+    query.add_argument("--points", type=int, default=MAX_POINTS)
+    args = parser.parse_args()
+    if args.command == "record":
+        _record(args)
+    else:
+        _query(args)
+
+
+if __name__ == "__main__":
+    main()
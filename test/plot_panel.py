@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Live time-series plot for the Tk test GUIs
+LodBuffer keeps a large preallocated sample history with a min/max pyramid
+(level-of-detail), PlotPanel draws it on a tk.Canvas as one min/max bar per
+pixel column. Any range reduces to O(width) pyramid lookups, so redraw time
+does not depend on how many samples the history holds.
+"""
+
+import math
+import tkinter as tk
+from array import array
+from collections import deque
+
+SPAN_CHOICES = (("1k", 1_000), ("10k", 10_000), ("100k", 100_000),
+                ("1M", 1_000_000), ("All", None))
+
+
+class LodBuffer:
+    """Sample ring with a min/max pyramid, O(1) amortized per push
+
+    Level L summarizes aligned blocks of factor**L samples; capacity is a
+    multiple of the largest block so blocks never straddle the ring end.
+    """
+
+    def __init__(self, capacity=8 ** 7, factor=8, levels=5):
+        top = factor ** levels
+        self.capacity = max(top, -(-capacity // top) * top)
+        self.factor = factor
+        self.count = 0  # Samples pushed so far (global index of the next one)
+        self.values = array("d", bytes(8 * self.capacity))
+        self.block = [factor ** level for level in range(levels + 1)]
+        self.mins = [None] + [array("d", bytes(8 * (self.capacity // b)))
+                              for b in self.block[1:]]
+        self.maxs = [None] + [array("d", bytes(8 * (self.capacity // b)))
+                              for b in self.block[1:]]
+
+    def clear(self):
+        self.count = 0
+
+    def push(self, value):
+        n = self.count
+        self.values[n % self.capacity] = value
+        self.count = n + 1
+        # Complete every block that ends with this sample
+        for level in range(1, len(self.block)):
+            size = self.block[level]
+            if self.count % size:
+                break
+            index = n // size
+            self._summarize(level, index)
+
+    def _summarize(self, level, index):
+        child = self.block[level - 1]
+        first = index * self.factor
+        if level == 1:
+            start = first % self.capacity
+            chunk = self.values[start:start + self.factor]
+            lo, hi = min(chunk), max(chunk)
+        else:
+            slots = self.capacity // child
+            start = first % slots
+            lo = min(self.mins[level - 1][start:start + self.factor])
+            hi = max(self.maxs[level - 1][start:start + self.factor])
+        slot = index % (self.capacity // self.block[level])
+        self.mins[level][slot] = lo
+        self.maxs[level][slot] = hi
+
+    @property
+    def oldest(self):
+        """Global index of the oldest sample still held"""
+        # Keep one top-level block of margin against the writer
+        return max(0, self.count - self.capacity + self.block[-1])
+
+    def range_minmax(self, lo, hi):
+        """Min/max of samples [lo, hi), using the largest aligned blocks"""
+        mn, mx = math.inf, -math.inf
+        i = lo
+        top = len(self.block) - 1
+        while i < hi:
+            level = 0
+            while (level < top and i % self.block[level + 1] == 0
+                   and i + self.block[level + 1] <= hi):
+                level += 1
+            if level == 0:
+                v = self.values[i % self.capacity]
+                mn, mx = min(mn, v), max(mx, v)
+                i += 1
+            else:
+                size = self.block[level]
+                slot = (i // size) % (self.capacity // size)
+                mn = min(mn, self.mins[level][slot])
+                mx = max(mx, self.maxs[level][slot])
+                i += size
+        return mn, mx
+
+
+class PlotPanel:
+    """Scrolling min/max plot of a LodBuffer on a tk.Canvas
+
+    With a fixed span, pixel columns are aligned to global sample indices,
+    so a redraw only appends the columns completed since the last one and
+    scrolls the rest. "All" rescales and redraws every column.
+    """
+
+    def __init__(self, parent, buffer, color="#3498db", height=160, span=10_000):
+        self.buffer = buffer
+        self.color = color
+        self.span = span
+        self.canvas = tk.Canvas(parent, height=height, background="white",
+                                highlightthickness=0)
+        self._items = deque()   # Canvas ids of the drawn columns, oldest first
+        self._last_col = None   # Index of the newest drawn column
+        self._spp = None        # Samples per pixel of the drawn columns
+        self._y_range = None
+        self._prev = None       # (min, max) of the newest drawn column
+        self.canvas.bind("<Configure>", lambda e: self.reset())
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def set_span(self, span):
+        """Samples visible in the plot, None for the whole history"""
+        self.span = span
+        self.reset()
+
+    def reset(self):
+        self.canvas.delete("data")
+        self._items.clear()
+        self._last_col = None
+        self._prev = None
+
+    def _y(self, value):
+        lo, hi = self._y_range
+        height = max(self.canvas.winfo_height(), 2)
+        return height - 2 - (value - lo) / (hi - lo) * (height - 4)
+
+    def _column(self, col, x):
+        """Draw one pixel column, joined to the previous one"""
+        spp = self._spp
+        mn, mx = self.buffer.range_minmax(col * spp, (col + 1) * spp)
+        if self._prev is not None:
+            y_lo, y_hi = min(mn, self._prev[1]), max(mx, self._prev[0])
+        else:
+            y_lo, y_hi = mn, mx
+        self._prev = (mn, mx)
+        if y_lo < self._y_range[0] or y_hi > self._y_range[1]:
+            return False  # Out of range, caller rescales
+        item = self.canvas.create_line(x, self._y(y_lo), x, self._y(y_hi) + 1,
+                                       fill=self.color, tags="data")
+        self._items.append(item)
+        return True
+
+    def _rescale(self, first_col, last_col):
+        lo, hi = self.buffer.range_minmax(first_col * self._spp,
+                                          (last_col + 1) * self._spp)
+        pad = max((hi - lo) * 0.1, 1.0)
+        self._y_range = (lo - pad, hi + pad)
+
+    def redraw(self):
+        """Bring the plot up to date with the buffer (UI thread)"""
+        width = self.canvas.winfo_width()
+        buf = self.buffer
+        if width < 2 or buf.count == 0:
+            return
+        oldest = buf.oldest
+        span = self.span or (buf.count - oldest)
+        spp = max(1, math.ceil(span / width))
+        last_col = buf.count // spp - 1  # Newest complete column
+        if last_col < 0:
+            return
+        first_col = max(-(-oldest // spp), last_col - width + 1)
+
+        if self.span is None or spp != self._spp or self._last_col is None:
+            self._spp = spp
+            self._full_redraw(first_col, last_col, width)
+            return
+
+        new_cols = last_col - self._last_col
+        if new_cols <= 0:
+            return
+        if new_cols >= width:
+            self._full_redraw(first_col, last_col, width)
+            return
+        # Scroll existing columns and append only the new ones
+        self.canvas.move("data", -new_cols, 0)
+        for col in range(self._last_col + 1, last_col + 1):
+            if not self._column(col, width - 1 - (last_col - col)):
+                self._full_redraw(first_col, last_col, width)
+                return
+        while len(self._items) > width:
+            self.canvas.delete(self._items.popleft())
+        self._last_col = last_col
+
+    def _full_redraw(self, first_col, last_col, width):
+        self.reset()
+        self._rescale(first_col, last_col)
+        for col in range(first_col, last_col + 1):
+            self._column(col, width - 1 - (last_col - col))
+        self._last_col = last_col
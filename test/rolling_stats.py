@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Rolling window statistics
+O(1) per sample: monotonic deques for min/max, Welford add/remove for
+mean and variance. Values live in a preallocated array ring, so windows of
+millions of samples cost no more per update than a window of 200.
+"""
+
+import threading
+from array import array
+from collections import deque
+from dataclasses import dataclass
+
+WINDOW_SIZES = (100, 200, 1000, 10_000, 100_000, 1_000_000, 5_000_000)
+
+
+@dataclass
+class StatsSnapshot:
+    """Consistent view of a RollingStats window"""
+    count: int
+    latest: float
+    min: float
+    max: float
+    mean: float
+    stddev: float
+
+
+class RollingStats:
+    """Min/max/mean/stddev over the last `window` samples, O(1) per push"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._resize(window)
+
+    def _resize(self, window):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        self._values = array("d", bytes(8 * window))  # Ring buffer
+        self._total = 0  # Samples pushed since clear, also the ring position
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = deque()  # (index, value), values increasing
+        self._max = deque()  # (index, value), values decreasing
+
+    def push(self, value):
+        """Add one sample, evicting the oldest one when the window is full"""
+        with self._lock:
+            self._push(float(value))
+
+    def _push(self, x):
+        index = self._total
+        slot = index % self.window
+        if self._count == self.window:
+            self._remove(self._values[slot])
+        self._values[slot] = x
+        self._total += 1
+
+        # Welford add
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+        # Monotonic deques: drop dominated entries, then expired ones
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((index, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((index, x))
+        oldest = self._total - self._count
+        if self._min[0][0] < oldest:
+            self._min.popleft()
+        if self._max[0][0] < oldest:
+            self._max.popleft()
+
+    def _remove(self, x):
+        # Welford remove
+        self._count -= 1
+        if self._count == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / self._count
+        self._m2 -= delta * (x - self._mean)
+        if self._m2 < 0.0:
+            self._m2 = 0.0  # Rounding
+
+    def clear(self):
+        with self._lock:
+            self._resize(self.window)
+
+    def resize(self, window):
+        """Change the window size, keeping the newest samples"""
+        with self._lock:
+            keep = [self._values[i % self.window]
+                    for i in range(self._total - min(self._count, window),
+                                   self._total)]
+            self._resize(window)
+            for x in keep:
+                self._push(x)
+
+    def __len__(self):
+        return self._count
+
+    def snapshot(self):
+        """Return a StatsSnapshot, or None while the window is empty"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            return StatsSnapshot(
+                count=self._count,
+                latest=self._values[(self._total - 1) % self.window],
+                min=self._min[0][1],
+                max=self._max[0][1],
+                mean=self._mean,
+                stddev=(self._m2 / self._count) ** 0.5,
+            )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling schedule with circuit breaker
+PollScheduler decides how long to wait before the next request to one
+module; the polling loops (sensor_pipeline.py, fleet.py) only report
+outcomes to it.
+
+  closed     poll at the target rate, spaced out to RTT_FACTOR x the
+             smoothed round-trip time when the module answers slowly;
+             timeouts and connection errors back off exponentially
+  open       after FAILURE_THRESHOLD failures in a row: no sensor reads,
+             probe the cheap /api/heartbeat (/api/ok on older firmware)
+             at a growing interval instead
+  half_open  a probe answered: one sensor read decides between closed and
+             open
+
+HTTP and decode errors mean the module is up and answering, so they do
+not back off.
+"""
+
+import random
+
+from sensor_client import ERROR_CONNECTION, ERROR_HTTP, ERROR_TIMEOUT, SensorClientError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_KINDS = (ERROR_TIMEOUT, ERROR_CONNECTION)
+FAILURE_THRESHOLD = 3    # Consecutive failures that open the breaker
+MAX_BACKOFF_S = 5.0      # Poll and probe interval cap
+PROBE_INTERVAL_S = 1.0   # First probe interval while open
+PROBE_TIMEOUT_S = 0.5
+RTT_FACTOR = 2.0         # Leave a slow module idle half of the time
+RTT_SMOOTHING = 0.2      # EWMA weight of a new round-trip sample
+JITTER = 0.1             # +/- share of backoff delays, keeps a fleet out of step
+
+
+class PollScheduler:
+    """Request spacing and breaker state of one module (no I/O)"""
+
+    def __init__(self, interval_s, failure_threshold=FAILURE_THRESHOLD,
+                 max_backoff_s=MAX_BACKOFF_S, probe_interval_s=PROBE_INTERVAL_S):
+        self.target_s = interval_s
+        self.failure_threshold = failure_threshold
+        self.max_backoff_s = max_backoff_s
+        self.probe_interval_s = probe_interval_s
+        self.state = CLOSED
+        self.failures = 0    # Consecutive timeouts/connection errors
+        self.rtt_s = None    # Smoothed round-trip time
+        self.opened = 0      # Times the breaker opened
+        self._probe_s = probe_interval_s
+
+    @property
+    def probing(self):
+        """True while the next request should be a probe, not a read"""
+        return self.state == OPEN
+
+    def interval(self):
+        """Seconds from this request slot to the next one"""
+        if self.state == OPEN:
+            return self._jitter(self._probe_s)
+        if self.failures:
+            return self._jitter(min(self.target_s * 2 ** self.failures, self.max_backoff_s))
+        if self.rtt_s is not None:
+            return max(self.target_s, RTT_FACTOR * self.rtt_s)
+        return self.target_s
+
+    @staticmethod
+    def _jitter(delay):
+        return delay * random.uniform(1.0 - JITTER, 1.0 + JITTER)
+
+    def record_success(self, rtt_s):
+        if self.rtt_s is None:
+            self.rtt_s = rtt_s
+        else:
+            self.rtt_s += RTT_SMOOTHING * (rtt_s - self.rtt_s)
+        self.failures = 0
+        self.state = CLOSED
+        self._probe_s = self.probe_interval_s
+
+    def record_error(self, error):
+        """Report a failed read; returns True when the breaker just opened"""
+        if error.kind not in FAILURE_KINDS:
+            return False
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED
+                                       and self.failures >= self.failure_threshold):
+            if self.state == HALF_OPEN:
+                self._probe_s = min(self._probe_s * 2, self.max_backoff_s)
+            self.state = OPEN
+            self.opened += 1
+            return True
+        return False
+
+    def record_probe(self, ok):
+        """Report a probe; an answer lets one sensor read through"""
+        if ok:
+            self.state = HALF_OPEN
+        else:
+            self._probe_s = min(self._probe_s * 2, self.max_backoff_s)
+
+
+def _probe_fallback(error):
+    # Firmware without /api/heartbeat answers 404
+    return error.kind == ERROR_HTTP and error.status == 404
+
+
+def probe(client, timeout=PROBE_TIMEOUT_S):
+    """True if the module answers /api/heartbeat (or /api/ok)"""
+    try:
+        client.request("GET", "/api/heartbeat", timeout=timeout)
+    except SensorClientError as e:
+        if not _probe_fallback(e):
+            return False
+        try:
+            client.request("GET", "/api/ok", timeout=timeout)
+        except SensorClientError:
+            return False
+    return True
+
+
+async def probe_async(client, timeout=PROBE_TIMEOUT_S):
+    """probe() for AsyncSensorClient"""
+    try:
+        await client.request("GET", "/api/heartbeat", timeout=timeout)
+    except SensorClientError as e:
+        if not _probe_fallback(e):
+            return False
+        try:
+            await client.request("GET", "/api/ok", timeout=timeout)
+        except SensorClientError:
+            return False
+    return True
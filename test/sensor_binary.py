@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Packed binary sensor format decoder
+Decodes /api/sensor_read_bin and /api/sensor_history_bin responses into
+column views without creating an object per record.
+
+Layout (little-endian, see SENSOR_BIN_* in src/src/mongoose_glue.h):
+  header 12 bytes: u16 magic, u8 version, u8 flags, u32 head, u32 count
+  record 20 bytes: u32 seq, u32 timestamp_ms, i32 weight, i32 distance,
+                   u32 flags
+"""
+
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # Column views fall back to memoryview slices
+    np = None
+
+MAGIC = 0x4D57  # "WM"
+VERSION = 1
+HEADER = struct.Struct("<HBBII")
+RECORD = struct.Struct("<IIiiI")
+RECORD_WORDS = RECORD.size // 4
+
+FLAG_MORE = 1  # Header: batch truncated by limit
+FLAG_CUP = 1   # Record: cup_true
+FLAG_TARE = 2  # Record: tare
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("seq", "<u4"), ("timestamp", "<u4"), ("weight", "<i4"),
+        ("distance", "<i4"), ("flags", "<u4"),
+    ])
+
+
+class SampleBatch:
+    """Decoded batch; columns are zero-copy views into the response buffer
+
+    seq, timestamp, weight, distance and flags are numpy arrays when numpy
+    is installed, otherwise strided memoryviews (index/iterate like lists).
+    """
+
+    def __init__(self, buf):
+        view = memoryview(buf)
+        if len(view) < HEADER.size:
+            raise ValueError(f"Binary batch too short: {len(view)} bytes")
+        magic, version, flags, head, count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unknown binary format {magic:#06x} v{version}")
+        end = HEADER.size + count * RECORD.size
+        if len(view) < end:
+            raise ValueError(f"Binary batch truncated: {len(view)} < {end} bytes")
+        self.head = head
+        self.more = bool(flags & FLAG_MORE)
+        self.count = count
+        self.buffer = view[HEADER.size:end]
+
+        if np is not None:
+            records = np.frombuffer(self.buffer, dtype=RECORD_DTYPE)
+            self.seq = records["seq"]
+            self.timestamp = records["timestamp"]
+            self.weight = records["weight"]
+            self.distance = records["distance"]
+            self.flags = records["flags"]
+        elif sys.byteorder == "little":
+            # Every field is a 32-bit word: stride through the words
+            unsigned = self.buffer.cast("I")
+            signed = self.buffer.cast("i")
+            self.seq = unsigned[0::RECORD_WORDS]
+            self.timestamp = unsigned[1::RECORD_WORDS]
+            self.weight = signed[2::RECORD_WORDS]
+            self.distance = signed[3::RECORD_WORDS]
+            self.flags = unsigned[4::RECORD_WORDS]
+        else:
+            columns = list(zip(*RECORD.iter_unpack(self.buffer))) or [()] * 5
+            self.seq, self.timestamp, self.weight, self.distance, self.flags = columns
+
+    def __len__(self):
+        return self.count
+
+    def cup_true(self, index):
+        return bool(self.flags[index] & FLAG_CUP)
+
+    def tare(self, index):
+        return bool(self.flags[index] & FLAG_TARE)
+
+    def record(self, index):
+        """Return one record as (seq, timestamp, weight, distance, flags)"""
+        return RECORD.unpack_from(self.buffer, index * RECORD.size)
+
+
+def decode_batch(buf):
+    """Decode one binary response body"""
+    return SampleBatch(buf)
@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+"""
+Weight Module REST client
+Shared keep-alive client for the Mongoose API of the ESP32 Weight Module.
+One pooled session is kept per device, so each poll costs a single HTTP
+round-trip instead of a new TCP handshake on the W5500 stack.
+
+SensorClient uses `requests`, AsyncSensorClient uses `aiohttp` (optional).
+SensorStream consumes the `sensor_read` WebSocket reporter instead of polling.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool
+from urllib3.connection import HTTPConnection
+
+from sensor_binary import decode_batch
+from timing import STAGE_CONNECT, STAGE_PARSE, STAGE_REQUEST, StageTimer
+
+try:
+    import aiohttp
+except ImportError:  # Only needed for AsyncSensorClient
+    aiohttp = None
+
+DEFAULT_TIMEOUT = 2.0
+TARE_SAMPLES = 5     # Firmware default (TARE_SAMPLES_DEFAULT)
+HX711_MIN_SPS = 10   # Slowest HX711 rate, bounds how long a tare may take
+WS_PATH = "/websocket"
+
+# Error kinds, matching the buckets the GUIs display
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_HTTP = "http"
+ERROR_DECODE = "decode"
+ERROR_OTHER = "other"
+
+
+@dataclass
+class SensorRead:
+    """Live values of /api/sensor_read"""
+    cup_true: bool = False
+    tare: bool = False
+    weight: int = 0
+    distance: int = 0
+    seq: int = 0        # Sample sequence number of the sampling task
+    timestamp: int = 0  # Sample time, ms since device boot
+    tare_offset: int = 0  # Session tare offset, raw HX711 value
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            cup_true=bool(data.get("cup_true", False)),
+            tare=bool(data.get("tare", False)),
+            weight=int(data.get("weight", -1)),
+            distance=int(data.get("distance", -1)),
+            seq=int(data.get("seq", 0)),
+            timestamp=int(data.get("timestamp", 0)),
+            tare_offset=int(data.get("tare_offset", 0)),
+        )
+
+    def to_json(self):
+        return asdict(self)
+
+
+@dataclass
+class SensorSample:
+    """One entry of /api/sensor_history"""
+    seq: int
+    timestamp: int  # ms since device boot
+    weight: int
+    distance: int
+    cup_true: bool
+
+    @classmethod
+    def from_row(cls, row):
+        seq, timestamp, weight, distance, cup_true = row
+        return cls(int(seq), int(timestamp), int(weight), int(distance),
+                   bool(cup_true))
+
+
+@dataclass
+class SensorHistory:
+    """One batch of /api/sensor_history"""
+    samples: list
+    head: int   # Newest sequence number on the device
+    more: bool  # Batch was truncated, ask again
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            samples=[SensorSample.from_row(row) for row in data.get("samples", [])],
+            head=int(data.get("head", 0)),
+            more=bool(data.get("more", False)),
+        )
+
+
+@dataclass
+class RawHistory:
+    """One batch of /api/sensor_raw: raw HX711 values for calibration"""
+    seqs: list
+    raws: list  # Before tare, offset and multiplier
+    head: int
+    more: bool
+
+    @classmethod
+    def from_json(cls, data):
+        rows = data.get("samples", [])
+        return cls(
+            seqs=[int(seq) for seq, _ in rows],
+            raws=[int(raw) for _, raw in rows],
+            head=int(data.get("head", 0)),
+            more=bool(data.get("more", False)),
+        )
+
+
+@dataclass
+class SensorSettings:
+    """Calibration values of /api/sensor_settings"""
+    distance_trig: int = 80
+    linear: int = 1477
+    offset: int = -467384
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            distance_trig=int(data.get("distance_trig", 0)),
+            linear=int(data.get("linear", 0)),
+            offset=int(data.get("offset", 0)),
+        )
+
+    def to_json(self):
+        return asdict(self)
+
+
+@dataclass
+class Settings:
+    """Device settings of /api/settings"""
+    log_level: int = 0
+    ip: str = ""
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            log_level=int(data.get("log_level", 0)),
+            ip=str(data.get("ip", "")),
+        )
+
+    def to_json(self):
+        return asdict(self)
+
+
+@dataclass
+class PerfProbe:
+    """One firmware timing probe of /api/perf"""
+    count: int = 0
+    total_us: int = 0
+    max_us: int = 0
+
+    @property
+    def mean_us(self):
+        return self.total_us / self.count if self.count else 0.0
+
+
+@dataclass
+class DevicePerf:
+    """Firmware hot-path timing of /api/perf"""
+    since_ms: int  # Device millis() of the last reset
+    now_ms: int
+    probes: dict   # Probe name -> PerfProbe
+
+    @property
+    def span_ms(self):
+        return (self.now_ms - self.since_ms) & 0xFFFFFFFF
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            since_ms=int(data.get("since_ms", 0)),
+            now_ms=int(data.get("now_ms", 0)),
+            probes={name: PerfProbe(int(p.get("count", 0)), int(p.get("total_us", 0)),
+                                    int(p.get("max_us", 0)))
+                    for name, p in data.get("probes", {}).items()},
+        )
+
+
+class SensorClientError(Exception):
+    """Request failed; `kind` is one of the ERROR_* buckets"""
+
+    def __init__(self, kind, message, status=None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+
+
+@dataclass
+class ClientStats:
+    """Structured success/error counters of a client"""
+    success: int = 0
+    errors: int = 0
+    by_kind: dict = field(default_factory=dict)
+    by_status: dict = field(default_factory=dict)
+    last_error: str = None
+    last_latency_s: float = 0.0  # Request round-trip; NaN for /websocket frames
+    last_frame_interval_s: float = math.nan  # Gap between /websocket frames
+
+    @property
+    def timeouts(self):
+        return self.by_kind.get(ERROR_TIMEOUT, 0)
+
+    def record_success(self, latency_s):
+        self.success += 1
+        self.last_latency_s = latency_s
+        self.last_error = None
+
+    def record_frame(self, interval_s):
+        """A pushed frame: no request, so no latency"""
+        self.success += 1
+        self.last_latency_s = math.nan
+        self.last_frame_interval_s = interval_s
+        self.last_error = None
+
+    def record_error(self, error):
+        self.errors += 1
+        self.by_kind[error.kind] = self.by_kind.get(error.kind, 0) + 1
+        if error.status is not None:
+            self.by_status[error.status] = self.by_status.get(error.status, 0) + 1
+        self.last_error = str(error)
+
+    def reset(self):
+        self.success = 0
+        self.errors = 0
+        self.by_kind.clear()
+        self.by_status.clear()
+        self.last_error = None
+        self.last_latency_s = 0.0
+        self.last_frame_interval_s = math.nan
+
+
+def _base_url(host_or_url):
+    """Accept either an IP/hostname or a full http:// URL"""
+    if "://" not in host_or_url:
+        host_or_url = f"http://{host_or_url}"
+    return host_or_url.rstrip("/")
+
+
+def _tare_timeout(timeout, samples):
+    """The device answers /api/tare only after `samples` conversions"""
+    return timeout + samples / HX711_MIN_SPS
+
+
+def _history_path(since, limit, binary=False, name="sensor_history"):
+    path = f"/api/{name}_bin" if binary else f"/api/{name}"
+    path += f"?since={int(since)}"
+    if limit is not None:
+        path += f"&limit={int(limit)}"
+    return path
+
+
+class HistoryDrain:
+    """Drain /api/sensor_history in batches and re-sequence the samples
+
+    Keeps the last seen sequence number, drops duplicates, counts gaps
+    (samples overwritten on the device before they were fetched) and
+    unwraps the 32-bit millisecond timestamp into `timestamp_ms`.
+    """
+
+    def __init__(self, since=0, batch=None):
+        self.last_seq = since
+        self.batch = batch
+        self.gaps = 0          # Number of holes in the sequence
+        self.lost_samples = 0  # Samples missing in those holes
+        self._last_ts = None
+        self._ts_offset = 0
+
+    def feed(self, history):
+        """Accept one batch, return new samples in sequence order"""
+        fresh = sorted((s for s in history.samples if s.seq > self.last_seq),
+                       key=lambda s: s.seq)
+        result = []
+        for sample in fresh:
+            if result and sample.seq == result[-1].seq:
+                continue  # Duplicate
+            expected = self.last_seq + 1
+            if self.last_seq > 0 and sample.seq > expected:
+                self.gaps += 1
+                self.lost_samples += sample.seq - expected
+            if self._last_ts is not None and sample.timestamp < self._last_ts:
+                self._ts_offset += 1 << 32  # millis() wrapped on the device
+            self._last_ts = sample.timestamp
+            sample.timestamp += self._ts_offset
+            self.last_seq = sample.seq
+            result.append(sample)
+        return result
+
+    def drain(self, client):
+        """Fetch batches from a SensorClient until the device is caught up"""
+        samples = []
+        while True:
+            history = client.get_sensor_history(self.last_seq, self.batch)
+            samples.extend(self.feed(history))
+            if not history.more or not history.samples:
+                return samples
+
+    async def drain_async(self, client):
+        """Same as drain(), for an AsyncSensorClient"""
+        samples = []
+        while True:
+            history = await client.get_sensor_history(self.last_seq, self.batch)
+            samples.extend(self.feed(history))
+            if not history.more or not history.samples:
+                return samples
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter timing the TCP connect of new plain HTTP connections"""
+
+    def __init__(self, timer, **kwargs):
+        self.timer = timer
+        self._connect = threading.local()  # Connect time of the running request
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        timer, local = self.timer, self._connect
+
+        class TimedConnection(HTTPConnection):
+            def connect(self):
+                start = time.perf_counter()
+                super().connect()
+                seconds = time.perf_counter() - start
+                timer.record(STAGE_CONNECT, seconds)
+                local.seconds = getattr(local, "seconds", 0.0) + seconds
+
+        class TimedPool(HTTPConnectionPool):
+            ConnectionCls = TimedConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            **self.poolmanager.pool_classes_by_scheme, "http": TimedPool}
+
+    def take_connect_s(self):
+        """Connect time spent by the calling thread since the last call"""
+        seconds = getattr(self._connect, "seconds", 0.0)
+        self._connect.seconds = 0.0
+        return seconds
+
+
+class SensorClient:
+    """Synchronous keep-alive client, one pooled session per device
+
+    `timing` collects the connect, request and parse stages of every
+    successful request (timing.py).
+    """
+
+    def __init__(self, base_url, timeout=DEFAULT_TIMEOUT, pool_size=2):
+        self.base_url = _base_url(base_url)
+        self.timeout = timeout
+        self.stats = ClientStats()
+        self.timing = StageTimer()
+        self.session = requests.Session()
+        self._adapter = _TimedAdapter(self.timing, pool_connections=1,
+                                      pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close all pooled connections"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def request_json(self, method, path, payload=None, timeout=None):
+        """Send one request and return the decoded JSON body"""
+        return self.request(method, path, payload, timeout, json.loads)
+
+    def request(self, method, path, payload=None, timeout=None, decode=bytes):
+        """Send one request and return decode(body)"""
+        return self._request(method, path, payload, timeout, decode)[0]
+
+    def get_if_changed(self, path, etag=None):
+        """Conditional GET of a JSON endpoint
+
+        Returns (data, ETag); data is None when the device answered 304
+        because `etag` is still current.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        return self._request("GET", path, None, None, json.loads, headers)
+
+    def _request(self, method, path, payload, timeout, decode, headers=None):
+        self._adapter.take_connect_s()
+        start = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", json=payload,
+                timeout=timeout or self.timeout, headers=headers)
+            response.raise_for_status()
+            received = time.perf_counter()
+            data = None if response.status_code == 304 else decode(response.content)
+        except requests.exceptions.Timeout:
+            error = SensorClientError(ERROR_TIMEOUT, "Connection timeout")
+        except requests.exceptions.ConnectionError:
+            error = SensorClientError(
+                ERROR_CONNECTION, "Connection refused - check device IP")
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code
+            error = SensorClientError(ERROR_HTTP, f"HTTP Error: {status}", status)
+        except ValueError as e:
+            error = SensorClientError(ERROR_DECODE, f"Invalid response: {e}")
+        except Exception as e:
+            error = SensorClientError(ERROR_OTHER, f"Error: {str(e)}")
+        else:
+            end = time.perf_counter()
+            self.timing.record(STAGE_REQUEST,
+                               received - start - self._adapter.take_connect_s())
+            self.timing.record(STAGE_PARSE, end - received)
+            self.stats.record_success(end - start)
+            return data, response.headers.get("ETag")
+        self.stats.record_error(error)
+        raise error
+
+    def get_sensor_read(self):
+        return SensorRead.from_json(self.request_json("GET", "/api/sensor_read"))
+
+    def get_sensor_history(self, since=0, limit=None):
+        """Return all samples after `since` (one batch)"""
+        return SensorHistory.from_json(
+            self.request_json("GET", _history_path(since, limit)))
+
+    def get_sensor_raw(self, since=0, limit=None):
+        """Raw HX711 values after `since` (one batch)"""
+        return RawHistory.from_json(
+            self.request_json("GET", _history_path(since, limit, name="sensor_raw")))
+
+    def get_sensor_read_bin(self):
+        """Latest sample in the packed binary format (one-record SampleBatch)"""
+        return self.request("GET", "/api/sensor_read_bin", decode=decode_batch)
+
+    def get_sensor_history_bin(self, since=0, limit=None):
+        """Binary /api/sensor_history batch as a SampleBatch"""
+        return self.request("GET", _history_path(since, limit, binary=True),
+                            decode=decode_batch)
+
+    def get_sensor_settings(self):
+        return SensorSettings.from_json(
+            self.request_json("GET", "/api/sensor_settings"))
+
+    def set_sensor_settings(self, settings):
+        return SensorSettings.from_json(
+            self.request_json("POST", "/api/sensor_settings", settings.to_json()))
+
+    def get_settings(self):
+        return Settings.from_json(self.request_json("GET", "/api/settings"))
+
+    def set_settings(self, settings):
+        return Settings.from_json(
+            self.request_json("POST", "/api/settings", settings.to_json()))
+
+    def tare(self, samples=TARE_SAMPLES):
+        """Zero the scale, returns the sensor_read state with the new offset
+
+        Blocks until the device has averaged `samples` conversions; the
+        device itself keeps serving other connections meanwhile.
+        """
+        done = self.request_json("POST", "/api/tare", {"samples": samples},
+                                 timeout=_tare_timeout(self.timeout, samples))
+        if done is not True:
+            raise SensorClientError(ERROR_OTHER, "HX711 not initialized")
+        return self.get_sensor_read()
+
+    def tare_future(self, samples=TARE_SAMPLES):
+        """Run tare() in the background, returns a concurrent.futures.Future"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1,
+                                                thread_name_prefix="tare")
+        return self._executor.submit(self.tare, samples)
+
+    def heartbeat(self):
+        """Return the device change version"""
+        return int(self.request_json("GET", "/api/heartbeat").get("version", 0))
+
+    def get_perf(self, reset=False):
+        """Firmware hot-path timing; reset zeroes the counters after reading"""
+        return DevicePerf.from_json(
+            self.request_json("POST" if reset else "GET", "/api/perf"))
+
+
+def _async_client_error(e):
+    """Map an aiohttp/asyncio exception onto a SensorClientError"""
+    if isinstance(e, SensorClientError):
+        return e
+    if isinstance(e, aiohttp.ClientResponseError):
+        return SensorClientError(ERROR_HTTP, f"HTTP Error: {e.status}", e.status)
+    if isinstance(e, asyncio.TimeoutError):
+        return SensorClientError(ERROR_TIMEOUT, "Connection timeout")
+    if isinstance(e, (aiohttp.ClientConnectionError, ConnectionError)):
+        return SensorClientError(
+            ERROR_CONNECTION, "Connection refused - check device IP")
+    if isinstance(e, ValueError):
+        return SensorClientError(ERROR_DECODE, f"Invalid response: {e}")
+    return SensorClientError(ERROR_OTHER, f"Error: {str(e)}")
+
+
+class AsyncSensorClient:
+    """asyncio keep-alive client, one pooled aiohttp session per device"""
+
+    def __init__(self, base_url, timeout=DEFAULT_TIMEOUT, pool_size=2,
+                 session=None):
+        if aiohttp is None:
+            raise RuntimeError("AsyncSensorClient requires aiohttp "
+                               "(pip install aiohttp)")
+        self.base_url = _base_url(base_url)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.stats = ClientStats()
+        self.timing = None  # StageTimer, streams record the parse stage
+        self.pool_size = pool_size
+        self.session = session
+        self._owns_session = session is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        """Close the session if this client created it"""
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+        self.session = None
+
+    async def request_json(self, method, path, payload=None, timeout=None):
+        """Send one request and return the decoded JSON body"""
+        return await self.request(method, path, payload, timeout, json.loads)
+
+    async def request(self, method, path, payload=None, timeout=None,
+                      decode=bytes):
+        """Send one request and return decode(body)"""
+        return (await self._request(method, path, payload, timeout, decode))[0]
+
+    async def get_if_changed(self, path, etag=None):
+        """Conditional GET of a JSON endpoint: (data or None on 304, ETag)"""
+        headers = {"If-None-Match": etag} if etag else None
+        return await self._request("GET", path, None, None, json.loads, headers)
+
+    async def _request(self, method, path, payload, timeout, decode, headers=None):
+        start = time.perf_counter()
+        if timeout is not None:
+            timeout = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with self._get_session().request(
+                    method, f"{self.base_url}{path}", json=payload,
+                    timeout=timeout or self.timeout, headers=headers) as response:
+                response.raise_for_status()
+                body = await response.read()
+                data = None if response.status == 304 else decode(body)
+        except Exception as e:
+            error = _async_client_error(e)
+            self.stats.record_error(error)
+            raise error from e
+        self.stats.record_success(time.perf_counter() - start)
+        return data, response.headers.get("ETag")
+
+    async def stream_sensor_read(self, interval_ms=None, on_error=None,
+                                 reconnect_delay=0.5, max_reconnect_delay=5.0):
+        """Yield SensorRead frames pushed on /websocket, reconnect on loss
+
+        interval_ms asks the firmware for a per-connection push interval,
+        None keeps the reporter default. on_error(SensorClientError) is
+        called for every dropped or failed connection attempt; a handshake
+        that takes longer than the client timeout counts as failed.
+        """
+        url = "ws" + self.base_url[len("http"):] + WS_PATH
+        if interval_ms is not None:
+            url += f"?interval={int(interval_ms)}"
+        # No frame for several intervals means the stream has stalled
+        receive_timeout = max(1.0, 5 * (interval_ms or 100) / 1000.0)
+        delay = reconnect_delay
+        while True:
+            try:
+                ws = await asyncio.wait_for(self._get_session().ws_connect(
+                    url, autoping=True, receive_timeout=receive_timeout),
+                    self.timeout.total)
+                async with ws:
+                    delay = reconnect_delay
+                    last = time.perf_counter()
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        received = time.perf_counter()
+                        data = json.loads(msg.data).get("sensor_read")
+                        if data is None:
+                            continue  # Frame of another reporter
+                        reading = SensorRead.from_json(data)
+                        now = time.perf_counter()
+                        if self.timing is not None:
+                            self.timing.record(STAGE_PARSE, now - received)
+                        self.stats.record_frame(now - last)
+                        last = now
+                        yield reading
+                raise ConnectionResetError("WebSocket closed by device")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = _async_client_error(e)
+                self.stats.record_error(error)
+                if on_error is not None:
+                    on_error(error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_reconnect_delay)
+
+    async def get_sensor_read(self):
+        return SensorRead.from_json(
+            await self.request_json("GET", "/api/sensor_read"))
+
+    async def get_sensor_history(self, since=0, limit=None):
+        """Return all samples after `since` (one batch)"""
+        return SensorHistory.from_json(
+            await self.request_json("GET", _history_path(since, limit)))
+
+    async def get_sensor_raw(self, since=0, limit=None):
+        """Raw HX711 values after `since` (one batch)"""
+        return RawHistory.from_json(await self.request_json(
+            "GET", _history_path(since, limit, name="sensor_raw")))
+
+    async def get_sensor_read_bin(self):
+        """Latest sample in the packed binary format (one-record SampleBatch)"""
+        return await self.request("GET", "/api/sensor_read_bin",
+                                  decode=decode_batch)
+
+    async def get_sensor_history_bin(self, since=0, limit=None):
+        """Binary /api/sensor_history batch as a SampleBatch"""
+        return await self.request(
+            "GET", _history_path(since, limit, binary=True), decode=decode_batch)
+
+    async def get_sensor_settings(self):
+        return SensorSettings.from_json(
+            await self.request_json("GET", "/api/sensor_settings"))
+
+    async def set_sensor_settings(self, settings):
+        return SensorSettings.from_json(await self.request_json(
+            "POST", "/api/sensor_settings", settings.to_json()))
+
+    async def get_settings(self):
+        return Settings.from_json(await self.request_json("GET", "/api/settings"))
+
+    async def set_settings(self, settings):
+        return Settings.from_json(
+            await self.request_json("POST", "/api/settings", settings.to_json()))
+
+    async def tare(self, samples=TARE_SAMPLES):
+        """Zero the scale, returns the sensor_read state with the new offset"""
+        done = await self.request_json(
+            "POST", "/api/tare", {"samples": samples},
+            timeout=_tare_timeout(self.timeout.total, samples))
+        if done is not True:
+            raise SensorClientError(ERROR_OTHER, "HX711 not initialized")
+        return await self.get_sensor_read()
+
+    async def heartbeat(self):
+        """Return the device change version"""
+        data = await self.request_json("GET", "/api/heartbeat")
+        return int(data.get("version", 0))
+
+    async def get_perf(self, reset=False):
+        """Firmware hot-path timing; reset zeroes the counters after reading"""
+        return DevicePerf.from_json(
+            await self.request_json("POST" if reset else "GET", "/api/perf"))
+
+
+class SensorStream(threading.Thread):
+    """Background thread delivering /websocket sensor_read frames
+
+    on_reading(SensorRead) is called for every frame, on_error(str) when the
+    connection drops; both run on the stream thread. Frame parsing is
+    recorded in `timing` (a StageTimer) when given.
+    """
+
+    def __init__(self, base_url, on_reading, on_error=None, interval_ms=None,
+                 timeout=DEFAULT_TIMEOUT, timing=None):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.on_reading = on_reading
+        self.on_error = on_error
+        self.interval_ms = interval_ms
+        self.timeout = timeout
+        self.timing = timing
+        self.stats = None
+        self._loop = None
+        self._task = None
+
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self._consume())
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _consume(self):
+        async with AsyncSensorClient(self.base_url, self.timeout) as client:
+            self.stats = client.stats
+            client.timing = self.timing
+            on_error = None
+            if self.on_error is not None:
+                on_error = lambda error: self.on_error(str(error))
+            async for reading in client.stream_sensor_read(self.interval_ms,
+                                                           on_error):
+                self.on_reading(reading)
+
+    def stop(self):
+        """Cancel the stream and close its connection"""
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
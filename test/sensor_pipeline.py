@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Single fetch pipeline for one module
+One source (HTTP polling, /websocket stream, a shared acquisition ring or
+the replay of a capture file) fetches every reading once and fans it out to
+all subscribed views, so a weight view, a distance view and a dashboard
+never poll the device twice. With `record` every reading is also written
+to a capture file (capture.py), with `history` to a long-term rollup store
+(history_store.py).
+"""
+
+import math
+import threading
+import time
+
+from acquisition import open_acquisition
+from capture import CaptureWriter, ReplayThread
+from history_store import HistoryStore
+from scheduler import PollScheduler, probe
+from sensor_client import DEFAULT_TIMEOUT, SensorClient, SensorClientError, SensorStream
+from timing import STAGE_CONNECT, STAGE_PARSE, STAGE_REQUEST, Profiler, StageTimer
+
+
+class SensorPipeline:
+    """Fetch sensor_read once, deliver it to every subscriber
+
+    on_reading(SensorRead) and on_error(str) run on the pipeline thread;
+    views must not touch Tk from them, only store the values.
+    """
+
+    def __init__(self, base_url, interval_ms=100, stream=False, acquisition=False,
+                 timeout=DEFAULT_TIMEOUT, record=None, replay=None, replay_speed=1.0,
+                 history=None):
+        self.base_url = base_url
+        self.interval_ms = interval_ms
+        self.stream = stream
+        self.acquisition = acquisition
+        self.record = record  # Capture file to write
+        self.replay = replay  # Capture file to play instead of the device
+        self.replay_speed = replay_speed
+        self.history = history  # History store file (SQLite) to feed
+        self.client = SensorClient(base_url, timeout=timeout)  # Also for tare/settings
+        # Views add the queue and render stages; the other sources only
+        # measure what they can, and keep tare/settings calls out of it
+        if replay or acquisition:
+            self.timing = StageTimer((STAGE_CONNECT, STAGE_REQUEST, STAGE_PARSE))
+        elif stream:
+            self.timing = StageTimer((STAGE_CONNECT, STAGE_REQUEST))
+        else:
+            self.timing = self.client.timing
+        self.profiler = Profiler()  # Source thread checks in on every publish
+        self.scheduler = PollScheduler(interval_ms / 1000.0)  # Polling only
+        self.running = False
+        self._paused = False
+        self._writer = None
+        self._store = None
+        self._subscribers = ()  # Replaced on change, read without locking
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ring = None
+
+    def subscribe(self, on_reading, on_error=None):
+        """Add a subscriber, returns a handle for unsubscribe()"""
+        handle = (on_reading, on_error)
+        with self._lock:
+            self._subscribers = self._subscribers + (handle,)
+        return handle
+
+    def unsubscribe(self, handle):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not handle)
+
+    @property
+    def paused(self):
+        """Polling and replay only: hold the source"""
+        return self._paused
+
+    @paused.setter
+    def paused(self, value):
+        self._paused = value
+        if isinstance(self._thread, ReplayThread):
+            self._thread.paused = value
+
+    def latency(self):
+        """Request round-trip of the last reading in seconds
+
+        NaN for streams, the shared ring and replays: they make no request
+        per reading. 0 before the first poll.
+        """
+        if self.stream or self.acquisition or self.replay:
+            return math.nan
+        return self.client.stats.last_latency_s
+
+    def seek(self, t):
+        """Replay only: continue from host time t of the capture"""
+        if isinstance(self._thread, ReplayThread):
+            self._thread.seek(t)
+
+    def _record(self, reading):
+        self._writer.append(reading, time.time(), self.latency())
+
+    def publish(self, reading):
+        self.profiler.checkpoint()
+        for on_reading, _ in self._subscribers:
+            on_reading(reading)
+
+    def publish_error(self, message):
+        self.profiler.checkpoint()
+        for _, on_error in self._subscribers:
+            if on_error is not None:
+                on_error(message)
+
+    def start(self):
+        """Start the source selected in the constructor"""
+        self.running = True
+        if self.record and not self.replay:
+            self._writer = CaptureWriter(self.record,
+                                         latency=not (self.stream or self.acquisition))
+            self.subscribe(self._record)
+        if self.history and not self.replay:
+            self._store = HistoryStore(self.history)
+            self._store.attach(self)
+        if self.replay:
+            self._thread = ReplayThread(self.replay, self.publish, self.replay_speed)
+            self._thread.paused = self._paused
+        elif self.acquisition:
+            # Shared with other viewers, exits by itself once none reads it
+            self._ring = open_acquisition(
+                self.base_url, self.interval_ms, "stream" if self.stream else "poll")
+            self._thread = threading.Thread(target=self._ring_loop, daemon=True)
+        elif self.stream:
+            self._thread = SensorStream(self.base_url, self.publish, self.publish_error,
+                                        interval_ms=self.interval_ms, timing=self.timing)
+        else:
+            self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+
+    def _poll_loop(self):
+        scheduler = self.scheduler
+        deadline = time.perf_counter()
+        while self.running:
+            if self.paused:
+                interval = scheduler.target_s
+            elif scheduler.probing:
+                scheduler.record_probe(probe(self.client))
+                interval = scheduler.interval()
+            else:
+                try:
+                    reading = self.client.get_sensor_read()
+                except SensorClientError as e:
+                    if scheduler.record_error(e):
+                        self.publish_error(f"{e} - module unreachable, probing /api/heartbeat")
+                    else:
+                        self.publish_error(str(e))
+                else:
+                    scheduler.record_success(self.client.stats.last_latency_s)
+                    self.publish(reading)
+                interval = scheduler.interval()
+            deadline = max(deadline + interval, time.perf_counter())
+            time.sleep(max(deadline - time.perf_counter(), 0.0))
+
+    def _ring_loop(self):
+        errors = 0
+        while self.running:
+            for _, reading in self._ring.read():
+                self.publish(reading)
+            _, ring_errors, last_error, _ = self._ring.status()
+            if ring_errors > errors and last_error:
+                self.publish_error(last_error)
+            errors = ring_errors
+            time.sleep(self.interval_ms / 1000.0)
+
+    def stop(self):
+        """Stop the source and close the client"""
+        self.running = False
+        if isinstance(self._thread, (SensorStream, ReplayThread)):
+            self._thread.stop()
+        if self._thread is not None and not isinstance(self._thread, SensorStream):
+            self._thread.join(1.0)
+        if self._ring is not None:
+            self._ring.close()
+        if self._writer is not None:
+            self._writer.close()
+        if self._store is not None:
+            self._store.close()
+        self.client.close()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Settings cache driven by /api/heartbeat
+/api/sensor_settings and /api/settings only change through their setters,
+which bump the device change version reported by /api/heartbeat. The
+cache re-fetches them only after that version moved, and then with
+If-None-Match, so a dashboard can refresh its configuration at a high rate
+for one tiny heartbeat request per refresh.
+"""
+
+import threading
+from dataclasses import dataclass
+
+from sensor_client import SensorSettings, Settings
+
+SENSOR_SETTINGS_PATH = "/api/sensor_settings"
+SETTINGS_PATH = "/api/settings"
+
+
+@dataclass
+class CacheEntry:
+    version: int   # Heartbeat version the value was validated against
+    etag: str      # None on firmware without ETag support
+    value: object
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0          # Served from the cache after one heartbeat
+    revalidated: int = 0   # Conditional GET answered 304
+    fetched: int = 0       # Full GET
+
+
+class SettingsCache:
+    """Cached settings endpoints of one SensorClient"""
+
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def sensor_settings(self):
+        return self.get(SENSOR_SETTINGS_PATH, SensorSettings.from_json)
+
+    def settings(self):
+        return self.get(SETTINGS_PATH, Settings.from_json)
+
+    def get(self, path, parse, version=None):
+        """Value of a settings endpoint, fetched only if the device changed
+
+        `version` is a heartbeat version the caller already has; without it
+        one heartbeat is requested.
+        """
+        if version is None:
+            version = self.client.heartbeat()
+        with self._lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry.version == version:
+            self.stats.hits += 1
+            return entry.value
+        data, etag = self.client.get_if_changed(path, entry.etag if entry else None)
+        return self._store(path, parse, version, entry, data, etag)
+
+    def _store(self, path, parse, version, entry, data, etag):
+        if data is None:
+            self.stats.revalidated += 1
+            value = entry.value
+        else:
+            self.stats.fetched += 1
+            value = parse(data)
+        with self._lock:
+            self.entries[path] = CacheEntry(version, etag, value)
+        return value
+
+    def set_sensor_settings(self, settings):
+        self.invalidate(SENSOR_SETTINGS_PATH)
+        return self.client.set_sensor_settings(settings)
+
+    def set_settings(self, settings):
+        self.invalidate(SETTINGS_PATH)
+        return self.client.set_settings(settings)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(path, None)
+
+
+class AsyncSettingsCache(SettingsCache):
+    """SettingsCache for AsyncSensorClient (one event loop)"""
+
+    async def sensor_settings(self):
+        return await self.get(SENSOR_SETTINGS_PATH, SensorSettings.from_json)
+
+    async def settings(self):
+        return await self.get(SETTINGS_PATH, Settings.from_json)
+
+    async def get(self, path, parse, version=None):
+        if version is None:
+            version = await self.client.heartbeat()
+        entry = self.entries.get(path)
+        if entry is not None and entry.version == version:
+            self.stats.hits += 1
+            return entry.value
+        data, etag = await self.client.get_if_changed(path, entry.etag if entry else None)
+        return self._store(path, parse, version, entry, data, etag)
+
+    async def set_sensor_settings(self, settings):
+        self.invalidate(SENSOR_SETTINGS_PATH)
+        return await self.client.set_sensor_settings(settings)
+
+    async def set_settings(self, settings):
+        self.invalidate(SETTINGS_PATH)
+        return await self.client.set_settings(settings)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Shared-memory sample ring
+One writer process (acquisition.py) appends timestamped sensor_read
+samples to a multiprocessing.shared_memory block, any number of viewer
+processes map it and read new samples without touching the device.
+
+Layout (little-endian):
+  header 216 bytes: magic "WMRB", u16 version, u16 record size,
+                    u32 capacity, u64 head (records written), u64 success,
+                    u64 errors, f64 writer heartbeat, f64 reader heartbeat,
+                    u8[160] last error, 4 pad bytes
+  record 40 bytes:  u64 index, f64 host time, u32 seq, u32 timestamp_ms,
+                    i32 weight, i32 distance, i32 tare_offset, u32 flags
+
+The writer fills a record, then publishes it by bumping head. A reader
+that lags so far behind that the writer may be rewriting a slot drops
+that slot, like history_collect() in the firmware. The writer refreshes
+its heartbeat on every loop, readers theirs on every read(), so each side
+can tell whether the other is still there.
+"""
+
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from sensor_client import SensorRead
+
+MAGIC = b"WMRB"
+VERSION = 2
+ERROR_SIZE = 160
+HEADER = struct.Struct(f"<4sHHIQQQdd{ERROR_SIZE}s4x")  # Padded to 8 bytes
+RECORD = struct.Struct("<QdIIiiiI")
+HEAD_OFFSET = 12         # u64 head inside HEADER
+BEAT_OFFSET = 36         # f64 writer heartbeat
+READER_BEAT_OFFSET = 44  # f64 reader heartbeat, any reader
+DEFAULT_CAPACITY = 65536
+STALE_S = 5.0  # Writer heartbeat age after which a ring may be taken over
+
+FLAG_CUP = 1
+FLAG_TARE = 2
+
+_HEAD = struct.Struct("<Q")
+_BEAT = struct.Struct("<d")
+
+
+def ring_name(base_url):
+    """Shared memory name of the acquisition ring of one module"""
+    host = base_url.split("//", 1)[-1].rstrip("/")
+    return "wm_" + "".join(c if c.isalnum() else "_" for c in host)
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Python < 3.13 registers attached blocks too, and the resource tracker
+    # would unlink the writer's ring when this viewer exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class RingWriter:
+    """Single writer of a shared sample ring"""
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY):
+        size = HEADER.size + capacity * RECORD.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self._take_over(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = name
+        self.capacity = capacity
+        self.buf = self.shm.buf
+        self.head = 0
+        self.success = 0
+        self.errors = 0
+        self.last_error = b""
+        self._write_header()
+
+    @staticmethod
+    def _take_over(name):
+        # Left behind by a crashed writer? Refuse to steal a live ring
+        old = _attach(name)
+        try:
+            magic, _, _, _, _, _, _, beat, _, _ = HEADER.unpack_from(old.buf, 0)
+            if magic == MAGIC and time.time() - beat < STALE_S:
+                raise RuntimeError(f"Acquisition ring {name} is in use")
+        finally:
+            old.close()
+        old.unlink()
+
+    def _write_header(self):
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, RECORD.size, self.capacity,
+                         self.head, self.success, self.errors, time.time(),
+                         self.reader_beat(), self.last_error)
+
+    def beat(self):
+        """Refresh the heartbeat only, safe next to a thread in append()"""
+        _BEAT.pack_into(self.buf, BEAT_OFFSET, time.time())
+
+    def reader_beat(self):
+        """time.time() of the latest read() of any reader, 0 before any"""
+        return _BEAT.unpack_from(self.buf, READER_BEAT_OFFSET)[0]
+
+    def append(self, reading, host_time=None):
+        """Publish one SensorRead"""
+        flags = (FLAG_CUP if reading.cup_true else 0) | (FLAG_TARE if reading.tare else 0)
+        offset = HEADER.size + (self.head % self.capacity) * RECORD.size
+        RECORD.pack_into(self.buf, offset, self.head,
+                         time.time() if host_time is None else host_time,
+                         reading.seq & 0xFFFFFFFF, reading.timestamp & 0xFFFFFFFF,
+                         reading.weight, reading.distance, reading.tare_offset or 0,
+                         flags)
+        self.head += 1
+        self.success += 1
+        self.last_error = b""
+        self._write_header()  # Head last: the record is complete
+
+    def error(self, message):
+        """Record a failed acquisition for the viewers' counters"""
+        self.errors += 1
+        self.last_error = str(message).encode("utf-8", "replace")[:ERROR_SIZE]
+        self._write_header()
+
+    def close(self, unlink=True):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class RingReader:
+    """Viewer side: maps a ring and returns the samples added since last read"""
+
+    def __init__(self, name, since_latest=False):
+        self.shm = _attach(name)
+        self.name = name
+        magic, version, record_size, capacity, head = HEADER.unpack_from(self.shm.buf, 0)[:5]
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.shm.close()
+            raise ValueError(f"{name} is not a sample ring (v{VERSION})")
+        self.capacity = capacity
+        self.next = head if since_latest else max(0, head - capacity)
+        self.dropped = 0  # Samples overwritten before they were read
+
+    def head(self):
+        return _HEAD.unpack_from(self.shm.buf, HEAD_OFFSET)[0]
+
+    def status(self):
+        """Writer counters: (success, errors, last_error or None, heartbeat)"""
+        _, _, _, _, _, success, errors, beat, _, last_error = HEADER.unpack_from(self.shm.buf, 0)
+        last_error = last_error.rstrip(b"\0").decode("utf-8", "replace") or None
+        return success, errors, last_error, beat
+
+    def read(self, limit=None):
+        """Return [(host_time, SensorRead)] of new samples, oldest first"""
+        buf = self.shm.buf
+        _BEAT.pack_into(buf, READER_BEAT_OFFSET, time.time())
+        head = self.head()
+        if head < self.next:  # Writer restarted
+            self.next = 0
+        # Keep one slot of margin against the writer
+        oldest = max(self.next, head - self.capacity + 1)
+        if oldest > self.next:
+            self.dropped += oldest - self.next
+        end = head if limit is None else min(head, oldest + limit)
+        out = []
+        for index in range(oldest, end):
+            offset = HEADER.size + (index % self.capacity) * RECORD.size
+            (stored, host_time, seq, timestamp, weight, distance, tare_offset,
+             flags) = RECORD.unpack_from(buf, offset)
+            if stored != index or self.head() - index >= self.capacity:
+                self.dropped += 1  # Rewritten while we copied it
+                continue
+            out.append((host_time, SensorRead(
+                cup_true=bool(flags & FLAG_CUP), tare=bool(flags & FLAG_TARE),
+                weight=weight, distance=distance, seq=seq, timestamp=timestamp,
+                tare_offset=tare_offset)))
+        self.next = end
+        return out
+
+    def close(self):
+        self.shm.close()
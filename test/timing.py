@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Hot-path timing
+Per-stage timing of the client side and a cProfile toggle for the GUIs,
+plus a printout of the firmware counters of /api/perf.
+
+  connect   TCP connect of a new keep-alive connection (SensorClient)
+  request   send and wait for the response, connect excluded
+  parse     JSON/binary decoding of the body (or /websocket frame)
+  queue     reading published by the pipeline until the next view tick
+            picked it up; with the GUIs' 100 ms after() tick this is
+            mostly the phase of that tick, not a backlog
+  render    one update_display() of a view
+
+Stages a source cannot measure (connect and request of a /websocket
+stream, everything before queue for the acquisition process or a
+replay) are shown as n/a.
+
+    python timing.py --url http://192.168.1.233 [--reset]
+"""
+
+import argparse
+import cProfile
+import io
+import pstats
+import threading
+from dataclasses import dataclass
+
+STAGE_CONNECT = "connect"
+STAGE_REQUEST = "request"
+STAGE_PARSE = "parse"
+STAGE_QUEUE = "queue"
+STAGE_RENDER = "render"
+STAGES = (STAGE_CONNECT, STAGE_REQUEST, STAGE_PARSE, STAGE_QUEUE, STAGE_RENDER)
+
+
+@dataclass
+class StageStat:
+    """Counters of one stage, times in seconds"""
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    last_s: float = 0.0
+
+    @property
+    def mean_s(self):
+        return self.total_s / self.count if self.count else 0.0
+
+
+class StageTimer:
+    """Thread-safe per-stage counters, shared by a client, its pipeline and views"""
+
+    def __init__(self, unavailable=()):
+        self.unavailable = tuple(unavailable)  # Stages the source cannot measure
+        self._stats = {stage: StageStat() for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            stat = self._stats[stage]
+            stat.count += 1
+            stat.total_s += seconds
+            stat.last_s = seconds
+            if seconds > stat.max_s:
+                stat.max_s = seconds
+
+    def snapshot(self):
+        """Copy of all stages: {stage: StageStat}"""
+        with self._lock:
+            return {stage: StageStat(s.count, s.total_s, s.max_s, s.last_s)
+                    for stage, s in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            for stage in STAGES:
+                self._stats[stage] = StageStat()
+
+    def summary(self):
+        """One line for a stats panel: mean/max ms per stage that ran"""
+        parts = [f"{stage} {s.mean_s * 1000:.2f}/{s.max_s * 1000:.2f}"
+                 for stage, s in self.snapshot().items() if s.count]
+        if not parts:
+            return "--"
+        text = "  ".join(parts) + " ms (mean/max)"
+        if self.unavailable:
+            text += f"  {'/'.join(self.unavailable)} n/a"
+        return text
+
+
+class Profiler:
+    """cProfile toggle spanning several threads
+
+    cProfile only sees the thread that enabled it, so every thread of
+    interest calls checkpoint() regularly (the pipeline on each publish,
+    views on each update); it attaches a profile while the profiler is
+    active and detaches it after stop(). stats() merges the profiles
+    detached so far, call it once the threads had a chance to check in.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._profiles = {}  # Thread ident -> attached cProfile.Profile
+        self._done = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self._done = []
+        self.active = True
+        self.checkpoint()
+
+    def stop(self):
+        self.active = False
+        self.checkpoint()
+
+    def checkpoint(self):
+        """Attach or detach the calling thread, cheap when nothing changes"""
+        ident = threading.get_ident()
+        profile = self._profiles.get(ident)
+        if self.active and profile is None:
+            profile = cProfile.Profile()
+            with self._lock:
+                self._profiles[ident] = profile
+            profile.enable()
+        elif not self.active and profile is not None:
+            profile.disable()
+            with self._lock:
+                del self._profiles[ident]
+                self._done.append(profile)
+
+    def stats(self):
+        """pstats.Stats of the detached profiles, None before any"""
+        with self._lock:
+            profiles = list(self._done)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def report(self, limit=25, sort="cumulative"):
+        """Top functions as text"""
+        stats = self.stats()
+        if stats is None:
+            return "No profile collected"
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def print_device_perf(perf):
+    """Table of a DevicePerf (/api/perf)"""
+    print(f"{'probe':24} {'count':>10} {'mean us':>10} {'max us':>10} {'load %':>8}")
+    span_us = perf.span_ms * 1000
+    for name, probe in perf.probes.items():
+        load = 100.0 * probe.total_us / span_us if span_us else 0.0
+        print(f"{name:24} {probe.count:>10} {probe.mean_us:>10.1f} {probe.max_us:>10} "
+              f"{load:>8.2f}")
+
+
+def main():
+    from sensor_client import SensorClient, SensorClientError  # Imports this module
+
+    parser = argparse.ArgumentParser(description="Print the firmware hot-path timing")
+    parser.add_argument("--url", default="http://192.168.1.233", help="Module address")
+    parser.add_argument("--reset", action="store_true", help="Reset the counters after reading")
+    args = parser.parse_args()
+    with SensorClient(args.url) as client:
+        try:
+            perf = client.get_perf(args.reset)
+        except SensorClientError as e:
+            print(f"Failed: {e}")
+            return
+    print(f"{perf.span_ms / 1000:.1f} s since the last reset")
+    print_device_perf(perf)
+
+
+if __name__ == "__main__":
+    main()